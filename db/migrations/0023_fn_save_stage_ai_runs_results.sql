@@ -0,0 +1,24 @@
+-- Gravação em lote dos resultados do serviço de IA (um único UPDATE para vários runs)
+create index if not exists idx_stage_ai_runs_run_id on stage_ai_runs(run_id);
+
+create or replace function public.save_stage_ai_runs_results(p_runs jsonb)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_updated integer;
+begin
+  update stage_ai_runs sar
+  set status = r.status,
+      result = r.result,
+      error = r.error,
+      finished_at = coalesce(r.finished_at, now())
+  from jsonb_to_recordset(p_runs) as r(run_id text, status text, result jsonb, error text, finished_at timestamptz)
+  where sar.run_id = r.run_id;
+
+  get diagnostics v_updated = row_count;
+  return v_updated;
+end;
+$$;
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class AsyncTTLCache(Generic[T]):
+    """
+    Cache LRU assíncrono com TTL e coalescência de misses (single-flight):
+    chamadas concorrentes para a mesma chave compartilham um único carregamento.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Tuple[T, bool]]],
+    ) -> T:
+        """
+        Retorna o valor em cache ou executa o loader. O loader retorna (valor, cacheável);
+        valores não cacheáveis (ex.: fallback após falha no banco) são entregues sem serem armazenados.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation.get(key, 0)
+        try:
+            value, cacheable = await loader()
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Evita "Future exception was never retrieved" quando não há chamadas aguardando
+            future.exception()
+            raise
+        else:
+            # Uma invalidação durante o carregamento descarta o valor possivelmente desatualizado
+            if cacheable and self._generation.get(key, 0) == generation:
+                self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._generation.pop(key, None)
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """
+        Remove a chave informada (ou todo o cache quando key é None). Retorna quantas entradas saíram.
+        """
+        if key is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            for inflight_key in self._inflight:
+                self._generation[inflight_key] = self._generation.get(inflight_key, 0) + 1
+            return removed
+        if key in self._inflight:
+            self._generation[key] = self._generation.get(key, 0) + 1
+        return 1 if self._entries.pop(key, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+    def _store(self, key: str, value: T) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
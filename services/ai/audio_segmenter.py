@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import io
+import shutil
+import subprocess
+import wave
+from array import array
+from operator import mul
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from faster_whisper import WhisperModel  # type: ignore
+except ImportError:  # pragma: no cover - dependência opcional (AI_TRANSCRIBE_BACKEND=local)
+    WhisperModel = None
+
+# Todo áudio é normalizado para PCM 16 bits mono em 16 kHz (entrada esperada pelo Whisper)
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# Piso de ruído: percentil da energia dos quadros e margem (em potência) acima dele
+_NOISE_PERCENTILE = 0.1
+_NOISE_MARGIN = 4.0
+
+
+# Funções síncronas (CPU/disco). Ficam no nível do módulo para rodar nos workers do
+# ProcessPoolExecutor (start method "spawn"); o módulo só depende da stdlib (e do
+# faster-whisper, opcional) para que os workers iniciem rápido.
+def decode_to_pcm(source: Path, target: Path) -> float:
+    """
+    Converte o áudio para PCM bruto (16 bits, mono, 16 kHz) em target e retorna a duração
+    em segundos. Usa o ffmpeg quando disponível; sem ele, aceita apenas WAV 16 bits a 16 kHz.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        subprocess.run(
+            [ffmpeg, "-nostdin", "-v", "error", "-y", "-i", str(source),
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), str(target)],
+            check=True,
+            capture_output=True,
+        )
+    else:
+        try:
+            reader = wave.open(str(source), "rb")
+        except (wave.Error, EOFError) as e:
+            raise RuntimeError("Formato de áudio não suportado sem ffmpeg (envie WAV 16 kHz)") from e
+        with reader, open(target, "wb") as out:
+            channels = reader.getnchannels()
+            if reader.getsampwidth() != SAMPLE_WIDTH or reader.getframerate() != SAMPLE_RATE:
+                raise RuntimeError("Sem ffmpeg, apenas WAV 16 bits a 16 kHz é suportado")
+            while True:
+                frames = reader.readframes(SAMPLE_RATE * 10)
+                if not frames:
+                    break
+                if channels > 1:
+                    # Mantém apenas o primeiro canal
+                    samples = array("h", frames)
+                    frames = samples[::channels].tobytes()
+                out.write(frames)
+    return target.stat().st_size / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def read_pcm(path: Path, start: float, end: float) -> bytes:
+    offset = int(start * SAMPLE_RATE) * SAMPLE_WIDTH
+    length = int(end * SAMPLE_RATE) * SAMPLE_WIDTH - offset
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        return handle.read(max(0, length))
+
+
+def pcm_to_wav(pcm: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(SAMPLE_WIDTH)
+        writer.setframerate(SAMPLE_RATE)
+        writer.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def frame_energies(path: Path, frame_ms: int = 30) -> List[float]:
+    """
+    Energia média por amostra de cada quadro de frame_ms, lida em streaming do PCM.
+    """
+    frame_samples = SAMPLE_RATE * frame_ms // 1000
+    energies: List[float] = []
+    with open(path, "rb") as handle:
+        while True:
+            data = handle.read(frame_samples * SAMPLE_WIDTH)
+            if len(data) < SAMPLE_WIDTH:
+                break
+            samples = array("h", data[: len(data) - len(data) % SAMPLE_WIDTH])
+            energies.append(sum(map(mul, samples, samples)) / len(samples))
+    return energies
+
+
+def split_on_silence(
+    path: Path,
+    silence_dbfs: float = -40.0,
+    min_silence_seconds: float = 0.5,
+    max_chunk_seconds: float = 30.0,
+    min_chunk_seconds: float = 1.0,
+    frame_ms: int = 30,
+) -> List[Tuple[float, float]]:
+    """
+    Divide a fala do PCM em chunks de no máximo max_chunk_seconds, cortando em silêncios de
+    pelo menos min_silence_seconds. O limiar de silêncio é o maior entre silence_dbfs e o piso
+    de ruído da gravação. Fala contínua acima do limite é cortada no quadro mais silencioso da
+    segunda metade da janela, e trechos curtos (< min_chunk_seconds) são unidos ao vizinho
+    quando cabem. Retorna [(início, fim)] em segundos; o resultado é determinístico, o que
+    permite retomar uma transcrição pelos índices dos chunks.
+    """
+    energies = frame_energies(path, frame_ms)
+    if not energies:
+        return []
+    frame_seconds = frame_ms / 1000
+    total = len(energies) * frame_seconds
+    noise_floor = sorted(energies)[int(len(energies) * _NOISE_PERCENTILE)]
+    threshold = max((32768.0 * 10 ** (silence_dbfs / 20)) ** 2, noise_floor * _NOISE_MARGIN)
+    min_silence_frames = max(1, round(min_silence_seconds / frame_seconds))
+    max_frames = max(1, int(max_chunk_seconds / frame_seconds))
+
+    # Trechos de fala (em quadros), separados por silêncios longos
+    regions: List[Tuple[int, int]] = []
+    start = None
+    last_speech = 0
+    for index, energy in enumerate(energies):
+        if energy > threshold:
+            if start is None:
+                start = index
+            last_speech = index + 1
+        elif start is not None and index - last_speech + 1 >= min_silence_frames:
+            regions.append((start, last_speech))
+            start = None
+    if start is not None:
+        regions.append((start, last_speech))
+
+    # Fala contínua longa: corta no quadro de menor energia da segunda metade da janela
+    bounded: List[Tuple[int, int]] = []
+    for start, end in regions:
+        while end - start > max_frames:
+            window_start = start + max_frames // 2
+            cut = min(range(window_start, start + max_frames), key=energies.__getitem__) + 1
+            bounded.append((start, cut))
+            start = cut
+        bounded.append((start, end))
+
+    # Agrupa os trechos em chunks de até max_chunk_seconds
+    chunks: List[Tuple[int, int]] = []
+    for start, end in bounded:
+        if chunks and end - chunks[-1][0] <= max_frames:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+
+    # Chunks muito curtos: une ao anterior (ou ao seguinte) quando o total cabe no limite
+    min_frames = int(min_chunk_seconds / frame_seconds)
+    merged: List[Tuple[int, int]] = []
+    for start, end in chunks:
+        if merged and (end - start < min_frames or merged[-1][1] - merged[-1][0] < min_frames) \
+                and end - merged[-1][0] <= max_frames:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    # Margem curta para não cortar o início/fim das palavras, sem sobrepor chunks vizinhos
+    pad = 0.1
+    bounds = [(start * frame_seconds, end * frame_seconds) for start, end in merged]
+    result: List[Tuple[float, float]] = []
+    for index, (start, end) in enumerate(bounds):
+        previous_end = bounds[index - 1][1] if index else 0.0
+        next_start = bounds[index + 1][0] if index + 1 < len(bounds) else total
+        result.append((round(max(previous_end, start - pad), 3), round(min(next_start, end + pad), 3)))
+    return result
+
+
+# Modelos do faster-whisper carregados neste processo (um por configuração)
+_models: Dict[Tuple[str, str, int], Any] = {}
+
+
+def transcribe_pcm_chunk(
+    path: Path,
+    start: float,
+    end: float,
+    language: Optional[str],
+    model_size: str,
+    compute_type: str,
+    cpu_threads: int,
+    beam_size: int,
+) -> Tuple[List[Tuple[float, float, str]], Optional[str]]:
+    """
+    Transcreve um trecho do PCM com faster-whisper. O modelo é carregado uma vez por processo
+    e usa cpu_threads threads, o que torna o throughput previsível por núcleo.
+    """
+    if WhisperModel is None:
+        raise RuntimeError("AI_TRANSCRIBE_BACKEND=local requer o pacote faster-whisper")
+    import numpy as np  # dependência do faster-whisper
+
+    key = (model_size, compute_type, cpu_threads)
+    model = _models.get(key)
+    if model is None:
+        model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        _models[key] = model
+
+    audio = np.frombuffer(read_pcm(path, start, end), dtype=np.int16).astype(np.float32) / 32768.0
+    segments, info = model.transcribe(
+        audio,
+        language=language,
+        beam_size=beam_size,
+        vad_filter=False,
+        condition_on_previous_text=False,
+    )
+    return [(s.start, s.end, s.text.strip()) for s in segments if s.text.strip()], info.language
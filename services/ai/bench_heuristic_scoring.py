@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark da análise heurística de currículos: prepare_structured_analysis chamado
+currículo a currículo versus prepare_structured_analysis_batch sobre o lote inteiro
+(etapa e requisitos tokenizados uma vez, cobertura por matriz termo-documento).
+
+Gera currículos sintéticos com vocabulário de vendas/tecnologia e confere que os dois
+caminhos produzem exatamente o mesmo resultado antes de medir.
+
+Uso:
+    python bench_heuristic_scoring.py --resumes 2000 --requirements 15 --words 400
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+VOCABULARY = (
+    "vendas consultivas b2b salesforce hubspot pipedrive power bi excel avançado inglês fluente "
+    "espanhol gestão carteira prospecção negociação liderança equipe python django sql dados "
+    "análise métricas receita recorrente crescimento clientes atendimento comunicação projetos "
+    "a de com para em no na os as um uma"
+).split()
+
+STAGE_DESCRIPTION = (
+    "Entrevista técnica para vendas consultivas B2B: domínio de Salesforce, gestão de carteira, "
+    "negociação com clientes e inglês fluente para reuniões internacionais."
+)
+
+
+def build_resumes(count: int, words: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(words // 2, words))) for _ in range(count)]
+
+
+def build_requirements(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed + 1)
+    return [
+        {
+            "label": rng.choice(VOCABULARY).title(),
+            "description": " ".join(rng.choice(VOCABULARY) for _ in range(6)),
+            "weight": rng.choice([1, 2, 3]),
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=2000)
+    parser.add_argument("--requirements", type=int, default=15)
+    parser.add_argument("--words", type=int, default=400, help="palavras por currículo (máximo)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import resume_analysis_utils as utils
+
+    resumes = build_resumes(args.resumes, args.words, args.seed)
+    requirements = build_requirements(args.requirements, args.seed)
+
+    started = time.perf_counter()
+    single = [utils.prepare_structured_analysis(text, STAGE_DESCRIPTION, requirements) for text in resumes]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = utils.prepare_structured_analysis_batch(resumes, STAGE_DESCRIPTION, requirements)
+    batch_seconds = time.perf_counter() - started
+
+    if single != batch:
+        raise SystemExit("Resultados divergentes entre a análise individual e a em lote")
+
+    print(f"currículos={args.resumes} requisitos={args.requirements} numpy={'sim' if utils.np is not None else 'não'}")
+    print(f"individual: {single_seconds:.3f}s ({args.resumes / single_seconds:.0f} currículos/s)")
+    print(f"lote:       {batch_seconds:.3f}s ({args.resumes / batch_seconds:.0f} currículos/s)")
+    print(f"ganho:      {single_seconds / batch_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
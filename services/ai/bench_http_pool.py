@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Benchmark da latência por avaliação com e sem o pool de conexões HTTP compartilhado.
+
+Sobe um servidor stub local (Supabase RPC/Storage/PostgREST + OpenAI chat/completions)
+que simula o custo do handshake TCP+TLS a cada nova conexão, e executa o fluxo de
+chamadas de uma avaliação (config → download → OpenAI → save) nos dois modos:
+- "antes": sem keep-alive (uma nova conexão por chamada, como no AsyncClient por chamada);
+- "depois": HttpClientPool compartilhado com keep-alive.
+
+Uso:
+    python bench_http_pool.py --evaluations 50 --concurrency 5 --handshake-ms 40
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_RESUME = (
+    "João Silva\nExperiência: 6 anos em vendas B2B\nFerramentas: Salesforce, Hubspot\n"
+    "Idiomas: Inglês avançado\n"
+).encode("utf-8")
+
+BENCH_COMPLETION = {
+    "score": 8,
+    "analysis": "Candidato aderente à etapa.",
+    "strengths": ["Vendas B2B", "CRM", "Inglês", "Experiência"],
+    "weaknesses": ["Gestão", "Métricas", "Liderança"],
+    "matched_requirements": ["Vendas", "CRM", "Inglês"],
+    "missing_requirements": [],
+}
+
+
+class StubServer:
+    """
+    Servidor HTTP/1.1 mínimo com keep-alive que imita os upstreams do serviço.
+    """
+
+    def __init__(self, handshake_ms: float, response_ms: float) -> None:
+        self.handshake_s = handshake_ms / 1000
+        self.response_s = response_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self.server: asyncio.AbstractServer | None = None
+        self.port = 0
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        # Simula o custo do handshake TCP+TLS de uma nova conexão
+        await asyncio.sleep(self.handshake_s)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode("latin-1").split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                if length:
+                    await reader.readexactly(length)
+
+                self.requests += 1
+                await asyncio.sleep(self.response_s)
+                status, body = self._route("GET" if method == "HEAD" else method, path)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                extra_headers = ""
+                if path.startswith("/storage/v1/object/"):
+                    extra_headers = f'ETag: "{hashlib.md5(body).hexdigest()}"\r\n'
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status}\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"{extra_headers}"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + (b"" if method == "HEAD" else body)
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str) -> tuple[str, bytes]:
+        if path.startswith("/rest/v1/rpc/get_ai_settings_by_user"):
+            record = {
+                "openai_api_key": base64.b64encode(b"sk-bench").decode(),
+                "model": "gpt-4o-mini",
+                "temperature": 0.3,
+                "max_tokens": 500,
+            }
+            return "200 OK", json.dumps([record]).encode()
+        if path.startswith("/storage/v1/object/"):
+            return "200 OK", BENCH_RESUME
+        if path.startswith("/v1/chat/completions"):
+            content = json.dumps(BENCH_COMPLETION, ensure_ascii=False)
+            return "200 OK", json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        if path.startswith("/rest/v1/rpc/save_stage_ai_runs_results"):
+            return "200 OK", b"1"
+        if method == "PATCH" and path.startswith("/rest/v1/stage_ai_runs"):
+            return "204 No Content", b""
+        return "404 Not Found", b"{}"
+
+
+async def run_evaluation(service, run_id: str) -> float:
+    started = time.perf_counter()
+    config = await service.get_user_ai_config("bench-user")
+    path = await service.download_file_from_storage("resumes/bench/resume.txt")
+    path.unlink(missing_ok=True)
+    evaluation = await service.analyze_candidate_with_openai(
+        BENCH_RESUME.decode("utf-8"),
+        "Vendas B2B com uso de CRM",
+        [{"label": "CRM", "description": "Salesforce", "weight": 1.0}],
+        config,
+    )
+    await service.save_runs_to_database([
+        {"run_id": run_id, "status": "succeeded", "result": {"score": evaluation.score}, "error": None, "finished_at": None}
+    ])
+    return time.perf_counter() - started
+
+
+async def run_mode(service, pool, evaluations: int, concurrency: int) -> list[float]:
+    service.http_pool = pool
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(idx: int) -> float:
+        async with semaphore:
+            return await run_evaluation(service, f"bench-{idx}")
+
+    try:
+        return await asyncio.gather(*(_one(idx) for idx in range(evaluations)))
+    finally:
+        await pool.aclose()
+
+
+def summarize(label: str, latencies: list[float], connections: int) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<8} n={len(ordered):<4} média={statistics.mean(ordered) * 1000:7.1f} ms "
+        f"p50={statistics.median(ordered) * 1000:7.1f} ms p95={p95 * 1000:7.1f} ms "
+        f"conexões={connections}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--evaluations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--handshake-ms", type=float, default=40.0, help="custo simulado de uma nova conexão")
+    parser.add_argument("--response-ms", type=float, default=5.0, help="latência simulada de cada resposta")
+    args = parser.parse_args()
+
+    stub = StubServer(args.handshake_ms, args.response_ms)
+    await stub.start()
+    base_url = f"http://127.0.0.1:{stub.port}"
+    os.environ.update({
+        "SUPABASE_URL": base_url,
+        "SUPABASE_STORAGE_URL": f"{base_url}/storage/v1",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "AI_HTTP2": "false",
+    })
+
+    # O serviço imprime logs detalhados; silenciados para não distorcer a medição
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main_enhanced as service
+        from http_clients import HttpClientPool, UpstreamLimits
+
+    pooled = HttpClientPool.from_env()
+    unpooled = HttpClientPool(
+        limits={
+            upstream: UpstreamLimits(limits.max_connections, max_keepalive_connections=0)
+            for upstream, limits in pooled.limits.items()
+        },
+        http2=False,
+    )
+
+    results = {}
+    for label, pool in (("antes", unpooled), ("depois", pooled)):
+        connections_before = stub.connections
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies = await run_mode(service, pool, args.evaluations, args.concurrency)
+        results[label] = (latencies, stub.connections - connections_before)
+
+    print(f"Stub: handshake={args.handshake_ms} ms, resposta={args.response_ms} ms, concorrência={args.concurrency}")
+    for label, (latencies, connections) in results.items():
+        summarize(label, latencies, connections)
+    await stub.stop()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DiskJSONCache:
+    """
+    Cache em disco de payloads JSON, um arquivo por chave, limitado em bytes com remoção LRU
+    (pelo mtime, atualizado a cada leitura) e TTL opcional. O diretório pode ser compartilhado
+    entre workers: as escritas são atômicas (os.replace).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._sizes: Optional[Dict[str, int]] = None
+
+    async def get_payload(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_payload_sync, key)
+
+    async def put_payload(self, keys: List[str], payload: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.put_payload_sync, keys, payload)
+
+    def get_payload_sync(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            if self.ttl_seconds is not None and time.time() - payload.get("stored_at", 0) > self.ttl_seconds:
+                self._remove(path)
+                self.misses += 1
+                return None
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload
+
+    def put_payload_sync(self, keys: List[str], payload: Dict[str, Any]) -> None:
+        data = json.dumps({**payload, "stored_at": time.time()}, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return
+        with self._lock:
+            sizes = self._load_sizes()
+            for key in dict.fromkeys(keys):
+                path = self._entry_path(key)
+                fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as handle:
+                        handle.write(data)
+                    os.replace(tmp_name, path)
+                except OSError:
+                    Path(tmp_name).unlink(missing_ok=True)
+                    continue
+                sizes[path.name] = len(data)
+            self._evict_locked(sizes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = self._load_sizes()
+            return {
+                "entries": len(sizes),
+                "bytes": sum(sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+            }
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remove(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
+        with self._lock:
+            if self._sizes is not None:
+                self._sizes.pop(path.name, None)
+
+    def _load_sizes(self) -> Dict[str, int]:
+        # Inicializado a partir do disco para considerar entradas gravadas por outros workers/execuções
+        if self._sizes is None:
+            self._sizes = {}
+            if self.directory.is_dir():
+                for path in self.directory.glob("*.json"):
+                    try:
+                        self._sizes[path.name] = path.stat().st_size
+                    except OSError:
+                        continue
+        return self._sizes
+
+    def _evict_locked(self, sizes: Dict[str, int]) -> None:
+        if sum(sizes.values()) <= self.max_bytes:
+            return
+
+        # Reavalia o disco: outros workers podem ter gravado ou removido entradas
+        entries: List[Tuple[float, str, int]] = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        sizes.clear()
+        sizes.update({name: size for _, name, size in entries})
+
+        total = sum(sizes.values())
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            (self.directory / name).unlink(missing_ok=True)
+            sizes.pop(name, None)
+            total -= size
+            self.evicted += 1
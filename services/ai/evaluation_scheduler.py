@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+
+class EvaluationScheduler:
+    """
+    Limita a concorrência das avaliações em background: um limite global
+    e um limite por usuário. Avaliações acima do limite aguardam na fila
+    (status "queued") até que um slot seja liberado.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_user_concurrency: int = 4) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._per_user: Dict[str, asyncio.Semaphore] = {}
+        self._per_user_refs: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.queued = 0
+        self.running = 0
+
+    @classmethod
+    def from_env(cls) -> "EvaluationScheduler":
+        return cls(
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENT_EVALUATIONS", "8")),
+            per_user_concurrency=int(os.getenv("AI_MAX_CONCURRENT_EVALUATIONS_PER_USER", "4")),
+        )
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str]) -> AsyncIterator[None]:
+        """
+        Aguarda um slot livre (primeiro do usuário, depois global) e o mantém durante o bloco.
+        """
+        user_key = user_id or "default"
+        user_semaphore = self._acquire_user_semaphore(user_key)
+        self.queued += 1
+        acquired_user = False
+        try:
+            # O slot do usuário vem antes do global para que a fila de um único usuário
+            # não ocupe slots globais enquanto espera pelo próprio limite
+            await user_semaphore.acquire()
+            acquired_user = True
+            await self._global.acquire()
+        except BaseException:
+            self.queued -= 1
+            if acquired_user:
+                user_semaphore.release()
+            self._release_user_semaphore(user_key)
+            raise
+
+        self.queued -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._global.release()
+            user_semaphore.release()
+            self._release_user_semaphore(user_key)
+
+    def submit(self, user_id: Optional[str], job: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """
+        Agenda a execução de job respeitando os limites. A referência da task é mantida
+        até o término para que não seja coletada pelo garbage collector.
+        """
+
+        async def _run() -> None:
+            async with self.slot(user_id):
+                await job()
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "per_user_concurrency": self.per_user_concurrency,
+            "active_users": len(self._per_user),
+        }
+
+    def _acquire_user_semaphore(self, user_key: str) -> asyncio.Semaphore:
+        semaphore = self._per_user.get(user_key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_user_concurrency)
+            self._per_user[user_key] = semaphore
+        self._per_user_refs[user_key] = self._per_user_refs.get(user_key, 0) + 1
+        return semaphore
+
+    def _release_user_semaphore(self, user_key: str) -> None:
+        refs = self._per_user_refs.get(user_key, 0) - 1
+        if refs <= 0:
+            self._per_user_refs.pop(user_key, None)
+            self._per_user.pop(user_key, None)
+        else:
+            self._per_user_refs[user_key] = refs
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+try:
+    from PyPDF2 import PdfReader  # type: ignore
+except ImportError:
+    PdfReader = None
+
+try:
+    import pypdfium2 as pdfium  # type: ignore
+except ImportError:
+    pdfium = None
+
+try:
+    import docx  # type: ignore
+except ImportError:
+    docx = None
+
+try:
+    import pytesseract  # type: ignore
+    from PIL import Image  # type: ignore
+except ImportError:
+    pytesseract = None
+    Image = None
+
+T = TypeVar("T")
+
+EXTRACTION_MODES = ("process", "thread")
+
+
+# Extratores síncronos (CPU-bound). Ficam no nível do módulo para que os workers
+# do ProcessPoolExecutor (start method "spawn") consigam importá-los. O módulo deve
+# continuar leve (só stdlib e os extratores): cada worker o importa ao iniciar.
+def iter_pdf_pages(path: Path) -> Iterator[Tuple[int, str]]:
+    """
+    Gera (índice, texto) de cada página lendo o PDF direto do arquivo (o PdfReader busca os
+    objetos no handle sob demanda, sem copiar o arquivo para a memória). Páginas sem texto
+    (ex.: digitalizadas) são geradas com texto vazio.
+    """
+    if PdfReader is None:
+        raise RuntimeError("Dependência PyPDF2 não instalada")
+
+    with open(path, "rb") as handle:
+        reader = PdfReader(handle)
+        for index, page in enumerate(reader.pages):
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+            yield index, text
+
+
+def collect_pdf_pages(path: Path, max_chars: int | None = None) -> Tuple[list[Tuple[int, str]], bool, list[int]]:
+    """
+    Texto de cada página até max_chars. Retorna ([(índice, texto)], truncado, páginas sem
+    texto); as páginas seguintes ao limite nem chegam a ser extraídas.
+    """
+    pages: list[Tuple[int, str]] = []
+    empty_pages: list[int] = []
+    total = 0
+    for index, text in iter_pdf_pages(path):
+        if not text.strip():
+            empty_pages.append(index)
+            continue
+        if max_chars is not None and total + len(text) > max_chars:
+            remaining = max_chars - total
+            if remaining > 0:
+                pages.append((index, text[:remaining]))
+            return pages, True, empty_pages
+        pages.append((index, text))
+        total += len(text) + 1
+    return pages, False, empty_pages
+
+
+def join_pdf_pages(pages: Iterable[Tuple[int, str]], max_chars: int | None = None) -> Tuple[str, bool]:
+    """
+    Junta as páginas na ordem do documento (pelo índice) dentro do limite de max_chars,
+    com o mesmo corte de collect_pdf_pages. Retorna (texto, truncado).
+    """
+    texts: list[str] = []
+    total = 0
+    for _, text in sorted(pages, key=lambda page: page[0]):
+        if max_chars is not None and total + len(text) > max_chars:
+            remaining = max_chars - total
+            if remaining > 0:
+                texts.append(text[:remaining])
+            return "\n".join(texts), True
+        texts.append(text)
+        total += len(text) + 1
+    return "\n".join(texts), False
+
+
+def collect_pdf_text(path: Path, max_chars: int | None = None) -> Tuple[str, bool, list[int]]:
+    """
+    Acumula o texto das páginas até max_chars. Retorna (texto, truncado, páginas sem texto).
+    """
+    pages, truncated, empty_pages = collect_pdf_pages(path, max_chars)
+    return "\n".join(text for _, text in pages), truncated, empty_pages
+
+
+def pdf_ocr_available() -> bool:
+    return pytesseract is not None and Image is not None and (pdfium is not None or PdfReader is not None)
+
+
+def ocr_pdf_page(path: Path, page_index: int, dpi: int = 200, timeout_seconds: float = 30.0) -> str:
+    """
+    OCR de uma página de PDF. Com pypdfium2 a página é rasterizada em dpi; sem ele,
+    usa as imagens embutidas na página (o caso típico de PDFs digitalizados).
+    O timeout encerra o processo do Tesseract, liberando o worker.
+    """
+    if pytesseract is None or Image is None:
+        raise RuntimeError("Dependências de OCR não instaladas")
+
+    images = []
+    if pdfium is not None:
+        document = pdfium.PdfDocument(str(path))
+        try:
+            page = document[page_index]
+            try:
+                images.append(page.render(scale=dpi / 72).to_pil())
+            finally:
+                page.close()
+        finally:
+            document.close()
+    elif PdfReader is not None:
+        with open(path, "rb") as handle:
+            page = PdfReader(handle).pages[page_index]
+            for embedded in page.images:
+                images.append(Image.open(io.BytesIO(embedded.data)))
+    else:
+        raise RuntimeError("Dependência PyPDF2 não instalada")
+
+    texts = []
+    for img in images:
+        try:
+            texts.append(pytesseract.image_to_string(img, timeout=timeout_seconds))
+        finally:
+            img.close()
+    return "\n".join(text for text in texts if text.strip())
+
+
+def read_docx_text(path: Path) -> str:
+    if docx is None:
+        raise RuntimeError("Dependência python-docx não instalada")
+
+    document = docx.Document(str(path))
+    paragraphs = [para.text for para in document.paragraphs if para.text]
+    return "\n".join(paragraphs)
+
+
+def read_image_text(path: Path) -> str:
+    if pytesseract is None or Image is None:
+        raise RuntimeError("Dependências de OCR não instaladas")
+
+    with Image.open(path) as img:
+        return pytesseract.image_to_string(img)
+
+
+class ExtractionEngine:
+    """
+    Executa os extratores CPU-bound fora do event loop. No modo "process" usa um
+    ProcessPoolExecutor (sem disputa pelo GIL entre avaliações concorrentes) cujos
+    workers são reciclados após max_tasks_per_child jobs, limitando vazamentos de
+    memória do PyPDF2/Tesseract. O modo "thread" mantém o asyncio.to_thread.
+
+    Cancelar run() (ex.: timeout do OCR) não interrompe um job que já começou: ele segue
+    ocupando o worker até terminar. Por isso as funções executadas devem ter limite próprio
+    de tempo (o OCR usa o timeout do Tesseract); os jobs abandonados em execução aparecem
+    em stats() (abandoned_running).
+    """
+
+    def __init__(
+        self,
+        mode: str = "process",
+        max_workers: Optional[int] = None,
+        max_tasks_per_child: int = 100,
+    ) -> None:
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(f"AI_EXTRACTION_MODE inválido: {mode} (use process ou thread)")
+        self.mode = mode
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_tasks_per_child = max(1, max_tasks_per_child)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.pool_restarts = 0
+        self.jobs_abandoned = 0
+        self.abandoned_running = 0
+        self._abandoned_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ExtractionEngine":
+        workers = os.getenv("AI_EXTRACTION_WORKERS")
+        return cls(
+            mode=os.getenv("AI_EXTRACTION_MODE", "process").strip().lower(),
+            max_workers=int(workers) if workers else None,
+            max_tasks_per_child=int(os.getenv("AI_EXTRACTION_MAX_TASKS_PER_CHILD", "100")),
+        )
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        try:
+            if self.mode == "thread":
+                result = await asyncio.to_thread(func, *args)
+            else:
+                job = self._get_executor().submit(func, *args)
+                try:
+                    result = await asyncio.wrap_future(job)
+                except asyncio.CancelledError:
+                    self._track_abandoned(job)
+                    raise
+        except BrokenProcessPool as e:
+            # Um worker morreu (ex.: OCR abortado pelo SO); o pool é recriado no próximo job
+            self.jobs_failed += 1
+            self._discard_executor()
+            raise RuntimeError("Processo de extração encerrado inesperadamente") from e
+        except BaseException:
+            self.jobs_failed += 1
+            raise
+        self.jobs_completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "pool_restarts": self.pool_restarts,
+            "jobs_abandoned": self.jobs_abandoned,
+            "abandoned_running": self.abandoned_running,
+        }
+
+    def _track_abandoned(self, job: Future) -> None:
+        # Job ainda na fila é cancelado de fato; em execução, segue no worker até terminar
+        if job.cancel() or job.done():
+            return
+        with self._abandoned_lock:
+            self.jobs_abandoned += 1
+            self.abandoned_running += 1
+
+        def _finished(_: Future) -> None:
+            with self._abandoned_lock:
+                self.abandoned_running -= 1
+
+        job.add_done_callback(_finished)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" evita herdar threads e conexões abertas do processo do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self._executor
+
+    def _discard_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.pool_restarts += 1
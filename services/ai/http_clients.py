@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+try:
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SUPABASE = "supabase"
+OPENAI = "openai"
+
+
+@dataclass
+class UpstreamLimits:
+    """
+    Limites de conexão de um upstream (Supabase ou OpenAI).
+    """
+
+    max_connections: int
+    max_keepalive_connections: int
+    keepalive_expiry: float = 30.0
+
+    def to_httpx(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class HttpClientPool:
+    """
+    Pool de httpx.AsyncClient compartilhados, um por upstream, reaproveitando
+    conexões (keep-alive/HTTP2) entre avaliações.
+    Deve ser fechado no encerramento da aplicação (lifespan).
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, UpstreamLimits],
+        http2: bool = True,
+    ) -> None:
+        self.limits = limits
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    @classmethod
+    def from_env(cls) -> "HttpClientPool":
+        keepalive_expiry = float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "30"))
+        return cls(
+            limits={
+                SUPABASE: UpstreamLimits(
+                    max_connections=int(os.getenv("AI_HTTP_SUPABASE_MAX_CONNECTIONS", "50")),
+                    max_keepalive_connections=int(os.getenv("AI_HTTP_SUPABASE_MAX_KEEPALIVE", "20")),
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                OPENAI: UpstreamLimits(
+                    max_connections=int(os.getenv("AI_HTTP_OPENAI_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("AI_HTTP_OPENAI_MAX_KEEPALIVE", "10")),
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            },
+            http2=os.getenv("AI_HTTP2", "true").lower() in ("1", "true", "yes", "y"),
+        )
+
+    def client(self, upstream: str) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            upstream_limits = self.limits[upstream]
+            client = httpx.AsyncClient(
+                limits=upstream_limits.to_httpx(),
+                http2=self.http2,
+            )
+            self._clients[upstream] = client
+        return client
+
+    @property
+    def supabase(self) -> httpx.AsyncClient:
+        return self.client(SUPABASE)
+
+    @property
+    def openai(self) -> httpx.AsyncClient:
+        return self.client(OPENAI)
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+def resolve_client(client: Optional[httpx.AsyncClient], pool: HttpClientPool, upstream: str) -> httpx.AsyncClient:
+    """
+    Retorna o cliente injetado ou, na ausência dele, o cliente compartilhado do pool.
+    """
+    return client if client is not None else pool.client(upstream)
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import boto3  # type: ignore
+except ImportError:  # pragma: no cover - dependência opcional (AI_JOB_QUEUE=sqs)
+    boto3 = None
+
+# Filas descritas em docs/JOBS.md
+SCORE_QUEUE = "ai-score-queue"
+TRANSCRIPTION_QUEUE = "ai-transcription-queue"
+
+
+@dataclass
+class QueueMessage:
+    """
+    Mensagem recebida da fila. receipt identifica esta entrega (muda a cada recebimento);
+    attempts conta as entregas, inclusive a atual.
+    """
+
+    receipt: str
+    job_id: str
+    body: Dict[str, Any]
+    attempts: int
+
+
+class JobQueue:
+    """
+    Interface das filas de jobs: entrega com visibility timeout (a mensagem volta para a
+    fila se não for removida a tempo), reagendamento com atraso e dead-letter.
+    """
+
+    name: str
+
+    def send(self, body: Dict[str, Any], delay_seconds: float = 0) -> None:
+        raise NotImplementedError
+
+    def receive(self, max_messages: int, visibility_timeout: float, wait_seconds: float = 0) -> List[QueueMessage]:
+        raise NotImplementedError
+
+    def delete(self, message: QueueMessage) -> None:
+        raise NotImplementedError
+
+    def change_visibility(self, message: QueueMessage, timeout_seconds: float) -> None:
+        """Estende a visibilidade durante o processamento ou reagenda uma retentativa."""
+        raise NotImplementedError
+
+    def dead_letter(self, message: QueueMessage, error: str) -> None:
+        """Move a mensagem para a DLQ da fila."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queue": self.name}
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Fila em arquivo SQLite (modo WAL) para desenvolvimento, testes e workers no mesmo host.
+    Envios com o mesmo job_id enquanto a mensagem está na fila são ignorados.
+    """
+
+    def __init__(self, path: str | Path, name: str = SCORE_QUEUE) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    visible_at REAL NOT NULL,
+                    receipt TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_queue_job_idx ON jobs (queue, job_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue_visible_idx ON jobs (queue, visible_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    error TEXT,
+                    failed_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def send(self, body: Dict[str, Any], delay_seconds: float = 0) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (queue, job_id, body, visible_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.name, body["job_id"], json.dumps(body, ensure_ascii=False, default=str), now + delay_seconds, now),
+            )
+
+    def receive(self, max_messages: int, visibility_timeout: float, wait_seconds: float = 0) -> List[QueueMessage]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            messages = self._receive_once(max_messages, visibility_timeout)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+
+    def _receive_once(self, max_messages: int, visibility_timeout: float) -> List[QueueMessage]:
+        now = time.time()
+        messages: List[QueueMessage] = []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, job_id, body, attempts FROM jobs WHERE queue = ? AND visible_at <= ? ORDER BY visible_at, id LIMIT ?",
+                (self.name, now, max_messages),
+            ).fetchall()
+            for row_id, job_id, body, attempts in rows:
+                receipt = f"{row_id}:{uuid.uuid4().hex}"
+                conn.execute(
+                    "UPDATE jobs SET attempts = attempts + 1, visible_at = ?, receipt = ? WHERE id = ?",
+                    (now + visibility_timeout, receipt, row_id),
+                )
+                messages.append(QueueMessage(receipt, job_id, json.loads(body), attempts + 1))
+        return messages
+
+    def delete(self, message: QueueMessage) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE receipt = ?", (message.receipt,))
+
+    def change_visibility(self, message: QueueMessage, timeout_seconds: float) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE receipt = ?",
+                (time.time() + timeout_seconds, message.receipt),
+            )
+
+    def dead_letter(self, message: QueueMessage, error: str) -> None:
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM jobs WHERE receipt = ?", (message.receipt,)).rowcount
+            if deleted:
+                conn.execute(
+                    "INSERT INTO dead_letters (queue, job_id, body, attempts, error, failed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        self.name,
+                        message.job_id,
+                        json.dumps(message.body, ensure_ascii=False, default=str),
+                        message.attempts,
+                        error,
+                        time.time(),
+                    ),
+                )
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT job_id, body, attempts, error, failed_at FROM dead_letters WHERE queue = ? ORDER BY id DESC LIMIT ?",
+            (self.name, limit),
+        ).fetchall()
+        return [
+            {"job_id": job_id, "body": json.loads(body), "attempts": attempts, "error": error, "failed_at": failed_at}
+            for job_id, body, attempts, error, failed_at in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connection()
+        now = time.time()
+        visible, in_flight = conn.execute(
+            "SELECT COALESCE(SUM(visible_at <= ?), 0), COALESCE(SUM(visible_at > ?), 0) FROM jobs WHERE queue = ?",
+            (now, now, self.name),
+        ).fetchone()
+        dead = conn.execute("SELECT COUNT(*) FROM dead_letters WHERE queue = ?", (self.name,)).fetchone()[0]
+        return {"queue": self.name, "visible": int(visible), "in_flight": int(in_flight), "dead_letters": int(dead)}
+
+
+class SQSJobQueue(JobQueue):
+    """
+    Fila no Amazon SQS (requer boto3). A DLQ é uma segunda fila; as mensagens que esgotam as
+    retentativas são enviadas a ela pelo worker e removidas da fila principal.
+    """
+
+    def __init__(self, queue_url: str, dlq_url: Optional[str] = None, name: str = SCORE_QUEUE) -> None:
+        if boto3 is None:
+            raise RuntimeError("AI_JOB_QUEUE=sqs requer o pacote boto3")
+        self.name = name
+        self.queue_url = queue_url
+        self.dlq_url = dlq_url
+        self._client = boto3.client("sqs")
+
+    def send(self, body: Dict[str, Any], delay_seconds: float = 0) -> None:
+        self._client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps(body, ensure_ascii=False, default=str),
+            DelaySeconds=int(min(900, max(0, delay_seconds))),
+        )
+
+    def receive(self, max_messages: int, visibility_timeout: float, wait_seconds: float = 0) -> List[QueueMessage]:
+        response = self._client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max(1, min(10, max_messages)),
+            VisibilityTimeout=int(visibility_timeout),
+            WaitTimeSeconds=int(min(20, wait_seconds)),
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+        messages: List[QueueMessage] = []
+        for raw in response.get("Messages", []):
+            try:
+                body = json.loads(raw["Body"])
+            except ValueError:
+                body = {"raw": raw["Body"]}
+            messages.append(
+                QueueMessage(
+                    receipt=raw["ReceiptHandle"],
+                    job_id=str(body.get("job_id") or raw["MessageId"]),
+                    body=body,
+                    attempts=int(raw.get("Attributes", {}).get("ApproximateReceiveCount", 1)),
+                )
+            )
+        return messages
+
+    def delete(self, message: QueueMessage) -> None:
+        self._client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=message.receipt)
+
+    def change_visibility(self, message: QueueMessage, timeout_seconds: float) -> None:
+        self._client.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=message.receipt,
+            VisibilityTimeout=int(min(43200, max(0, timeout_seconds))),
+        )
+
+    def dead_letter(self, message: QueueMessage, error: str) -> None:
+        if self.dlq_url:
+            self._client.send_message(
+                QueueUrl=self.dlq_url,
+                MessageBody=json.dumps({**message.body, "error": error, "attempts": message.attempts}, default=str),
+            )
+        self.delete(message)
+
+
+def create_job_queue_from_env(name: Optional[str] = None) -> JobQueue:
+    """
+    AI_JOB_QUEUE=sqlite (padrão; arquivo em AI_JOB_QUEUE_PATH) ou sqs (AI_JOB_QUEUE_URL e
+    AI_JOB_DLQ_URL). O nome da fila vem de AI_JOB_QUEUE_NAME (padrão: ai-score-queue).
+    """
+    backend = os.getenv("AI_JOB_QUEUE", "sqlite").lower()
+    queue_name = name or os.getenv("AI_JOB_QUEUE_NAME", SCORE_QUEUE)
+    if backend == "sqlite":
+        path = os.getenv("AI_JOB_QUEUE_PATH") or str(Path(tempfile.gettempdir()) / "smarthire_jobs.sqlite3")
+        return SQLiteJobQueue(path, name=queue_name)
+    if backend == "sqs":
+        queue_url = os.getenv("AI_JOB_QUEUE_URL")
+        if not queue_url:
+            raise ValueError("AI_JOB_QUEUE=sqs requer AI_JOB_QUEUE_URL")
+        return SQSJobQueue(queue_url, os.getenv("AI_JOB_DLQ_URL") or None, name=queue_name)
+    raise ValueError(f"AI_JOB_QUEUE inválido: {backend} (use sqlite ou sqs)")
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import signal
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from job_queue import JobQueue, QueueMessage, create_job_queue_from_env
+from run_store import InMemoryRunStore
+from structured_logging import configure_logging, get_logger, set_run_id
+
+logger = get_logger("job_worker")
+
+# handler(job_id, payload, created_at, attempt); exceções geram retentativa, PermanentJobError vai para a DLQ
+JobHandler = Callable[[str, Dict[str, Any], Optional[str], int], Awaitable[None]]
+# on_dead_letter(job_id, error): chamado quando o job desiste de vez (DLQ)
+DeadLetterCallback = Callable[[str, str], None]
+
+
+class PermanentJobError(Exception):
+    """
+    Falha que não se resolve com nova tentativa (payload inválido, tipo desconhecido):
+    a mensagem vai direto para a DLQ.
+    """
+
+
+class JobWorker:
+    """
+    Consome uma fila de jobs com concorrência limitada. Enquanto um job roda, a visibilidade
+    da mensagem é estendida periodicamente; falhas são reagendadas com backoff exponencial
+    até max_retries e depois vão para a DLQ, quando on_dead_letter é chamado. Jobs já
+    concluídos (is_processed) são apenas confirmados, o que torna reentregas idempotentes
+    por job_id.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        is_processed: Optional[Callable[[str], bool]] = None,
+        on_dead_letter: Optional[DeadLetterCallback] = None,
+        concurrency: int = 4,
+        visibility_timeout: float = 600.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 30.0,
+        retry_max_delay: float = 900.0,
+        poll_seconds: float = 5.0,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.is_processed = is_processed
+        self.on_dead_letter = on_dead_letter
+        self.concurrency = max(1, concurrency)
+        self.visibility_timeout = visibility_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.poll_seconds = poll_seconds
+        self.succeeded = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.duplicates = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        is_processed: Optional[Callable[[str], bool]] = None,
+        on_dead_letter: Optional[DeadLetterCallback] = None,
+    ) -> "JobWorker":
+        return cls(
+            queue,
+            handlers,
+            is_processed=is_processed,
+            on_dead_letter=on_dead_letter,
+            concurrency=int(os.getenv("AI_JOB_WORKER_CONCURRENCY", "4")),
+            visibility_timeout=float(os.getenv("AI_JOB_VISIBILITY_TIMEOUT_SECONDS", "600")),
+            max_retries=int(os.getenv("AI_JOB_MAX_RETRIES", "3")),
+            retry_base_delay=float(os.getenv("AI_JOB_RETRY_BASE_DELAY_SECONDS", "30")),
+            retry_max_delay=float(os.getenv("AI_JOB_RETRY_MAX_DELAY_SECONDS", "900")),
+            poll_seconds=float(os.getenv("AI_JOB_POLL_SECONDS", "5")),
+        )
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Recebe e processa mensagens até stop ser sinalizado; os jobs em andamento terminam
+        antes do retorno.
+        """
+        tasks: Set[asyncio.Task] = set()
+        logger.info("Worker iniciado", extra={"queue": self.queue.name, "concurrency": self.concurrency})
+        while not stop.is_set():
+            free = self.concurrency - len(tasks)
+            if free <= 0:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                messages = await asyncio.to_thread(
+                    self.queue.receive, free, self.visibility_timeout, self.poll_seconds
+                )
+            except Exception as e:
+                logger.error("Falha ao receber mensagens da fila", extra={"error": str(e)})
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            for message in messages:
+                task = asyncio.create_task(self.process(message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Worker encerrado", extra=self.stats())
+
+    async def process(self, message: QueueMessage) -> None:
+        set_run_id(message.job_id)
+        job_type = message.body.get("type")
+        try:
+            handler = self.handlers.get(job_type)
+            if handler is None:
+                raise PermanentJobError(f"Tipo de job desconhecido: {job_type}")
+            if self.is_processed is not None and await asyncio.to_thread(self.is_processed, message.job_id):
+                self.duplicates += 1
+                logger.info("Job já processado; confirmando reentrega", extra={"attempts": message.attempts})
+                await asyncio.to_thread(self.queue.delete, message)
+                return
+
+            heartbeat = asyncio.create_task(self._extend_visibility(message))
+            try:
+                await handler(
+                    message.job_id,
+                    message.body.get("payload") or {},
+                    message.body.get("created_at"),
+                    message.attempts,
+                )
+            finally:
+                heartbeat.cancel()
+        except PermanentJobError as e:
+            await self._dead_letter(message, str(e))
+        except Exception as e:
+            if message.attempts > self.max_retries:
+                await self._dead_letter(message, str(e))
+                return
+            delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (message.attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            self.retried += 1
+            logger.warning(
+                "Job falhou; nova tentativa agendada",
+                extra={"attempts": message.attempts, "retry_in_seconds": round(delay, 1), "error": str(e)},
+            )
+            await asyncio.to_thread(self.queue.change_visibility, message, delay)
+        else:
+            self.succeeded += 1
+            await asyncio.to_thread(self.queue.delete, message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "duplicates": self.duplicates,
+        }
+
+    async def _dead_letter(self, message: QueueMessage, error: str) -> None:
+        self.dead_lettered += 1
+        logger.error("Job enviado para a DLQ", extra={"attempts": message.attempts, "error": error})
+        await asyncio.to_thread(self.queue.dead_letter, message, error)
+        if self.on_dead_letter is not None:
+            try:
+                await asyncio.to_thread(self.on_dead_letter, message.job_id, error)
+            except Exception as e:
+                logger.warning("Falha ao registrar job na DLQ", extra={"error": str(e)})
+
+    async def _extend_visibility(self, message: QueueMessage) -> None:
+        interval = max(1.0, self.visibility_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.queue.change_visibility, message, self.visibility_timeout)
+            except Exception as e:
+                logger.warning("Falha ao estender a visibilidade do job", extra={"error": str(e)})
+
+
+def build_evaluation_handlers(service) -> Dict[str, JobHandler]:
+    """
+    Handlers dos jobs de avaliação ("score", docs/JOBS.md) sobre o módulo do serviço
+    (main_enhanced). O run usa o job_id como id, inclusive quando já foi criado pela API.
+    Uma tentativa que falha deixa o run em "retrying" (não terminal); "failed" só é gravado
+    quando o job vai para a DLQ (mark_evaluation_dead_lettered).
+    """
+    from pydantic import ValidationError
+
+    async def handle_score(
+        job_id: str,
+        payload: Dict[str, Any],
+        created_at: Optional[str] = None,
+        attempt: int = 1,
+    ) -> None:
+        try:
+            request = service.EvaluateRequest(**payload)
+        except ValidationError as e:
+            raise PermanentJobError(f"Payload de avaliação inválido: {e}") from e
+
+        # Espera na fila (relógio de parede de quem publicou) convertida para time.monotonic()
+        enqueued_at = None
+        if created_at:
+            try:
+                waited = time.time() - datetime.fromisoformat(created_at).timestamp()
+                enqueued_at = time.monotonic() - max(0.0, waited)
+            except ValueError:
+                pass
+
+        if await service.run_store.aget(job_id) is None:
+            await service.run_store.acreate({
+                "id": job_id,
+                "type": "evaluate",
+                "status": "queued",
+                "progress": 0,
+                "result": None,
+            })
+        await service.run_store.aupdate(job_id, attempts=attempt)
+        async with service.evaluation_scheduler.slot(request.user_id):
+            await service.process_evaluation(job_id, request, enqueued_at=enqueued_at, retry_on_error=True)
+
+    return {"score": handle_score}
+
+
+def mark_evaluation_dead_lettered(service) -> DeadLetterCallback:
+    """
+    Callback da DLQ: o run da avaliação passa a "failed" com o último erro.
+    """
+
+    def _mark(job_id: str, error: str) -> None:
+        record = service.run_store.get(job_id)
+        if record is None or record.get("status") == "succeeded":
+            return
+        service.run_store.update(
+            job_id,
+            status="failed",
+            error=error,
+            finished_at=datetime.now().isoformat(),
+        )
+        service.RUNS_TOTAL.inc(type="evaluate", status="failed")
+
+    return _mark
+
+
+async def main() -> None:
+    import main_enhanced as service
+
+    if isinstance(service.run_store, InMemoryRunStore):
+        # Os runs atualizados aqui precisam ser vistos pela API; em memória ficariam só neste processo
+        raise ValueError("job_worker.py exige um RunStore compartilhado (AI_RUN_STORE=sqlite)")
+
+    configure_logging()
+    queue = create_job_queue_from_env()
+    worker = JobWorker.from_env(
+        queue,
+        build_evaluation_handlers(service),
+        is_processed=lambda job_id: (service.run_store.get(job_id) or {}).get("status") == "succeeded",
+        on_dead_letter=mark_evaluation_dead_lettered(service),
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: sem add_signal_handler, o Ctrl+C interrompe o loop diretamente
+            pass
+
+    # Mesmo ciclo de vida do servidor HTTP: pools, gravação em lote e extração
+    async with service.lifespan(service.app):
+        await worker.run(stop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
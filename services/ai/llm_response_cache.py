@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+from disk_cache import DiskJSONCache
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Parâmetros do payload de chat/completions que influenciam a resposta
+_KEY_PARAMS = ("model", "temperature", "max_tokens", "response_format", "top_p", "seed")
+
+
+def cache_scope(user_id: Optional[str], api_key: str) -> str:
+    """
+    Identidade do dono da resposta: usuário mais impressão digital (SHA-256 truncado) da
+    chave da OpenAI usada. Respostas de um usuário ou chave nunca atendem outro.
+    """
+    fingerprint = hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()[:16]
+    return f"{user_id or 'default'}:{fingerprint}"
+
+
+def response_key(payload: Dict[str, Any], scope: str) -> str:
+    """
+    Hash do escopo (cache_scope), do prompt renderizado (mensagens com espaços normalizados)
+    e dos parâmetros do modelo. Prompts que diferem apenas em espaçamento compartilham a
+    mesma entrada dentro do mesmo escopo.
+    """
+    normalized = {
+        "scope": scope,
+        "messages": [
+            {"role": message.get("role"), "content": _WHITESPACE_RE.sub(" ", str(message.get("content", ""))).strip()}
+            for message in payload.get("messages", [])
+        ],
+        **{param: payload[param] for param in _KEY_PARAMS if param in payload},
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache(DiskJSONCache):
+    """
+    Cache em disco das respostas de chat/completions (conteúdo da mensagem), com TTL.
+    """
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """
+        Cria o cache configurado no ambiente; retorna None quando AI_LLM_CACHE=false ou quando
+        AI_LLM_CACHE_DIR não está definido (as respostas contêm dados dos candidatos e não vão
+        para o diretório temporário compartilhado).
+        """
+        if os.getenv("AI_LLM_CACHE", "true").lower() not in ("1", "true", "yes", "y"):
+            return None
+        directory = os.getenv("AI_LLM_CACHE_DIR", "").strip()
+        if not directory:
+            return None
+        return cls(
+            directory,
+            max_bytes=int(os.getenv("AI_LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("AI_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        payload = await self.get_payload(key)
+        if payload is None:
+            return None
+        content = payload.get("content")
+        return content if isinstance(content, str) else None
+
+    async def put(self, key: str, content: str, model: str | None = None) -> None:
+        await self.put_payload([key], {"content": content, "model": model})
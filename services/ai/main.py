@@ -1,13 +1,16 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uuid
 import asyncio
 import json
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 import os
 from dotenv import load_dotenv
 import logging
-from transcript_analysis import analyze_transcript_content
+from transcript_analysis import analyze_transcript_content, close_default_openai_transport
+from run_store import RunStoreFullError, create_run_store_from_env, sweep_periodically
 
 # Carregar variáveis de ambiente com tolerância a erros (ex.: arquivo .env com codificação inválida)
 try:
@@ -23,12 +26,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Armazenamento dos runs (AI_RUN_STORE=memory | sqlite; sqlite é compartilhado entre workers)
+run_store = create_run_store_from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Varredura periódica da política de retenção dos runs
+    sweeper = asyncio.create_task(sweep_periodically(run_store))
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        # Pool HTTP compartilhado pelas análises de transcrição
+        await close_default_openai_transport()
+
 app = FastAPI(
     title="SmartHire AI Service",
     version="0.1.0",
-    description="Serviço de IA para processamento de áudio, transcrição e avaliação de candidatos"
+    description="Serviço de IA para processamento de áudio, transcrição e avaliação de candidatos",
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(RunStoreFullError)
+async def run_store_full_handler(request, exc: RunStoreFullError):
+    # Todos os runs armazenados estão em andamento: o cliente deve tentar novamente mais tarde
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "30"})
+
 # Adicionar CORS middleware para produção
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -43,9 +67,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Armazenamento em memória dos runs (em produção, usar Redis/DB)
-runs: Dict[str, Dict[str, Any]] = {}
-
 class TranscribeRequest(BaseModel):
     audio_path: str
     language: str | None = None
@@ -159,13 +180,13 @@ async def transcribe(request: TranscribeRequest):
     run_id = str(uuid.uuid4())
     logger.info(f"Iniciando transcrição {run_id} para arquivo: {request.audio_path}")
 
-    runs[run_id] = {
+    await run_store.acreate({
         "id": run_id,
         "type": "transcribe",
         "status": "running",
         "progress": 0,
         "result": None
-    }
+    })
 
     # Processa em background
     asyncio.create_task(process_transcription(run_id, request.audio_path))
@@ -175,29 +196,26 @@ async def transcribe(request: TranscribeRequest):
 async def process_transcription(run_id: str, audio_path: str):
     try:
         logger.info(f"Processando transcrição {run_id}")
-        runs[run_id]["progress"] = 50
+        await run_store.aupdate(run_id, progress=50)
         transcript = await process_audio(audio_path)
-        runs[run_id]["status"] = "succeeded"
-        runs[run_id]["progress"] = 100
-        runs[run_id]["result"] = {"transcript": transcript}
+        await run_store.aupdate(run_id, status="succeeded", progress=100, result={"transcript": transcript})
         logger.info(f"Transcrição {run_id} concluída com sucesso")
     except Exception as e:
         logger.error(f"Erro na transcrição {run_id}: {str(e)}")
-        runs[run_id]["status"] = "failed"
-        runs[run_id]["error"] = str(e)
+        await run_store.aupdate(run_id, status="failed", error=str(e))
 
 @app.post("/v1/evaluate", response_model=RunStatus)
 async def evaluate(request: EvaluateRequest):
     run_id = str(uuid.uuid4())
     logger.info(f"Iniciando avaliação {run_id} para stage {request.stage_id}, application {request.application_id}")
 
-    runs[run_id] = {
+    await run_store.acreate({
         "id": run_id,
         "type": "evaluate",
         "status": "running",
         "progress": 0,
         "result": None
-    }
+    })
 
     # Processa em background
     asyncio.create_task(process_evaluation(run_id, request))
@@ -207,21 +225,21 @@ async def evaluate(request: EvaluateRequest):
 async def process_evaluation(run_id: str, request: EvaluateRequest):
     try:
         logger.info(f"Processando avaliação {run_id}")
-        runs[run_id]["progress"] = 20
+        await run_store.aupdate(run_id, progress=20)
         
         # Coleta conteúdo de texto
         text_content = ""
         
         if request.resume_path:
-            runs[run_id]["progress"] = 40
+            await run_store.aupdate(run_id, progress=40)
             text_content += await extract_pdf_text(request.resume_path) + "\n\n"
         
         if request.audio_path:
-            runs[run_id]["progress"] = 60
+            await run_store.aupdate(run_id, progress=60)
             text_content += await process_audio(request.audio_path) + "\n\n"
         
         if request.transcript_path:
-            runs[run_id]["progress"] = 80
+            await run_store.aupdate(run_id, progress=80)
             text_content += await analyze_transcript(request.transcript_path) + "\n\n"
         
         # Simula busca de configuração da etapa (em produção, buscar do DB)
@@ -233,7 +251,7 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
         ]
         
         # Análise da IA
-        runs[run_id]["progress"] = 90
+        await run_store.aupdate(run_id, progress=90)
         
         if request.transcript_text or request.transcript_path:
             # Se houver transcrição (texto ou path), usa a análise específica de transcrição
@@ -255,9 +273,7 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
             
             evaluation_dict = await analyze_transcript_content(content_to_analyze, stage_description, requirements)
             
-            runs[run_id]["status"] = "succeeded"
-            runs[run_id]["progress"] = 100
-            runs[run_id]["result"] = {
+            await run_store.aupdate(run_id, status="succeeded", progress=100, result={
                 "score": evaluation_dict["score"],
                 "analysis": evaluation_dict["analysis"],
                 "matched_requirements": evaluation_dict["matched_requirements"],
@@ -266,36 +282,33 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
                 "weaknesses": evaluation_dict["weaknesses"],
                 "stage_id": request.stage_id,
                 "application_id": request.application_id
-            }
+            })
             logger.info(f"Avaliação de transcrição {run_id} concluída - Score: {evaluation_dict['score']}")
             
         else:
             # Fallback para análise padrão (currículo/audio simulado)
             evaluation = await analyze_candidate(text_content, stage_description, requirements)
             
-            runs[run_id]["status"] = "succeeded"
-            runs[run_id]["progress"] = 100
-            runs[run_id]["result"] = {
+            await run_store.aupdate(run_id, status="succeeded", progress=100, result={
                 "score": evaluation.score,
                 "analysis": evaluation.analysis,
                 "matched_requirements": evaluation.matched_requirements,
                 "missing_requirements": evaluation.missing_requirements,
                 "stage_id": request.stage_id,
                 "application_id": request.application_id
-            }
+            })
             logger.info(f"Avaliação {run_id} concluída com sucesso - Score: {evaluation.score}")
 
     except Exception as e:
         logger.error(f"Erro na avaliação {run_id}: {str(e)}")
-        runs[run_id]["status"] = "failed"
-        runs[run_id]["error"] = str(e)
+        await run_store.aupdate(run_id, status="failed", error=str(e))
 
 @app.get("/v1/runs/{run_id}", response_model=RunStatus)
 async def get_run(run_id: str):
-    if run_id not in runs:
+    run_data = await run_store.aget(run_id)
+    if run_data is None:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    run_data = runs[run_id]
     return RunStatus(
         id=run_data["id"],
         type=run_data["type"],
@@ -308,4 +321,8 @@ async def get_run(run_id: str):
 # Endpoint de saúde
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "runs_active": len([r for r in runs.values() if r["status"] == "running"])}
+    return {
+        "status": "healthy",
+        "runs_active": await asyncio.to_thread(run_store.count, "running"),
+        "runs_evicted_total": run_store.evicted_total(),
+    }
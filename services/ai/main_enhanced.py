@@ -1,21 +1,64 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import uuid
 import asyncio
+import time
 import json
-import io
 import base64
 import httpx
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Optional, Tuple
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 import tempfile
+from contextlib import asynccontextmanager, contextmanager
 from urllib.parse import urlparse
 import base64
 import os
 from dotenv import load_dotenv, dotenv_values
 from resume_analysis_utils import prepare_structured_analysis
+from run_store import InMemoryRunStore, RunStoreFullError, create_run_store_from_env, sweep_periodically
+from http_clients import OPENAI, SUPABASE, HttpClientPool, resolve_client
+from ai_config_cache import AsyncTTLCache
+from evaluation_scheduler import EvaluationScheduler
+from job_queue import create_job_queue_from_env
+from transcription import AudioTranscriber
+from transcript_analysis import analyze_transcript_content, make_openai_json_completer
+from transcript_index import (
+    TranscriptIndexCache,
+    build_transcript_index,
+    parse_transcript_json,
+    render_turns,
+    transcript_json_to_text,
+)
+from extraction_engine import (
+    ExtractionEngine,
+    collect_pdf_pages,
+    join_pdf_pages,
+    ocr_pdf_page,
+    pdf_ocr_available,
+    read_docx_text,
+    read_image_text,
+)
+from text_compaction import CHARS_PER_TOKEN, CompactionStats, compact_text, estimate_tokens, extract_terms
+from openai_rate_limit import OpenAIRateLimiter, RetryableOpenAIError, post_chat_completion
+from llm_response_cache import LLMResponseCache, cache_scope as llm_cache_scope, response_key as llm_response_key
+from resume_text_cache import (
+    CachedResumeText,
+    ResumeTextCache,
+    content_key as resume_content_key,
+    file_sha256,
+    object_key as resume_object_key,
+)
+from structured_logging import configure_logging, log_payload, set_run_id
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from run_profile import profile_add, profile_set, profile_span, start_profile
+from run_events import RunEventBroker, stream_run_events
+from result_writer import ResultWriteBehind
+
+logger = configure_logging().getChild("service")
+
 # Carregamento seguro de variáveis de ambiente
 def load_environment_variables():
     """
@@ -25,7 +68,7 @@ def load_environment_variables():
         # Verificar se arquivo .env existe
         env_file = Path(".env")
         if env_file.exists():
-            print(f"[IA] Arquivo .env encontrado: {env_file.absolute()}")
+            logger.info("Arquivo .env encontrado", extra={"path": str(env_file.absolute())})
             try:
                 # Tentar diferentes encodings (inclui UTF-16/UTF-32)
                 encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'utf-16', 'utf-16-le', 'utf-16-be', 'utf-32', 'utf-32-le', 'utf-32-be']
@@ -35,19 +78,18 @@ def load_environment_variables():
                     try:
                         result = load_dotenv(encoding=encoding)
                         if result:
-                            print(f"[IA] ✅ .env carregado com sucesso usando encoding: {encoding}")
+                            logger.info(".env carregado", extra={"encoding": encoding})
                             loaded = True
                             break
                     except UnicodeDecodeError:
-                        print(f"[IA] ❌ Falha com encoding {encoding}, tentando próximo...")
+                        logger.debug("Falha ao ler .env; tentando próximo encoding", extra={"encoding": encoding})
                         continue
                     except Exception as e:
-                        print(f"[IA] ❌ Erro com encoding {encoding}: {e}")
+                        logger.warning("Erro ao carregar .env", extra={"encoding": encoding, "error": str(e)})
                         break
 
                 if not loaded:
-                    print(f"[IA] ❌ Não foi possível carregar .env com nenhum encoding")
-                    print(f"[IA] 🔄 Tentando carregar manualmente...")
+                    logger.warning("Não foi possível carregar .env com nenhum encoding; tentando carregar manualmente")
 
                     # Tentar carregar manualmente com diferentes encodings e via dotenv_values
                     manual_loaded = False
@@ -60,9 +102,9 @@ def load_environment_variables():
                                 if k and v is not None and os.getenv(k) is None:
                                     os.environ[k] = str(v)
                             manual_loaded = True
-                            print(f"[IA] ✅ .env carregado via dotenv_values")
+                            logger.info(".env carregado via dotenv_values")
                     except Exception as e:
-                        print(f"[IA] ❌ dotenv_values falhou: {e}")
+                        logger.warning("dotenv_values falhou", extra={"error": str(e)})
 
                     # 2) Parsing manual
                     if not manual_loaded:
@@ -85,81 +127,261 @@ def load_environment_variables():
                                         if key and os.getenv(key) is None:
                                             os.environ[key] = value
                                     manual_loaded = True
-                                    print(f"[IA] ✅ .env carregado manualmente com encoding: {encoding}")
+                                    logger.info(".env carregado manualmente", extra={"encoding": encoding})
                                     break
                             except UnicodeDecodeError:
-                                print(f"[IA] ❌ Falha no carregamento manual com {encoding}: UnicodeDecodeError")
+                                logger.debug("Falha no carregamento manual do .env", extra={"encoding": encoding, "error": "UnicodeDecodeError"})
                                 continue
                             except Exception as e:
-                                print(f"[IA] ❌ Falha no carregamento manual com {encoding}: {e}")
+                                logger.debug("Falha no carregamento manual do .env", extra={"encoding": encoding, "error": str(e)})
                                 continue
 
                     if not manual_loaded:
-                        print(f"[IA] ❌ Não foi possível carregar .env manualmente")
-                        print(f"[IA] ⚠️ Continuando sem carregar .env")
+                        logger.warning("Não foi possível carregar .env manualmente; continuando sem .env")
                         return False
 
                 return True
 
             except ImportError:
-                print(f"[IA] ❌ python-dotenv não instalado")
-                print(f"[IA] ⚠️ Continuando sem carregar .env")
+                logger.warning("python-dotenv não instalado; continuando sem .env")
                 return False
             except Exception as e:
-                print(f"[IA] ❌ Erro ao carregar .env: {e}")
-                print(f"[IA] ⚠️ Continuando sem carregar .env")
+                logger.warning("Erro ao carregar .env; continuando sem .env", extra={"error": str(e)})
                 return False
         else:
-            print(f"[IA] Arquivo .env não encontrado em: {env_file.absolute()}")
-            print(f"[IA] ⚠️ Usando apenas variáveis de ambiente do sistema")
+            logger.info("Arquivo .env não encontrado; usando apenas variáveis de ambiente do sistema", extra={"path": str(env_file.absolute())})
             return False
     except Exception as e:
-        print(f"[IA] ❌ Erro crítico no carregamento de variáveis: {e}")
+        logger.error("Erro crítico no carregamento de variáveis", extra={"error": str(e)})
         return False
 
-print("[IA] ========== INICIANDO CARREGAMENTO DE VARIÁVEIS ==========")
 env_loaded = load_environment_variables()
+# Reaplica AI_LOG_* caso tenham vindo do .env
+logger = configure_logging().getChild("service")
 
 # Verificar se as variáveis foram carregadas
 supabase_url = os.getenv("SUPABASE_URL")
 service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 storage_url = os.getenv("SUPABASE_STORAGE_URL")
 
-print(f"[IA] ========== STATUS DAS VARIÁVEIS ==========")
-print(f"[IA] SUPABASE_URL carregada: {bool(supabase_url)}")
-print(f"[IA] SUPABASE_SERVICE_ROLE_KEY carregada: {bool(service_role)}")
-print(f"[IA] SUPABASE_STORAGE_URL carregada: {bool(storage_url)}")
+logger.info(
+    "Variáveis de ambiente carregadas",
+    extra={
+        "supabase_url": bool(supabase_url),
+        "supabase_service_role_key": bool(service_role),
+        "supabase_storage_url": bool(storage_url),
+    },
+)
 
 # Verificar variáveis críticas
 if not supabase_url:
-    print(f"[IA] ❌ SUPABASE_URL não configurada - verifique seu arquivo .env ou variáveis de ambiente")
+    logger.error("SUPABASE_URL não configurada - verifique seu arquivo .env ou variáveis de ambiente")
 if not service_role:
-    print(f"[IA] ❌ SUPABASE_SERVICE_ROLE_KEY não configurada - verifique seu arquivo .env ou variáveis de ambiente")
+    logger.error("SUPABASE_SERVICE_ROLE_KEY não configurada - verifique seu arquivo .env ou variáveis de ambiente")
 
-try:
-    from PyPDF2 import PdfReader  # type: ignore
-except ImportError:
-    PdfReader = None
+SUPPORTED_RESUME_EXTENSIONS = {".pdf", ".docx", ".doc", ".txt"}
+SUPPORTED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+OPENAI_API_BASE = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+# Análise de transcrições por janelas: modelo (vazio = o da configuração do usuário) e limite de saída por janela
+TRANSCRIPT_MODEL = os.getenv("AI_TRANSCRIPT_MODEL", "").strip()
+TRANSCRIPT_MAX_TOKENS = int(os.getenv("AI_TRANSCRIPT_MAX_TOKENS", "1200"))
+# Peso da nota da entrevista na nota final quando há currículo e transcrição (0..1)
+TRANSCRIPT_SCORE_WEIGHT = min(1.0, max(0.0, float(os.getenv("AI_TRANSCRIPT_SCORE_WEIGHT", "0.5"))))
+OPENAI_MAX_RETRIES = int(os.getenv("AI_OPENAI_MAX_RETRIES", "4"))
+OPENAI_MAX_RETRY_WAIT_SECONDS = float(os.getenv("AI_OPENAI_MAX_RETRY_WAIT_SECONDS", "60"))
+
+# Downloads do Storage (streaming em disco com limite de tamanho)
+MAX_DOWNLOAD_BYTES = int(os.getenv("AI_MAX_DOWNLOAD_BYTES", str(50 * 1024 * 1024)))
+AUDIO_MAX_DOWNLOAD_BYTES = int(os.getenv("AI_AUDIO_MAX_DOWNLOAD_BYTES", str(500 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Orçamento de texto extraído de PDFs (estimativa de ~4 caracteres por token)
+RESUME_PDF_MAX_TOKENS = int(os.getenv("AI_RESUME_PDF_MAX_TOKENS", "12000"))
+
+# OCR de PDFs digitalizados (páginas sem texto), em paralelo no ExtractionEngine
+OCR_PDF_MAX_PAGES = int(os.getenv("AI_OCR_PDF_MAX_PAGES", "5"))
+OCR_PDF_DPI = int(os.getenv("AI_OCR_PDF_DPI", "200"))
+OCR_PAGE_TIMEOUT_SECONDS = float(os.getenv("AI_OCR_PAGE_TIMEOUT_SECONDS", "30"))
+OCR_PDF_TIMEOUT_SECONDS = float(os.getenv("AI_OCR_PDF_TIMEOUT_SECONDS", "90"))
+
+# Orçamento do texto do candidato enviado ao LLM (após compactação)
+PROMPT_TEXT_MAX_TOKENS = int(os.getenv("AI_PROMPT_TEXT_MAX_TOKENS", "6000"))
+
+# Avaliação em lote
+BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "5"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("AI_BATCH_MAX_CONCURRENCY", "20"))
+BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "1000"))
+BATCH_PROGRESS_INTERVAL_SECONDS = 1.0
+
+# Intervalo sem notificações após o qual o stream SSE relê o run do store e envia keep-alive
+SSE_POLL_INTERVAL_SECONDS = float(os.getenv("AI_SSE_POLL_INTERVAL_SECONDS", "15"))
+
+# Armazenamento dos runs (AI_RUN_STORE=memory | sqlite; sqlite é compartilhado entre workers)
+run_store = create_run_store_from_env()
+
+# Atualizações dos runs entregues aos streams SSE (/v1/runs/{id}/events) deste processo
+run_events = RunEventBroker()
+run_store.add_listener(run_events.publish)
+
+# Clientes HTTP compartilhados (um pool de conexões por upstream)
+http_pool = HttpClientPool.from_env()
+
+# Cache das configurações de IA por usuário (invalidação via /v1/ai-config/invalidate)
+ai_config_cache = AsyncTTLCache(
+    max_entries=int(os.getenv("AI_CONFIG_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("AI_CONFIG_CACHE_TTL_SECONDS", "300")),
+)
+
+# Limites de concorrência das avaliações em background (global e por usuário)
+evaluation_scheduler = EvaluationScheduler.from_env()
+
+# AI_EVALUATION_MODE=queue: /v1/evaluate publica um job "score" na fila (docs/JOBS.md),
+# consumido por job_worker.py; inline (padrão) avalia neste processo
+EVALUATION_MODE = os.getenv("AI_EVALUATION_MODE", "inline").lower()
+job_queue = create_job_queue_from_env() if EVALUATION_MODE == "queue" else None
+if job_queue is not None and isinstance(run_store, InMemoryRunStore):
+    # API e workers precisam enxergar os mesmos runs; em memória eles ficariam em "queued" para sempre
+    raise ValueError("AI_EVALUATION_MODE=queue exige um RunStore compartilhado (AI_RUN_STORE=sqlite)")
+
+# Extração CPU-bound (PDF/DOCX/OCR) em pool de processos (AI_EXTRACTION_MODE=process | thread)
+extraction_engine = ExtractionEngine.from_env()
+
+# Limites de requisições/tokens da OpenAI por chave de API (token bucket + headers x-ratelimit-*)
+openai_rate_limiter = OpenAIRateLimiter.from_env()
+
+# Cache em disco das respostas do LLM (None quando AI_LLM_CACHE=false)
+llm_response_cache = LLMResponseCache.from_env()
+
+# Transcrição de áudio (AI_TRANSCRIBE_BACKEND=local | remote), em chunks paralelos
+audio_transcriber = AudioTranscriber.from_env(lambda: http_pool.openai)
+
+# Totais da compactação do texto enviado ao LLM
+compaction_stats = CompactionStats()
+
+# Cache em disco do texto extraído dos currículos (None quando AI_RESUME_CACHE=false)
+resume_text_cache = ResumeTextCache.from_env()
+
+# Cache em disco dos índices de locutores das transcrições (None quando AI_TRANSCRIPT_INDEX_CACHE=false)
+transcript_index_cache = TranscriptIndexCache.from_env()
+
+# Métricas do processo expostas em /metrics (formato Prometheus)
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "smarthire_stage_duration_seconds",
+    "Duração das etapas da avaliação (queue_wait, storage_head, download, extraction, audio, transcript, config, compaction, llm, transcript_index, transcript_analysis)",
+    ["stage"],
+)
+RUN_SECONDS = metrics.histogram("smarthire_run_duration_seconds", "Duração total dos runs", ["type"])
+RUNS_TOTAL = metrics.counter("smarthire_runs_total", "Runs finalizados por tipo e status", ["type", "status"])
+LLM_CALLS_TOTAL = metrics.counter(
+    "smarthire_llm_calls_total",
+    "Análises por origem da resposta (api, cache, simulated)",
+    ["source"],
+)
+OPENAI_TOKENS_TOTAL = metrics.counter(
+    "smarthire_openai_tokens_total",
+    "Tokens consumidos na OpenAI (campo usage das respostas)",
+    ["model", "kind"],
+)
+OPENAI_RETRIES_TOTAL = metrics.counter("smarthire_openai_retries_total", "Retentativas de chamadas à OpenAI")
+DB_FLUSH_SECONDS = metrics.histogram(
+    "smarthire_db_flush_duration_seconds",
+    "Duração de cada gravação em lote dos resultados em stage_ai_runs",
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Mede uma etapa no histograma do processo e no perfil do run atual (result.timings).
+    """
+    with STAGE_SECONDS.time(stage=stage), profile_span(stage):
+        yield
 
-try:
-    import docx  # type: ignore
-except ImportError:
-    docx = None
 
-try:
-    import pytesseract  # type: ignore
-    from PIL import Image  # type: ignore
-except ImportError:
-    pytesseract = None
-    Image = None
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    caches = {
+        "ai_config": ai_config_cache,
+        "resume_text": resume_text_cache,
+        "transcript_index": transcript_index_cache,
+        "llm_response": llm_response_cache,
+    }
+    return {name: cache.stats() for name, cache in caches.items() if cache is not None}
+
+
+metrics.gauge_callback("smarthire_queue_depth", "Avaliações aguardando slot no scheduler", lambda: evaluation_scheduler.queued)
+metrics.gauge_callback("smarthire_evaluations_running", "Avaliações em execução", lambda: evaluation_scheduler.running)
+metrics.counter_callback(
+    "smarthire_cache_hits_total",
+    "Acertos dos caches",
+    lambda: {(name,): stats["hits"] for name, stats in _cache_stats().items()},
+    ["cache"],
+)
+metrics.counter_callback(
+    "smarthire_cache_misses_total",
+    "Falhas dos caches",
+    lambda: {(name,): stats["misses"] for name, stats in _cache_stats().items()},
+    ["cache"],
+)
+metrics.counter_callback(
+    "smarthire_openai_throttled_seconds_total",
+    "Tempo aguardando o rate limiter da OpenAI",
+    lambda: openai_rate_limiter.throttled_seconds,
+)
+metrics.counter_callback(
+    "smarthire_extraction_jobs_total",
+    "Jobs de extração por resultado",
+    lambda: {("completed",): extraction_engine.jobs_completed, ("failed",): extraction_engine.jobs_failed},
+    ["outcome"],
+)
+metrics.counter_callback(
+    "smarthire_compaction_tokens_saved_total",
+    "Tokens removidos pela compactação antes do LLM",
+    lambda: compaction_stats.stats()["tokens_saved"],
+)
+metrics.counter_callback(
+    "smarthire_db_rows_total",
+    "Resultados gravados no banco, enviados ao spool e reenviados do spool",
+    lambda: {
+        ("written",): result_writer.rows_written,
+        ("spooled",): result_writer.rows_spooled,
+        ("replayed",): result_writer.rows_replayed,
+    },
+    ["outcome"],
+)
+metrics.counter_callback(
+    "smarthire_transcribed_audio_seconds_total",
+    "Segundos de áudio transcritos",
+    lambda: audio_transcriber.audio_seconds,
+)
+metrics.gauge_callback("smarthire_db_rows_pending", "Resultados aguardando gravação em lote", lambda: result_writer.stats()["pending"])
+if job_queue is not None:
+    metrics.gauge_callback("smarthire_job_queue_visible", "Jobs aguardando um worker na fila", lambda: job_queue.stats().get("visible", 0))
+    metrics.gauge_callback("smarthire_job_queue_dead_letters", "Jobs na DLQ", lambda: job_queue.stats().get("dead_letters", 0))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Varredura periódica da política de retenção dos runs
+    sweeper = asyncio.create_task(sweep_periodically(run_store))
+    # Gravação em lote dos resultados; o flush final acontece antes de fechar os clientes HTTP
+    await result_writer.start()
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        await result_writer.close()
+        await audio_transcriber.aclose()
+        await http_pool.aclose()
+        await asyncio.to_thread(extraction_engine.shutdown)
 
-SUPPORTED_RESUME_EXTENSIONS = {".pdf", ".docx", ".doc", ".txt"}
-SUPPORTED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+app = FastAPI(title="SmartHire AI Service Enhanced", version="0.2.0", lifespan=lifespan)
 
-app = FastAPI(title="SmartHire AI Service Enhanced", version="0.2.0")
 
-# Armazenamento em memória dos runs (em produção, usar Redis/DB)
-runs: Dict[str, Dict[str, Any]] = {}
+@app.exception_handler(RunStoreFullError)
+async def run_store_full_handler(request, exc: RunStoreFullError):
+    # Todos os runs armazenados estão em andamento: o cliente deve tentar novamente mais tarde
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "30"})
 
 class TranscribeRequest(BaseModel):
     audio_path: str
@@ -194,14 +416,38 @@ class EvaluateRequest(BaseModel):
     stage: StagePayload | None = None
     requirements: list[RequirementPayload] | None = None
     prompt_template: str | None = None
+    bypass_cache: bool = False  # ignora o cache de respostas do LLM (força nova chamada)
+
+class BatchApplicationPayload(BaseModel):
+    application_id: str
+    resume_path: str | None = None
+    resume_bucket: str | None = None
+    resume_signed_url: str | None = None
+    audio_path: str | None = None
+    audio_bucket: str | None = None
+    audio_signed_url: str | None = None
+    transcript_path: str | None = None
+    transcript_bucket: str | None = None
+    transcript_signed_url: str | None = None
+
+class EvaluateBatchRequest(BaseModel):
+    stage_id: str
+    applications: list[BatchApplicationPayload]
+    user_id: str | None = None
+    stage: StagePayload | None = None
+    requirements: list[RequirementPayload] | None = None
+    prompt_template: str | None = None
+    concurrency: int | None = None
+    bypass_cache: bool = False
 
 class RunStatus(BaseModel):
     id: str
     type: str
-    status: str
+    status: str  # queued | running | retrying | succeeded | failed
     progress: int | None = None
     error: str | None = None
     result: Dict[str, Any] | None = None
+    attempts: int | None = None
 
 class EvaluationResult(BaseModel):
     score: float
@@ -211,6 +457,7 @@ class EvaluationResult(BaseModel):
     strengths: list[str]
     weaknesses: list[str]
     recommendations: list[str]
+    llm_retries: int = 0
 
 class AIConfig(BaseModel):
     openai_api_key: str
@@ -218,46 +465,95 @@ class AIConfig(BaseModel):
     temperature: float
     max_tokens: int
 
-# Simulação de processamento de áudio (substituir por Whisper API real)
-async def process_audio(audio_path: str) -> str:
-    """Simula transcrição de áudio para texto"""
-    await asyncio.sleep(2)  # Simula processamento
-    return f"Transcrição do áudio {audio_path}: Candidato demonstrou experiência em vendas e comunicação clara."
+class InvalidateAIConfigRequest(BaseModel):
+    user_id: str | None = None
+
+async def process_audio(
+    audio_path: str,
+    bucket: str | None = None,
+    language: str | None = None,
+    on_partial: Callable[[Dict[str, Any]], None] | None = None,
+) -> Dict[str, Any]:
+    """
+    Baixa o áudio do Storage e o transcreve com o audio_transcriber. Retorna o resultado da
+    transcrição (transcript, segments com tempos, language, duration_seconds, chunks).
+    """
+    temp_file = await download_file_from_storage(audio_path, bucket, max_bytes=AUDIO_MAX_DOWNLOAD_BYTES)
+    try:
+        result = await audio_transcriber.transcribe(temp_file, language, on_partial)
+    finally:
+        temp_file.unlink(missing_ok=True)
+    profile_add("audio_seconds", result["duration_seconds"])
+    return result
+
+class DownloadTooLargeError(ValueError):
+    """Arquivo do Storage maior que o limite configurado para download."""
+
 
 # Utilidades de extração real de texto de currículos
 async def read_file_bytes(path: Path) -> bytes:
     return await asyncio.to_thread(path.read_bytes)
 
 
-async def extract_text_from_pdf(path: Path) -> str:
-    if PdfReader is None:
-        raise RuntimeError("Dependência PyPDF2 não instalada")
+async def extract_text_from_pdf(path: Path, max_tokens: int | None = None) -> Tuple[str, bool, list[str]]:
+    """
+    Texto do PDF limitado a max_tokens. Páginas sem texto passam por OCR (quando disponível)
+    e entram na posição delas no documento, dentro do mesmo limite. Retorna (texto, truncado, warnings).
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN if max_tokens else None
+    pages, truncated, empty_pages = await extraction_engine.run(collect_pdf_pages, path, max_chars)
+    warnings: list[str] = []
+    if empty_pages and not truncated and pdf_ocr_available():
+        ocr_pages, warnings = await ocr_pdf_pages(path, empty_pages)
+        pages = pages + ocr_pages
+    content, ocr_truncated = join_pdf_pages(pages, max_chars)
+    return content, truncated or ocr_truncated, warnings
 
-    file_bytes = await read_file_bytes(path)
 
-    def _extract() -> str:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        texts = []
-        for page in reader.pages:
-            try:
-                texts.append(page.extract_text() or "")
-            except Exception:
-                continue
-        return "\n".join(filter(None, texts))
-
-    return await asyncio.to_thread(_extract)
+async def ocr_pdf_pages(path: Path, page_indexes: list[int]) -> Tuple[list[Tuple[int, str]], list[str]]:
+    """
+    OCR das páginas sem texto de um PDF digitalizado, distribuídas entre os workers do
+    ExtractionEngine. Limitado a OCR_PDF_MAX_PAGES páginas e OCR_PDF_TIMEOUT_SECONDS por
+    documento; páginas que não terminam a tempo são descartadas. Retorna ([(índice, texto)], warnings).
+    """
+    warnings: list[str] = []
+    selected = page_indexes[:OCR_PDF_MAX_PAGES]
+    if len(page_indexes) > len(selected):
+        warnings.append(
+            f"PDF digitalizado com {len(page_indexes)} páginas sem texto; OCR limitado às primeiras {len(selected)}."
+        )
+    if not selected:
+        return [], warnings
+
+    tasks = [
+        asyncio.create_task(extraction_engine.run(ocr_pdf_page, path, index, OCR_PDF_DPI, OCR_PAGE_TIMEOUT_SECONDS))
+        for index in selected
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=OCR_PDF_TIMEOUT_SECONDS)
+    for task in pending:
+        task.cancel()
+    if pending:
+        warnings.append(f"OCR do PDF excedeu {OCR_PDF_TIMEOUT_SECONDS:.0f}s; {len(pending)} página(s) ignorada(s).")
+
+    pages: list[Tuple[int, str]] = []
+    failed = 0
+    for index, task in zip(selected, tasks):
+        if task not in done:
+            continue
+        if task.exception() is not None:
+            failed += 1
+            continue
+        if task.result().strip():
+            pages.append((index, task.result().strip()))
+    if failed:
+        warnings.append(f"Falha no OCR de {failed} página(s) do PDF.")
+    if pages:
+        warnings.append(f"OCR aplicado em {len(pages)} página(s) digitalizada(s) do PDF; qualidade pode variar.")
+    return pages, warnings
 
 
 async def extract_text_from_docx(path: Path) -> str:
-    if docx is None:
-        raise RuntimeError("Dependência python-docx não instalada")
-
-    def _extract() -> str:
-        document = docx.Document(str(path))
-        paragraphs = [para.text for para in document.paragraphs if para.text]
-        return "\n".join(paragraphs)
-
-    return await asyncio.to_thread(_extract)
+    return await extraction_engine.run(read_docx_text, path)
 
 
 async def extract_text_from_plain(path: Path) -> str:
@@ -265,21 +561,21 @@ async def extract_text_from_plain(path: Path) -> str:
     return file_bytes.decode("utf-8", errors="ignore")
 
 
-async def extract_text_with_ocr(path: Path) -> str:
-    if pytesseract is None or Image is None:
-        raise RuntimeError("Dependências de OCR não instaladas")
-
+async def extract_text_from_transcript_json(path: Path) -> str:
     file_bytes = await read_file_bytes(path)
+    return transcript_json_to_text(file_bytes.decode("utf-8", errors="ignore"))
 
-    def _extract() -> str:
-        with Image.open(io.BytesIO(file_bytes)) as img:
-            return pytesseract.image_to_string(img)
 
-    return await asyncio.to_thread(_extract)
-async def download_file_from_storage(path: str, bucket: str | None = None) -> Path:
+async def extract_text_with_ocr(path: Path) -> str:
+    return await extraction_engine.run(read_image_text, path)
+
+
+def resolve_storage_object(path: str, bucket: str | None = None) -> Tuple[str, str, str]:
+    """
+    Resolve bucket, caminho do objeto e URL de download no Supabase Storage.
+    """
     storage_url = os.getenv("SUPABASE_STORAGE_URL")
-    service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    if not storage_url or not service_role:
+    if not storage_url or not os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
         raise RuntimeError("SUPABASE_STORAGE_URL ou SUPABASE_SERVICE_ROLE_KEY não configurados")
 
     actual_bucket = bucket
@@ -302,46 +598,95 @@ async def download_file_from_storage(path: str, bucket: str | None = None) -> Pa
     if not actual_bucket:
         raise ValueError("Bucket não informado para download do arquivo")
 
-    download_url = f"{storage_url}/object/{actual_bucket}/{file_path}"
+    return actual_bucket, file_path, f"{storage_url}/object/{actual_bucket}/{file_path}"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(download_url, timeout=60.0, headers={
-            "Authorization": f"Bearer {service_role}",
-            "apikey": service_role,
-        })
-        response.raise_for_status()
 
-        suffix = Path(file_path).suffix or ""
-        temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        temp.write(response.content)
-        temp.flush()
-        temp.close()
-        return Path(temp.name)
+def _storage_headers() -> Dict[str, str]:
+    service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    return {
+        "Authorization": f"Bearer {service_role}",
+        "apikey": service_role,
+    }
 
 
-async def extract_resume_text(resume_path: str, signed_url: str | None = None, bucket: str | None = None) -> Tuple[str, list[str]]:
-    temp_file: Path | None = None
-    if signed_url:
-        temp_file = await download_file_from_storage(signed_url, bucket)
-    else:
-        temp_file = await download_file_from_storage(resume_path, bucket)
-    path = temp_file
+async def fetch_storage_etag(download_url: str, client: httpx.AsyncClient | None = None) -> str | None:
+    """
+    Consulta o ETag do objeto (HEAD) sem baixá-lo. Retorna None quando indisponível.
+    """
+    client = resolve_client(client, http_pool, SUPABASE)
+    try:
+        response = await client.head(download_url, timeout=15.0, headers=_storage_headers())
+    except httpx.HTTPError as e:
+        logger.warning("Falha ao consultar ETag do currículo", extra={"error": str(e)})
+        return None
+    if response.status_code != 200:
+        return None
+    return response.headers.get("etag") or None
+
+
+async def download_file_from_storage(
+    path: str,
+    bucket: str | None = None,
+    client: httpx.AsyncClient | None = None,
+    max_bytes: int | None = None,
+) -> Path:
+    """
+    Baixa o objeto em streaming direto para um arquivo temporário, sem manter o conteúdo
+    inteiro em memória. Aborta assim que o tamanho ultrapassa max_bytes (padrão: MAX_DOWNLOAD_BYTES).
+    """
+    _, file_path, download_url = resolve_storage_object(path, bucket)
+    limit = MAX_DOWNLOAD_BYTES if max_bytes is None else max_bytes
+
+    client = resolve_client(client, http_pool, SUPABASE)
+    suffix = Path(file_path).suffix or ""
+    temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    temp_path = Path(temp.name)
+    try:
+        async with client.stream("GET", download_url, timeout=60.0, headers=_storage_headers()) as response:
+            response.raise_for_status()
+
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise DownloadTooLargeError(f"Arquivo excede o limite de {limit} bytes ({declared} bytes)")
+
+            received = 0
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                received += len(chunk)
+                if received > limit:
+                    raise DownloadTooLargeError(f"Arquivo excede o limite de {limit} bytes")
+                temp.write(chunk)
+        temp.close()
+        profile_add("bytes_downloaded", received)
+    except BaseException:
+        temp.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+    return temp_path
 
-    if not path.exists():
-        raise FileNotFoundError(f"Arquivo de currículo não encontrado: {resume_path}")
 
+async def extract_text_from_file(path: Path) -> Tuple[str, list[str], bool]:
+    """
+    Extrai o texto de um arquivo local conforme a extensão.
+    Retorna (texto, warnings, cacheável); falhas inesperadas na extração não são cacheáveis.
+    """
     extension = path.suffix.lower()
     warnings: list[str] = []
 
     try:
         if extension == ".pdf":
-            content = await extract_text_from_pdf(path)
+            content, truncated, ocr_warnings = await extract_text_from_pdf(path, RESUME_PDF_MAX_TOKENS)
+            warnings.extend(ocr_warnings)
             if not content.strip():
                 warnings.append("Nenhum texto extraído do PDF; verifique se é digitalizado.")
+            elif truncated:
+                warnings.append(f"PDF extenso: texto truncado em ~{RESUME_PDF_MAX_TOKENS} tokens.")
         elif extension == ".docx":
             content = await extract_text_from_docx(path)
         elif extension == ".txt":
             content = await extract_text_from_plain(path)
+        elif extension == ".json":
+            # Transcrições em JSON (falas com locutor) viram linhas "Locutor: fala"
+            content = await extract_text_from_transcript_json(path)
         elif extension in SUPPORTED_IMAGE_EXTENSIONS:
             content = await extract_text_with_ocr(path)
             warnings.append("OCR aplicado em imagem; qualidade pode variar.")
@@ -353,21 +698,146 @@ async def extract_resume_text(resume_path: str, signed_url: str | None = None, b
             content = ""
     except Exception as e:
         warnings.append(f"Falha ao extrair texto do currículo ({extension}): {e}")
-        content = ""
+        return "", warnings, False
+
+    return content.strip(), warnings, True
 
-    if temp_file:
+
+async def extract_resume_text(
+    resume_path: str,
+    signed_url: str | None = None,
+    bucket: str | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> Tuple[str, list[str]]:
+    """
+    Baixa e extrai o texto do currículo. Com o cache habilitado, o texto é reaproveitado
+    por caminho + ETag (sem download) ou pelo SHA-256 do arquivo (sem nova extração).
+    """
+    source = signed_url or resume_path
+    cache_keys: list[str] = []
+
+    if resume_text_cache is not None:
+        actual_bucket, file_path, download_url = resolve_storage_object(source, bucket)
+        with track_stage("storage_head"):
+            etag = await fetch_storage_etag(download_url, client)
+        if etag:
+            etag_key = resume_object_key(actual_bucket, file_path, etag)
+            cached = await resume_text_cache.get(etag_key)
+            if cached is not None:
+                profile_set("resume_cache", "etag")
+                return cached.text, list(cached.warnings)
+            cache_keys.append(etag_key)
+
+    with track_stage("download"):
+        temp_file = await download_file_from_storage(source, bucket, client)
+    try:
+        if not temp_file.exists():
+            raise FileNotFoundError(f"Arquivo de currículo não encontrado: {resume_path}")
+
+        if resume_text_cache is not None:
+            hash_key = resume_content_key(await asyncio.to_thread(file_sha256, temp_file), temp_file.suffix)
+            cached = await resume_text_cache.get(hash_key)
+            if cached is not None:
+                # Mesmo conteúdo com outro ETag/caminho: registra a nova chave e evita reextrair
+                if cache_keys:
+                    await resume_text_cache.put(cache_keys, cached)
+                profile_set("resume_cache", "content")
+                return cached.text, list(cached.warnings)
+            cache_keys.append(hash_key)
+            profile_set("resume_cache", "miss")
+
+        with track_stage("extraction"):
+            content, warnings, cacheable = await extract_text_from_file(temp_file)
+    finally:
         try:
             temp_file.unlink(missing_ok=True)
         except Exception:
             pass
 
-    return content.strip(), warnings
+    if resume_text_cache is not None and cacheable:
+        try:
+            await resume_text_cache.put(cache_keys, CachedResumeText(text=content, warnings=list(warnings)))
+        except OSError as e:
+            logger.warning("Falha ao gravar cache de currículo", extra={"error": str(e)})
+
+    return content, warnings
+
+async def read_transcript_text(
+    transcript_path: str,
+    signed_url: str | None = None,
+    bucket: str | None = None,
+) -> Tuple[str, list[str]]:
+    """
+    Baixa e extrai o texto de uma transcrição (JSON, TXT, DOCX ou PDF) pelo mesmo caminho
+    dos currículos, com o cache de texto extraído.
+    """
+    return await extract_resume_text(transcript_path, signed_url, bucket)
 
-# Simulação de análise de transcrição
-async def analyze_transcript(transcript_path: str) -> str:
-    """Simula leitura de transcrição JSON"""
-    await asyncio.sleep(1)
-    return f"Transcrição {transcript_path}: Candidato mostrou conhecimento técnico e habilidades interpessoais."
+
+async def analyze_interview(
+    transcript: str,
+    stage_description: str,
+    requirements: list[dict],
+    config: AIConfig,
+) -> Dict[str, Any]:
+    """
+    Avalia a transcrição por janelas (transcript_analysis.analyze_transcript_content) com a
+    chave e o modelo do usuário, no mesmo pool HTTP e rate limiter das demais chamadas.
+    O índice de locutores (transcript_index.py, persistido por hash do texto) identifica o
+    candidato uma vez, e só as falas dele vão para as janelas. Sem chave configurada, as
+    janelas são avaliadas por heurística.
+    """
+    model = TRANSCRIPT_MODEL or config.model
+    llm_retries = 0
+
+    def _record(data: Dict[str, Any], retries: int) -> None:
+        nonlocal llm_retries
+        llm_retries += retries
+        LLM_CALLS_TOTAL.inc(source="api")
+        OPENAI_RETRIES_TOTAL.inc(retries)
+        usage = data.get("usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                OPENAI_TOKENS_TOTAL.inc(usage[kind], model=model, kind=kind.removesuffix("_tokens"))
+                profile_add(kind, usage[kind])
+
+    complete = None
+    if config.openai_api_key.strip():
+        complete = make_openai_json_completer(
+            config.openai_api_key,
+            model,
+            config.temperature,
+            min(config.max_tokens, TRANSCRIPT_MAX_TOKENS),
+            base_url=OPENAI_API_BASE,
+            client=http_pool.openai,
+            limiter=openai_rate_limiter,
+            on_response=_record,
+        )
+    with track_stage("transcript_index"):
+        index = await build_transcript_index(transcript, complete, transcript_index_cache)
+    with track_stage("transcript_analysis"):
+        result = await analyze_transcript_content(
+            transcript,
+            stage_description,
+            requirements,
+            complete=complete,
+            use_env_key=False,
+            turns=index.candidate_turns(),
+            candidate_only=index.candidate is not None,
+        )
+    if result["simulated"]:
+        LLM_CALLS_TOTAL.inc(source="simulated")
+    result["speaker_index"] = index.stats()
+    result["llm_retries"] = llm_retries
+    profile_set("transcript_windows", result["windows"])
+    logger.info(
+        "Transcrição analisada",
+        extra={
+            **{key: result[key] for key in ("score", "windows", "simulated")},
+            **result["speaker_index"],
+        },
+    )
+    return result
 
 # Análise real com OpenAI
 async def analyze_candidate_with_openai(
@@ -375,46 +845,44 @@ async def analyze_candidate_with_openai(
     stage_description: str, 
     requirements: list[dict],
     config: AIConfig,
-    prompt_template: str | None = None
+    prompt_template: str | None = None,
+    client: httpx.AsyncClient | None = None,
+    bypass_cache: bool = False,
+    user_id: str | None = None,
 ) -> EvaluationResult:
     """
-    Análise real do candidato usando OpenAI
+    Análise real do candidato usando OpenAI. Respostas idênticas do mesmo usuário e chave vêm
+    do cache de respostas, exceto com bypass_cache (a nova resposta substitui a armazenada).
     """
     # Verificar se a chave da API está configurada
-    print(f"[IA] Verificando chave OpenAI: '{config.openai_api_key[:10] if config.openai_api_key else 'VAZIA'}...'")
-    print(f"[IA] Chave vazia: {not config.openai_api_key}")
-    print(f"[IA] Chave strip vazia: {config.openai_api_key.strip() == '' if config.openai_api_key else 'N/A'}")
-    
     if not config.openai_api_key or config.openai_api_key.strip() == "":
-        print("[IA] Chave OpenAI não configurada, usando análise simulada")
+        logger.info("Chave OpenAI não configurada, usando análise simulada")
         return await analyze_candidate_simulated(text_content, stage_description, requirements)
-    
-    print("[IA] Chave OpenAI configurada, prosseguindo com análise real")
-
-    print(f"[IA] ========== DEBUG DADOS PARA OPENAI ==========")
-    print(f"[IA] Preparando análise com:")
-    print(f"[IA]   - Texto: {len(text_content)} caracteres")
-    print(f"[IA]   - Descrição da etapa: {len(stage_description)} caracteres")
-    print(f"[IA]   - Requisitos: {len(requirements)} itens")
-    print(f"[IA]   - Modelo: {config.model}")
-    print(f"[IA]   - Temperature: {config.temperature}")
-    print(f"[IA]   - Max tokens: {config.max_tokens}")
-    print(f"[IA] ========== CONTEÚDO DO TEXTO ==========")
-    print(f"[IA] {text_content}")
-    print(f"[IA] ========== DESCRIÇÃO DA ETAPA ==========")
-    print(f"[IA] {stage_description}")
-    print(f"[IA] ========== REQUISITOS ==========")
-    print(f"[IA] {requirements}")
+
+    logger.debug(
+        "Preparando análise com OpenAI",
+        extra={
+            "text_chars": len(text_content),
+            "stage_description_chars": len(stage_description),
+            "requirements": len(requirements),
+            "model": config.model,
+            "temperature": config.temperature,
+            "max_tokens": config.max_tokens,
+        },
+    )
+    log_payload(logger, "Texto do candidato", text_content)
+    log_payload(logger, "Descrição da etapa", stage_description)
+    log_payload(logger, "Requisitos", requirements)
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Preparar prompt para análise
-            requirements_text = "\n".join([
-                f"- {req.get('label', '')}: {req.get('description', '')} (peso: {req.get('weight', 1.0)})"
-                for req in requirements
-            ])
-            
-            base_prompt = prompt_template or """
+        client = resolve_client(client, http_pool, OPENAI)
+        # Preparar prompt para análise
+        requirements_text = "\n".join([
+            f"- {req.get('label', '')}: {req.get('description', '')} (peso: {req.get('weight', 1.0)})"
+            for req in requirements
+        ])
+
+        base_prompt = prompt_template or """
 Leia com atenção a DESCRIÇÃO DA ETAPA definida pelo RH e avalie o currículo do candidato somente com base no texto real fornecido.
 
 DESCRIÇÃO DA ETAPA:
@@ -453,90 +921,103 @@ REGRAS OBRIGATÓRIAS:
 - Não inclua campos adicionais no JSON.
 """
 
-            prompt = (
-                base_prompt
-                .replace("{{STAGE_DESCRIPTION}}", stage_description)
-                .replace("{{REQUIREMENTS_LIST}}", requirements_text)
-                .replace("{{CANDIDATE_INFO}}", text_content)
-            )
+        prompt = (
+            base_prompt
+            .replace("{{STAGE_DESCRIPTION}}", stage_description)
+            .replace("{{REQUIREMENTS_LIST}}", requirements_text)
+            .replace("{{CANDIDATE_INFO}}", text_content)
+        )
 
-            print(f"[IA] ========== PROMPT FINAL PARA OPENAI ==========")
-            print(f"[IA] Prompt preparado: {len(prompt)} caracteres")
-            # Evitar imprimir o prompt completo em produção
-            # print(f"[IA] {prompt}")
-            print(f"[IA] ========== FIM DO PROMPT ==========")
-            print(f"[IA] Fazendo requisição para OpenAI...")
+        logger.debug("Prompt preparado", extra={"prompt_chars": len(prompt)})
+        log_payload(logger, "Prompt final para OpenAI", prompt)
 
-            # Monta payload com JSON Schema único (sem oneOf)
-            payload = {
-                "model": config.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Você é um especialista em RH que analisa candidatos de forma objetiva e justa. Sempre responda em formato JSON válido."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": config.temperature,
-                "max_tokens": config.max_tokens,
-                "response_format": {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "evaluation_schema",
-                        "schema": {
-                            "type": "object",
-                            "additionalProperties": False,
-                            "properties": {
-                                "score": {"type": "number", "minimum": 0, "maximum": 10},
-                                "analysis": {"type": "string"},
-                                "strengths": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "minItems": 4,
-                                    "maxItems": 4
-                                },
-                                "weaknesses": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "minItems": 3,
-                                    "maxItems": 3
-                                },
-                                "matched_requirements": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "minItems": 3,
-                                    "maxItems": 3
-                                },
-                                "missing_requirements": {"type": "array", "items": {"type": "string"}}
+        # Monta payload com JSON Schema único (sem oneOf)
+        payload = {
+            "model": config.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Você é um especialista em RH que analisa candidatos de forma objetiva e justa. Sempre responda em formato JSON válido."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": config.temperature,
+            "max_tokens": config.max_tokens,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "evaluation_schema",
+                    "schema": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "properties": {
+                            "score": {"type": "number", "minimum": 0, "maximum": 10},
+                            "analysis": {"type": "string"},
+                            "strengths": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "minItems": 4,
+                                "maxItems": 4
                             },
-                            "required": [
-                                "score",
-                                "analysis",
-                                "strengths",
-                                "weaknesses",
-                                "matched_requirements",
-                                "missing_requirements"
-                            ]
+                            "weaknesses": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "minItems": 3,
+                                "maxItems": 3
+                            },
+                            "matched_requirements": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "minItems": 3,
+                                "maxItems": 3
+                            },
+                            "missing_requirements": {"type": "array", "items": {"type": "string"}}
                         },
-                        "strict": True
-                    }
+                        "required": [
+                            "score",
+                            "analysis",
+                            "strengths",
+                            "weaknesses",
+                            "matched_requirements",
+                            "missing_requirements"
+                        ]
+                    },
+                    "strict": True
                 }
             }
+        }
 
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {config.openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=30.0
-            )
+        # Cache de respostas: usuário/chave + prompt renderizado + parâmetros do modelo
+        cache_key = llm_response_key(payload, llm_cache_scope(user_id, config.openai_api_key))
+        content: str | None = None
+        cache_hit = False
+        llm_retries = 0
+        if llm_response_cache is not None and not bypass_cache:
+            content = await llm_response_cache.get(cache_key)
+            cache_hit = content is not None
+            if cache_hit:
+                logger.info("Resposta da OpenAI reaproveitada do cache")
+
+        if content is None:
+            estimated_tokens = estimate_tokens(prompt) + config.max_tokens
+            with track_stage("llm"):
+                response, retries = await post_chat_completion(
+                    client,
+                    f"{OPENAI_API_BASE}/chat/completions",
+                    config.openai_api_key,
+                    payload,
+                    openai_rate_limiter,
+                    estimated_tokens,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    max_wait_seconds=OPENAI_MAX_RETRY_WAIT_SECONDS,
+                )
+            llm_retries += retries
+            OPENAI_RETRIES_TOTAL.inc(retries)
 
-            print(f"[IA] Resposta OpenAI recebida: {response.status_code}")
+            logger.info("Resposta OpenAI recebida", extra={"status_code": response.status_code, "retries": retries})
 
             # Fallback automático se o schema for rejeitado (400)
             if response.status_code == 400:
@@ -546,151 +1027,156 @@ REGRAS OBRIGATÓRIAS:
                 except Exception:
                     err_msg = ""
                 if "response_format" in err_msg and ("Invalid schema" in err_msg or "not permitted" in err_msg):
-                    print("[IA] Aviso: Schema JSON rejeitado. Requisitando novamente com response_format=json_object...")
+                    logger.warning("Schema JSON rejeitado; requisitando novamente com response_format=json_object")
                     payload["response_format"] = {"type": "json_object"}
-                    response = await client.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {config.openai_api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json=payload,
-                        timeout=30.0
-                    )
-                    print(f"[IA] Resposta OpenAI (fallback json_object): {response.status_code}")
+                    with track_stage("llm"):
+                        response, retries = await post_chat_completion(
+                            client,
+                            f"{OPENAI_API_BASE}/chat/completions",
+                            config.openai_api_key,
+                            payload,
+                            openai_rate_limiter,
+                            estimated_tokens,
+                            max_retries=OPENAI_MAX_RETRIES,
+                            max_wait_seconds=OPENAI_MAX_RETRY_WAIT_SECONDS,
+                        )
+                    llm_retries += retries
+                    OPENAI_RETRIES_TOTAL.inc(retries)
+                    logger.info("Resposta OpenAI (fallback json_object)", extra={"status_code": response.status_code})
 
             if response.status_code != 200:
-                print(f"[IA] Erro na API OpenAI: {response.status_code} - {response.text}")
+                logger.error("Erro na API OpenAI", extra={"status_code": response.status_code, "body": response.text[:500]})
                 raise Exception(f"Erro na API OpenAI: {response.status_code} - {response.text}")
 
             data = response.json()
             content = data["choices"][0]["message"]["content"]
-            print(f"[IA] ========== RESPOSTA DA OPENAI ==========")
-            print(f"[IA] Conteúdo da resposta: {len(content)} caracteres")
-            # Evitar imprimir a resposta completa
-            # print(f"[IA] {content}")
-            print(f"[IA] ========== FIM DA RESPOSTA ==========")
-
-            # Extrair JSON da resposta
-            try:
-                print(f"[IA] Tentando extrair JSON da resposta...")
-                # Tentar encontrar JSON na resposta
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                print(f"[IA] Posições JSON: start={start}, end={end}")
-                if start != -1 and end != 0:
-                    json_str = content[start:end]
-                    print(f"[IA] JSON extraído: {len(json_str)} caracteres")
-                    result = json.loads(json_str)
-                    print(f"[IA] JSON parseado com sucesso!")
+            usage = data.get("usage") or {}
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if usage.get(kind):
+                    OPENAI_TOKENS_TOTAL.inc(usage[kind], model=config.model, kind=kind.removesuffix("_tokens"))
+                    profile_add(kind, usage[kind])
+
+        LLM_CALLS_TOTAL.inc(source="cache" if cache_hit else "api")
+        profile_set("llm_cache_hit", cache_hit)
+        logger.debug("Conteúdo da resposta da OpenAI", extra={"content_chars": len(content), "cache_hit": cache_hit})
+        log_payload(logger, "Resposta da OpenAI", content)
+
+        # Extrair JSON da resposta
+        try:
+            # Tentar encontrar JSON na resposta
+            start = content.find('{')
+            end = content.rfind('}') + 1
+            if start != -1 and end != 0:
+                json_str = content[start:end]
+                result = json.loads(json_str)
+                if llm_response_cache is not None and not cache_hit:
+                    await llm_response_cache.put(cache_key, content, config.model)
+            else:
+                raise ValueError("JSON não encontrado na resposta")
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning("Erro ao fazer parse do JSON da OpenAI; usando análise simulada", extra={"error": str(e)})
+            # Fallback para análise simulada se JSON inválido
+            return await analyze_candidate_simulated(text_content, stage_description, requirements)
+
+        # Função para converter objetos em strings se necessário
+        def ensure_string_list(items):
+            if not isinstance(items, list):
+                return []
+            result_list = []
+            for item in items:
+                if isinstance(item, str):
+                    result_list.append(item)
+                elif isinstance(item, dict) and "requirement" in item:
+                    result_list.append(item["requirement"])
+                elif isinstance(item, dict) and "description" in item:
+                    result_list.append(item["description"])
                 else:
-                    print(f"[IA] JSON não encontrado na resposta")
-                    raise ValueError("JSON não encontrado na resposta")
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"[IA] Erro ao fazer parse do JSON: {e}")
-                print(f"[IA] Usando análise simulada como fallback")
-                # Fallback para análise simulada se JSON inválido
-                return await analyze_candidate_simulated(text_content, stage_description, requirements)
-
-            # Função para converter objetos em strings se necessário
-            def ensure_string_list(items):
-                if not isinstance(items, list):
-                    return []
-                result_list = []
-                for item in items:
-                    if isinstance(item, str):
-                        result_list.append(item)
-                    elif isinstance(item, dict) and "requirement" in item:
-                        result_list.append(item["requirement"])
-                    elif isinstance(item, dict) and "description" in item:
-                        result_list.append(item["description"])
-                    else:
-                        result_list.append(str(item))
-                return result_list
-
-            # Mapear diferentes formatos de resposta da IA
-            score = 5.0
-            analysis = "Análise não disponível"
-            strengths = []
-            weaknesses = []
-            matched_requirements = []
-            missing_requirements = []
-            recommendations = []
-
-            # Verificar estrutura do JSON retornado pela OpenAI
-            print(f"[IA] ========== ESTRUTURA DO JSON RECEBIDO ==========")
-            print(f"[IA] Chaves no resultado: {list(result.keys())}")
-            # Evitar imprimir JSON completo
-            # print(f"[IA] {json.dumps(result, indent=2, ensure_ascii=False)}")
-            print(f"[IA] ========== FIM DA ESTRUTURA ==========")
-
-            # Formato atual da OpenAI (campos na raiz)
-            if "score" in result:
-                score = float(result.get("score", 5.0))
-                analysis = result.get("analysis", "Análise não disponível")
-                strengths = ensure_string_list(result.get("strengths", []))
-                weaknesses = ensure_string_list(result.get("weaknesses", []))
-                matched_requirements = ensure_string_list(result.get("matched_requirements", []))
-                missing_requirements = ensure_string_list(result.get("missing_requirements", []))
-                recommendations = []  # Removido - não será usado
-            # Formato antigo (com estrutura "avaliacao") - manter para compatibilidade
-            elif "avaliacao" in result:
-                avaliacao = result["avaliacao"]
-                # Tentar diferentes nomes de campos para pontuação
-                score = float(avaliacao.get("pontuacao_final", avaliacao.get("pontuacao", 5.0)))
-                # Tentar diferentes nomes de campos para análise
-                analysis = avaliacao.get("justificativa_pontuacao", avaliacao.get("justificativa", avaliacao.get("analise", avaliacao.get("resumo", "Análise não disponível"))))
-                strengths = ensure_string_list(avaliacao.get("pontos_fortes", []))
-                weaknesses = ensure_string_list(avaliacao.get("pontos_que_deixam_a_desejar", []))
-                matched_requirements = ensure_string_list(avaliacao.get("requisitos_atendidos", []))
-                missing_requirements = ensure_string_list(avaliacao.get("requisitos_nao_atendidos", []))
-                recommendations = []  # Removido - não será usado
-
-            # Clamp da pontuação [0,10]
-            try:
-                if score is None or not isinstance(score, (int, float)):
-                    score = 0.0
-                score = max(0.0, min(10.0, float(score)))
-            except Exception:
+                    result_list.append(str(item))
+            return result_list
+
+        # Mapear diferentes formatos de resposta da IA
+        score = 5.0
+        analysis = "Análise não disponível"
+        strengths = []
+        weaknesses = []
+        matched_requirements = []
+        missing_requirements = []
+        recommendations = []
+
+        # Verificar estrutura do JSON retornado pela OpenAI
+        logger.debug("Estrutura do JSON recebido", extra={"keys": list(result.keys())})
+
+        # Formato atual da OpenAI (campos na raiz)
+        if "score" in result:
+            score = float(result.get("score", 5.0))
+            analysis = result.get("analysis", "Análise não disponível")
+            strengths = ensure_string_list(result.get("strengths", []))
+            weaknesses = ensure_string_list(result.get("weaknesses", []))
+            matched_requirements = ensure_string_list(result.get("matched_requirements", []))
+            missing_requirements = ensure_string_list(result.get("missing_requirements", []))
+            recommendations = []  # Removido - não será usado
+        # Formato antigo (com estrutura "avaliacao") - manter para compatibilidade
+        elif "avaliacao" in result:
+            avaliacao = result["avaliacao"]
+            # Tentar diferentes nomes de campos para pontuação
+            score = float(avaliacao.get("pontuacao_final", avaliacao.get("pontuacao", 5.0)))
+            # Tentar diferentes nomes de campos para análise
+            analysis = avaliacao.get("justificativa_pontuacao", avaliacao.get("justificativa", avaliacao.get("analise", avaliacao.get("resumo", "Análise não disponível"))))
+            strengths = ensure_string_list(avaliacao.get("pontos_fortes", []))
+            weaknesses = ensure_string_list(avaliacao.get("pontos_que_deixam_a_desejar", []))
+            matched_requirements = ensure_string_list(avaliacao.get("requisitos_atendidos", []))
+            missing_requirements = ensure_string_list(avaliacao.get("requisitos_nao_atendidos", []))
+            recommendations = []  # Removido - não será usado
+
+        # Clamp da pontuação [0,10]
+        try:
+            if score is None or not isinstance(score, (int, float)):
                 score = 0.0
+            score = max(0.0, min(10.0, float(score)))
+        except Exception:
+            score = 0.0
+
+        structured = prepare_structured_analysis(
+            text_content=text_content,
+            stage_description=stage_description,
+            requirements=requirements,
+            raw_strengths=strengths,
+            raw_weaknesses=weaknesses,
+            raw_matched=matched_requirements,
+            raw_missing=missing_requirements,
+            raw_score=score,
+        )
 
-            structured = prepare_structured_analysis(
-                text_content=text_content,
-                stage_description=stage_description,
-                requirements=requirements,
-                raw_strengths=strengths,
-                raw_weaknesses=weaknesses,
-                raw_matched=matched_requirements,
-                raw_missing=missing_requirements,
-                raw_score=score,
-            )
-
-            evaluation_result = EvaluationResult(
-                score=structured["score"],
-                analysis=structured["analysis"],
-                matched_requirements=structured["matched_requirements"],
-                missing_requirements=structured["missing_requirements"],
-                strengths=structured["strengths"],
-                weaknesses=structured["weaknesses"],
-                recommendations=recommendations or structured["weaknesses"],
-            )
-
-            print(f"[IA] ========== RESULTADO FINAL DA ANÁLISE ==========")
-            print(f"[IA] Score: {evaluation_result.score}")
-            print(f"[IA] Analysis: {evaluation_result.analysis}")
-            print(f"[IA] Strengths: {evaluation_result.strengths}")
-            print(f"[IA] Weaknesses: {evaluation_result.weaknesses}")
-            print(f"[IA] Matched requirements: {evaluation_result.matched_requirements}")
-            print(f"[IA] Missing requirements: {evaluation_result.missing_requirements}")
-            print(f"[IA] ========== FIM DO RESULTADO ==========")
+        evaluation_result = EvaluationResult(
+            score=structured["score"],
+            analysis=structured["analysis"],
+            matched_requirements=structured["matched_requirements"],
+            missing_requirements=structured["missing_requirements"],
+            strengths=structured["strengths"],
+            weaknesses=structured["weaknesses"],
+            recommendations=recommendations or structured["weaknesses"],
+            llm_retries=llm_retries,
+        )
 
-            print(f"[IA] DEBUG - JSON parseado completo:")
-            print(f"[IA] {json.dumps(result, indent=2, ensure_ascii=False)}")
+        logger.info(
+            "Análise OpenAI concluída",
+            extra={
+                "score": evaluation_result.score,
+                "matched_requirements": len(evaluation_result.matched_requirements),
+                "missing_requirements": len(evaluation_result.missing_requirements),
+                "llm_retries": llm_retries,
+            },
+        )
+        log_payload(logger, "JSON parseado da OpenAI", result)
 
-            return evaluation_result
+        return evaluation_result
 
+    except (RetryableOpenAIError, httpx.TransportError) as e:
+        # Limite de taxa/indisponibilidade persistente: o run falha em vez de virar análise simulada
+        logger.error("Erro na análise com OpenAI após retentativas", extra={"error": str(e)})
+        raise
     except Exception as e:
-        print(f"Erro na análise com OpenAI: {e}")
+        logger.exception("Erro na análise com OpenAI; usando análise simulada")
         # Fallback para análise simulada
         return await analyze_candidate_simulated(text_content, stage_description, requirements)
 
@@ -702,6 +1188,7 @@ async def analyze_candidate_simulated(
     """
     Análise simulada utilizando heurísticas determinísticas para seguir o formato exigido.
     """
+    LLM_CALLS_TOTAL.inc(source="simulated")
 
     await asyncio.sleep(2)
     structured = prepare_structured_analysis(
@@ -720,15 +1207,25 @@ async def analyze_candidate_simulated(
         recommendations=structured["weaknesses"],
     )
 
+# Buscar configurações do usuário (com cache por user_id)
+async def get_user_ai_config(user_id: str, client: httpx.AsyncClient | None = None) -> AIConfig:
+    """
+    Retorna as configurações da IA do usuário a partir do cache (LRU com TTL).
+    Misses concorrentes para o mesmo user_id compartilham uma única chamada ao banco.
+    """
+    return await ai_config_cache.get_or_load(
+        user_id,
+        lambda: _load_user_ai_config(user_id, client),
+    )
+
+
 # Buscar configurações do usuário - MELHORADA COM VALIDAÇÕES
-async def get_user_ai_config(user_id: str) -> AIConfig:
+async def _load_user_ai_config(user_id: str, client: httpx.AsyncClient | None = None) -> Tuple[AIConfig, bool]:
     """
     Busca configurações da IA do usuário com validações robustas.
     Se não houver configuração persistida, utiliza variáveis de ambiente como fallback.
+    Retorna também se o resultado pode ser cacheado (falhas de acesso ao banco não são).
     """
-    print(f"[IA] ========== INICIANDO BUSCA DE CONFIGURAÇÕES ==========")
-    print(f"[IA] User ID: {user_id}")
-
     # Variáveis de ambiente como fallback
     env_api_key = os.getenv("OPENAI_API_KEY", "")
     env_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -739,298 +1236,595 @@ async def get_user_ai_config(user_id: str) -> AIConfig:
     supabase_url = os.getenv("SUPABASE_URL")
     service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-    print(f"[IA] ========== VARIÁVEIS DE AMBIENTE ==========")
-    print(f"[IA] SUPABASE_URL: {supabase_url}")
-    print(f"[IA] SUPABASE_SERVICE_ROLE_KEY: {'CONFIGURADO' if service_role else 'VAZIO'}")
-    print(f"[IA] OPENAI_API_KEY ambiente: {env_api_key[:6] + '...' if env_api_key else 'VAZIO'}")
-    print(f"[IA] AI_REQUIRE_USER_KEY: {'ON' if require_user_key else 'OFF'}")
+    logger.debug(
+        "Buscando configurações da IA",
+        extra={
+            "user_id": user_id,
+            "supabase_url_configured": bool(supabase_url),
+            "service_role_configured": bool(service_role),
+            "env_api_key_configured": bool(env_api_key),
+            "require_user_key": require_user_key,
+        },
+    )
 
     config_source = "none"  # user | env | none
+    cacheable = True
 
     # Tentar buscar configurações do banco de dados
     if supabase_url and service_role and user_id and user_id != "default":
-        print(f"[IA] ========== BUSCANDO CONFIGURAÇÕES NO BANCO ==========")
-        print(f"[IA] Fazendo requisição para: {supabase_url}/rest/v1/rpc/get_ai_settings_by_user")
-
+        cacheable = False
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{supabase_url}/rest/v1/rpc/get_ai_settings_by_user",
-                    json={"p_user_id": user_id},
-                    headers={
-                        "apikey": service_role,
-                        "Authorization": f"Bearer {service_role}",
-                        "Accept": "application/json",
-                        "Content-Type": "application/json",
-                    },
-                    timeout=15.0,
-                )
+            client = resolve_client(client, http_pool, SUPABASE)
+            response = await client.post(
+                f"{supabase_url}/rest/v1/rpc/get_ai_settings_by_user",
+                json={"p_user_id": user_id},
+                headers={
+                    "apikey": service_role,
+                    "Authorization": f"Bearer {service_role}",
+                    "Accept": "application/json",
+                    "Content-Type": "application/json",
+                },
+                timeout=15.0,
+            )
 
-                print(f"[IA] Status da resposta do banco: {response.status_code}")
+            if response.status_code == 200:
+                cacheable = True
+                data = response.json()
+                logger.debug("Configurações retornadas do banco", extra={"user_id": user_id, "records": len(data) if data else 0})
 
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"[IA] Dados retornados do banco: {len(data) if data else 0} registros")
+                if data and len(data) > 0:
+                    record = data[0]
 
-                    if data and len(data) > 0:
-                        record = data[0]
-                        print(f"[IA] ========== DADOS DO USUÁRIO ENCONTRADOS ==========")
-                        print(f"[IA] Model: {record.get('model', 'NÃO CONFIGURADO')}")
-                        print(f"[IA] Temperature: {record.get('temperature', 'NÃO CONFIGURADO')}")
-                        print(f"[IA] Max Tokens: {record.get('max_tokens', 'NÃO CONFIGURADO')}")
+                    # Processar chave da API
+                    api_key_raw = record.get("openai_api_key")
 
-                        # Processar chave da API
-                        api_key_raw = record.get("openai_api_key")
-                        print(f"[IA] Chave API raw encontrada: {'SIM' if api_key_raw else 'NÃO'}")
+                    if api_key_raw:
+                        try:
+                            decoded_key = base64.b64decode(api_key_raw).decode('utf-8')
 
-                        if api_key_raw:
-                            try:
-                                decoded_key = base64.b64decode(api_key_raw).decode('utf-8')
-                                print(f"[IA] Chave API decodificada com sucesso: {decoded_key[:6]}...")
-
-                                # Validar se a chave parece válida (não é vazia após decodificar)
-                                if decoded_key and decoded_key.strip():
-                                    env_api_key = decoded_key.strip()
-                                    print(f"[IA] ✅ Chave API válida atribuída do banco de dados")
-                                    config_source = "user"
-                                else:
-                                    print(f"[IA] ❌ Chave API decodificada está vazia")
-
-                            except Exception as decode_error:
-                                print(f"[IA] ❌ Erro ao decodificar chave API: {decode_error}")
-                                print(f"[IA] Chave raw: {api_key_raw[:50] if api_key_raw else 'VAZIA'}...")
-                        else:
-                            print(f"[IA] ❌ Chave API não encontrada no registro do usuário")
-
-                        # Aplicar outras configurações se disponíveis
-                        if record.get("model"):
-                            env_model = record.get("model")
-                            print(f"[IA] Modelo atualizado: {env_model}")
-
-                        if record.get("temperature") is not None:
-                            env_temperature = float(record.get("temperature"))
-                            print(f"[IA] Temperature atualizada: {env_temperature}")
-
-                        if record.get("max_tokens"):
-                            env_max_tokens = int(record.get("max_tokens"))
-                            print(f"[IA] Max tokens atualizado: {env_max_tokens}")
+                            # Validar se a chave parece válida (não é vazia após decodificar)
+                            if decoded_key and decoded_key.strip():
+                                env_api_key = decoded_key.strip()
+                                config_source = "user"
+                            else:
+                                logger.warning("Chave API do usuário decodificada está vazia", extra={"user_id": user_id})
 
+                        except Exception as decode_error:
+                            logger.warning("Erro ao decodificar chave API do usuário", extra={"user_id": user_id, "error": str(decode_error)})
                     else:
-                        print(f"[IA] ❌ Nenhum registro encontrado para o usuário {user_id}")
-                        print(f"[IA] ⚠️ Usando configurações de ambiente como fallback")
+                        logger.info("Chave API não encontrada no registro do usuário", extra={"user_id": user_id})
+
+                    # Aplicar outras configurações se disponíveis
+                    if record.get("model"):
+                        env_model = record.get("model")
+
+                    if record.get("temperature") is not None:
+                        env_temperature = float(record.get("temperature"))
+
+                    if record.get("max_tokens"):
+                        env_max_tokens = int(record.get("max_tokens"))
 
-                elif response.status_code == 404:
-                    print(f"[IA] ❌ Função get_ai_settings_by_user não encontrada - verifique se existe no banco")
                 else:
-                    print(f"[IA] ❌ Erro na resposta do banco: {response.status_code}")
-                    print(f"[IA] Resposta: {response.text}")
+                    logger.info("Nenhuma configuração persistida; usando variáveis de ambiente", extra={"user_id": user_id})
+
+            elif response.status_code == 404:
+                logger.error("Função get_ai_settings_by_user não encontrada - verifique se existe no banco")
+            else:
+                logger.error(
+                    "Erro ao buscar configurações no banco",
+                    extra={"status_code": response.status_code, "body": response.text[:500]},
+                )
 
         except Exception as db_error:
-            print(f"[IA] ❌ Falha crítica ao conectar com banco de dados: {db_error}")
-            print(f"[IA] ⚠️ Continuando com configurações de ambiente")
+            logger.error(
+                "Falha ao conectar com banco de dados; continuando com configurações de ambiente",
+                extra={"error": str(db_error)},
+            )
 
     else:
-        print(f"[IA] ========== PULANDO BUSCA NO BANCO ==========")
-        if not supabase_url:
-            print(f"[IA] ❌ SUPABASE_URL não configurada")
-        if not service_role:
-            print(f"[IA] ❌ SUPABASE_SERVICE_ROLE_KEY não configurada")
-        if not user_id or user_id == "default":
-            print(f"[IA] ❌ User ID inválido: {user_id}")
+        logger.debug(
+            "Pulando busca de configurações no banco",
+            extra={
+                "supabase_url_configured": bool(supabase_url),
+                "service_role_configured": bool(service_role),
+                "user_id": user_id,
+            },
+        )
 
     # Aplicar política: exigir chave do usuário quando flag está ON
     if require_user_key and config_source != "user":
         # Desativar uso de OPENAI_API_KEY de ambiente
         env_api_key = ""
-        print("[IA] 🔒 AI_REQUIRE_USER_KEY=ON → desativando fallback de OPENAI_API_KEY de ambiente")
+        logger.info("AI_REQUIRE_USER_KEY=ON: desativando fallback de OPENAI_API_KEY de ambiente", extra={"user_id": user_id})
         config_source = "none"
 
     # Validação final da configuração
-    print(f"[IA] ========== CONFIGURAÇÃO FINAL ==========")
-    print(f"[IA] Modelo: {env_model}")
-    print(f"[IA] Temperature: {env_temperature}")
-    print(f"[IA] Max Tokens: {env_max_tokens}")
-    print(f"[IA] Chave API configurada: {'✅ SIM' if env_api_key and env_api_key.strip() else '❌ NÃO'} (source={config_source})")
-
-    if env_api_key and env_api_key.strip():
-        print(f"[IA] Chave API (prefixo): {env_api_key[:6]}...")
-    else:
-        print(f"[IA] ❌ ATENÇÃO: Chave API não configurada - análise será simulada")
+    # A chave nunca é registrada, nem parcialmente
+    api_key_configured = bool(env_api_key and env_api_key.strip())
+    logger.info(
+        "Configuração da IA carregada",
+        extra={
+            "user_id": user_id,
+            "model": env_model,
+            "temperature": env_temperature,
+            "max_tokens": env_max_tokens,
+            "api_key_configured": api_key_configured,
+            "config_source": config_source,
+        },
+    )
+    if not api_key_configured:
+        logger.warning("Chave API não configurada - análise será simulada", extra={"user_id": user_id})
 
-    return AIConfig(
+    config = AIConfig(
         openai_api_key=env_api_key.strip() if env_api_key else "",
         model=env_model,
         temperature=env_temperature,
         max_tokens=env_max_tokens,
     )
+    return config, cacheable
+
+@app.post("/v1/ai-config/invalidate")
+async def invalidate_ai_config(request: InvalidateAIConfigRequest):
+    """
+    Invalida o cache de configurações da IA (de um usuário ou de todos quando user_id é omitido).
+    Chamado pelo web app sempre que ai_settings é alterado.
+    """
+    invalidated = ai_config_cache.invalidate(request.user_id)
+    logger.info("Cache de configurações invalidado", extra={"user_id": request.user_id or "todos", "invalidated": invalidated})
+    return {"success": True, "invalidated": invalidated}
 
 @app.post("/v1/transcribe", response_model=RunStatus)
 async def transcribe(request: TranscribeRequest):
     run_id = str(uuid.uuid4())
-    runs[run_id] = {
+    await run_store.acreate({
         "id": run_id,
         "type": "transcribe",
         "status": "running",
         "progress": 0,
         "result": None,
         "created_at": datetime.now().isoformat()
-    }
+    })
     
-    asyncio.create_task(process_transcription(run_id, request.audio_path))
+    asyncio.create_task(process_transcription(run_id, request.audio_path, request.language))
     
     return RunStatus(id=run_id, type="transcribe", status="running", progress=0)
 
-async def process_transcription(run_id: str, audio_path: str):
+async def process_transcription(run_id: str, audio_path: str, language: str | None = None):
+    set_run_id(run_id)
+
+    def _on_partial(partial: Dict[str, Any]) -> None:
+        # Transcrição parcial (prefixo contíguo) visível em /v1/runs/{id} e no stream SSE
+        progress = 10 + int(89 * partial["chunks_done"] / max(1, partial["chunks_total"]))
+        run_store.update_soon(run_id, progress=progress, result=partial)
+
     try:
-        runs[run_id]["progress"] = 50
-        transcript = await process_audio(audio_path)
-        runs[run_id]["status"] = "succeeded"
-        runs[run_id]["progress"] = 100
-        runs[run_id]["result"] = {"transcript": transcript}
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
+        await run_store.aupdate(run_id, progress=5)
+        with track_stage("audio"):
+            result = await process_audio(audio_path, language=language, on_partial=_on_partial)
+        await run_store.aupdate(
+            run_id,
+            status="succeeded",
+            progress=100,
+            result=result,
+            finished_at=datetime.now().isoformat(),
+        )
+        RUNS_TOTAL.inc(type="transcribe", status="succeeded")
     except Exception as e:
-        runs[run_id]["status"] = "failed"
-        runs[run_id]["error"] = str(e)
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
+        await run_store.aupdate(run_id, status="failed", error=str(e), finished_at=datetime.now().isoformat())
+        RUNS_TOTAL.inc(type="transcribe", status="failed")
+        logger.warning("Transcrição falhou", extra={"error": str(e)})
 
 @app.post("/v1/evaluate", response_model=RunStatus)
 async def evaluate(request: EvaluateRequest):
     run_id = str(uuid.uuid4())
-    print(f"[IA] Criando run de avaliação: {run_id}")
-    
-    runs[run_id] = {
+
+    await run_store.acreate({
         "id": run_id,
         "type": "evaluate",
-        "status": "running",
+        "status": "queued",
         "progress": 0,
         "result": None,
         "created_at": datetime.now().isoformat()
-    }
+    })
     
-    print(f"[IA] Run criado com sucesso. Total de runs: {len(runs)}")
-    print(f"[IA] Runs disponíveis: {list(runs.keys())}")
+    logger.info("Run de avaliação criado", extra={"run_id": run_id})
+
+    if job_queue is not None:
+        # O worker usa o job_id como id do run; com AI_RUN_STORE=sqlite o status é compartilhado
+        await asyncio.to_thread(job_queue.send, {
+            "job_id": run_id,
+            "type": "score",
+            "tenant_id": request.user_id,
+            "payload": request.model_dump(),
+            "request_id": run_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        return RunStatus(id=run_id, type="evaluate", status="queued", progress=0)
     
-    asyncio.create_task(process_evaluation(run_id, request))
+    enqueued_at = time.monotonic()
+    evaluation_scheduler.submit(
+        request.user_id,
+        lambda: process_evaluation(run_id, request, enqueued_at=enqueued_at),
+    )
     
-    return RunStatus(id=run_id, type="evaluate", status="running", progress=0)
+    return RunStatus(id=run_id, type="evaluate", status="queued", progress=0)
 
-async def process_evaluation(run_id: str, request: EvaluateRequest):
+@app.post("/v1/evaluate/batch", response_model=RunStatus)
+async def evaluate_batch(request: EvaluateBatchRequest):
+    """
+    Avalia várias candidaturas de uma mesma etapa. Cada candidatura ganha seu próprio run
+    (consultável em /v1/runs/{id}); o run do lote agrega o progresso de todos os itens.
+    """
+    if not request.applications:
+        raise HTTPException(status_code=400, detail="Nenhuma candidatura informada para o lote")
+    if len(request.applications) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote excede o limite de {BATCH_MAX_ITEMS} candidaturas",
+        )
+
+    batch_id = str(uuid.uuid4())
+    items: list[Dict[str, Any]] = []
     try:
-        runs[run_id]["progress"] = 20
+        for application in request.applications:
+            item_run_id = str(uuid.uuid4())
+            await run_store.acreate({
+                "id": item_run_id,
+                "type": "evaluate",
+                "status": "queued",
+                "progress": 0,
+                "result": None,
+                "batch_id": batch_id,
+                "created_at": datetime.now().isoformat()
+            })
+            items.append({
+                "application_id": application.application_id,
+                "run_id": item_run_id,
+                "status": "queued",
+                "progress": 0,
+                "error": None,
+            })
+    except RunStoreFullError as e:
+        # Itens já criados não chegam a rodar: finaliza para liberarem espaço no armazenamento
+        for item in items:
+            await run_store.aupdate(item["run_id"], status="failed", error=str(e))
+        raise
+
+    summary = _batch_summary(items)
+    await run_store.acreate({
+        "id": batch_id,
+        "type": "evaluate_batch",
+        "status": "running",
+        "progress": 0,
+        "result": summary,
+        "created_at": datetime.now().isoformat()
+    })
+    logger.info("Lote de avaliação criado", extra={"run_id": batch_id, "applications": len(items)})
+
+    asyncio.create_task(process_evaluation_batch(batch_id, request, items))
+
+    return RunStatus(id=batch_id, type="evaluate_batch", status="running", progress=0, result=summary)
 
-        # Coleta conteúdo de texto
+def _batch_summary(items: list[Dict[str, Any]]) -> Dict[str, Any]:
+    total = len(items)
+    succeeded = sum(1 for item in items if item["status"] == "succeeded")
+    failed = sum(1 for item in items if item["status"] == "failed")
+    queued = sum(1 for item in items if item["status"] == "queued")
+    progress = int(sum(item["progress"] or 0 for item in items) / total) if total else 100
+    return {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": failed,
+        "pending": total - succeeded - failed,
+        "queued": queued,
+        "progress": progress,
+        "items": [dict(item) for item in items],
+    }
+
+async def process_evaluation_batch(batch_id: str, request: EvaluateBatchRequest, items: list[Dict[str, Any]]):
+    """
+    Resolve etapa, requisitos e configuração da IA uma única vez e avalia as candidaturas
+    com concorrência limitada.
+    """
+    set_run_id(batch_id)
+    last_flush = 0.0
+
+    def _flush(force: bool = False) -> None:
+        nonlocal last_flush
+        now = time.monotonic()
+        if not force and now - last_flush < BATCH_PROGRESS_INTERVAL_SECONDS:
+            return
+        last_flush = now
+        summary = _batch_summary(items)
+        run_store.update_soon(batch_id, progress=summary["progress"], result=summary)
+
+    try:
+        with track_stage("config"):
+            config = await get_user_ai_config(request.user_id or "default")
+        stage_context = resolve_stage_context(request.stage, request.requirements)
+    except Exception as e:
+        for item in items:
+            await run_store.aupdate(item["run_id"], status="failed", error=str(e), finished_at=datetime.now().isoformat())
+            item.update(status="failed", error=str(e))
+        await run_store.aupdate(
+            batch_id,
+            status="failed",
+            error=str(e),
+            result=_batch_summary(items),
+            finished_at=datetime.now().isoformat(),
+        )
+        RUNS_TOTAL.inc(type="evaluate_batch", status="failed")
+        return
+
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info("Processando lote", extra={"applications": len(items), "concurrency": concurrency})
+
+    async def _run_item(item: Dict[str, Any], application: BatchApplicationPayload) -> None:
+        def _on_update(fields: Dict[str, Any]) -> None:
+            if "progress" in fields:
+                item["progress"] = fields["progress"]
+            if "status" in fields:
+                item["status"] = fields["status"]
+                item["error"] = fields.get("error")
+            _flush(force="status" in fields)
+
+        item_request = EvaluateRequest(
+            stage_id=request.stage_id,
+            user_id=request.user_id,
+            stage=request.stage,
+            requirements=request.requirements,
+            prompt_template=request.prompt_template,
+            bypass_cache=request.bypass_cache,
+            **application.model_dump(),
+        )
+        # Limite do lote e, dentro dele, os limites globais/por usuário do scheduler
+        enqueued_at = time.monotonic()
+        async with semaphore, evaluation_scheduler.slot(request.user_id):
+            await process_evaluation(
+                item["run_id"],
+                item_request,
+                config=config,
+                stage_context=stage_context,
+                on_update=_on_update,
+                enqueued_at=enqueued_at,
+            )
+
+    await asyncio.gather(*(
+        _run_item(item, application)
+        for item, application in zip(items, request.applications)
+    ))
+
+    summary = _batch_summary(items)
+    batch_status = "failed" if summary["failed"] == summary["total"] else "succeeded"
+    await run_store.aupdate(
+        batch_id,
+        status=batch_status,
+        progress=100,
+        result=summary,
+        finished_at=datetime.now().isoformat(),
+    )
+    RUNS_TOTAL.inc(type="evaluate_batch", status=batch_status)
+    logger.info("Lote concluído", extra={"succeeded": summary["succeeded"], "failed": summary["failed"]})
+
+def resolve_stage_context(
+    stage_payload: StagePayload | None,
+    requirements: list[RequirementPayload] | None,
+) -> Tuple[str, list[dict]]:
+    """
+    Define a descrição da etapa e a lista de requisitos usadas na análise.
+    """
+    stage_description = "Etapa do processo seletivo"
+
+    if stage_payload and stage_payload.name:
+        stage_description = stage_payload.name
+
+    # Priorizar a descrição detalhada da etapa
+    if stage_payload and stage_payload.description:
+        stage_description = stage_payload.description
+    elif stage_payload and stage_payload.job_description:
+        stage_description += f"\nDescrição da vaga: {stage_payload.job_description}"
+
+    # Usar a descrição detalhada da etapa como base para análise
+    # Se não houver requisitos específicos, usar a descrição da etapa
+    if requirements and len(requirements) > 0:
+        # Se há requisitos específicos, usar eles
+        requirements_payload = [
+            {
+                "label": req.label or "",
+                "description": req.description or "",
+                "weight": req.weight or 1.0,
+            }
+            for req in requirements
+        ]
+    else:
+        # Se não há requisitos específicos, criar um requisito baseado na descrição da etapa
+        requirements_payload = [
+            {
+                "label": "Requisitos da Etapa",
+                "description": stage_description,
+                "weight": 1.0,
+            }
+        ]
+
+    return stage_description, requirements_payload
+
+async def process_evaluation(
+    run_id: str,
+    request: EvaluateRequest,
+    config: AIConfig | None = None,
+    stage_context: Tuple[str, list[dict]] | None = None,
+    on_update: Callable[[Dict[str, Any]], None] | None = None,
+    enqueued_at: float | None = None,
+    retry_on_error: bool = False,
+):
+    """
+    Executa a avaliação de uma candidatura. Em lotes, config e stage_context já resolvidos
+    são reaproveitados e on_update recebe cada alteração do run. enqueued_at (time.monotonic())
+    permite registrar o tempo de espera na fila no perfil do run. Com retry_on_error (jobs da
+    fila), uma falha deixa o run em "retrying" e é propagada para o worker reagendar.
+    """
+    async def _update(**fields: Any) -> None:
+        await run_store.aupdate(run_id, **fields)
+        if on_update:
+            on_update(fields)
+
+    # Os logs desta task (e das que ela criar) passam a carregar o run_id
+    set_run_id(run_id)
+    queue_wait = time.monotonic() - enqueued_at if enqueued_at is not None else None
+    if queue_wait is not None:
+        STAGE_SECONDS.observe(queue_wait, stage="queue_wait")
+    profile = start_profile(queue_wait)
+    started = time.perf_counter()
+    try:
+        await _update(status="running", progress=20)
+
+        # Coleta conteúdo de texto; transcrições (áudio e arquivo) são avaliadas à parte, por janelas
         text_content = ""
+        transcripts: list[str] = []
         extraction_warnings: list[str] = []
 
-        print("[IA] Recebido currículo:", request.resume_path, request.resume_bucket, request.resume_signed_url)
-
         if request.resume_path:
-            runs[run_id]["progress"] = 40
+            await _update(progress=40)
             resume_text = ""
             resume_warnings: list[str] = []
             try:
-                print(f"[IA] ========== DEBUG EXTRAÇÃO DE CURRÍCULO ==========")
-                print(f"[IA] Tentando extrair currículo:")
-                print(f"[IA]   - resume_path: {request.resume_path}")
-                print(f"[IA]   - resume_signed_url: {request.resume_signed_url}")
-                print(f"[IA]   - resume_bucket: {request.resume_bucket}")
-
+                logger.debug(
+                    "Extraindo currículo",
+                    extra={
+                        "resume_path": request.resume_path,
+                        "resume_bucket": request.resume_bucket,
+                        "signed_url": bool(request.resume_signed_url),
+                    },
+                )
                 resume_text, resume_warnings = await extract_resume_text(
                     request.resume_path,
                     request.resume_signed_url,
                     request.resume_bucket,
                 )
-                print(f"[IA] ========== RESULTADO DA EXTRAÇÃO ==========")
-                print(f"[IA] Texto extraído do currículo ({len(resume_text)} chars):")
-                print(f"[IA] ========== CONTEÚDO COMPLETO ==========")
-                print(f"[IA] {resume_text}")
-                print(f"[IA] ========== FIM DO CONTEÚDO ==========")
-                print(f"[IA] Warnings da extração: {resume_warnings}")
+                logger.info(
+                    "Currículo extraído",
+                    extra={"chars": len(resume_text), "warnings": resume_warnings},
+                )
+                log_payload(logger, "Texto do currículo", resume_text)
             except Exception as ex:
                 resume_warnings.append(f"Falha ao ler currículo: {ex}")
-                print(f"[IA] Erro ao extrair currículo: {ex}")
+                logger.warning("Erro ao extrair currículo", extra={"error": str(ex)})
 
+            profile_set("chars_extracted", len(resume_text))
             if resume_text:
                 text_content += resume_text + "\n\n"
-                print(f"[IA] Currículo adicionado ao conteúdo total")
-                print(f"[IA] Texto do currículo extraído: {resume_text[:200]}...")
             else:
-                print("[IA] AVISO: Nenhum texto extraído do currículo")
+                logger.warning("Nenhum texto extraído do currículo")
             extraction_warnings.extend(resume_warnings)
         
         if request.audio_path:
-            runs[run_id]["progress"] = 60
-            text_content += await process_audio(request.audio_path) + "\n\n"
+            await _update(progress=60)
+            try:
+                with track_stage("audio"):
+                    audio_result = await process_audio(
+                        request.audio_signed_url or request.audio_path, request.audio_bucket
+                    )
+                if audio_result["transcript"]:
+                    # Segmentos com dica de locutor viram linhas "S1: fala" para o índice de locutores
+                    audio_turns = parse_transcript_json(audio_result)
+                    transcripts.append(render_turns(audio_turns) if audio_turns else audio_result["transcript"])
+            except Exception as ex:
+                extraction_warnings.append(f"Falha ao transcrever áudio: {ex}")
+                logger.warning("Erro ao transcrever áudio", extra={"error": str(ex)})
 
         if request.transcript_path:
-            runs[run_id]["progress"] = 80
-            text_content += await analyze_transcript(request.transcript_path) + "\n\n"
+            await _update(progress=80)
+            try:
+                with track_stage("transcript"):
+                    transcript_text, transcript_warnings = await read_transcript_text(
+                        request.transcript_path, request.transcript_signed_url, request.transcript_bucket
+                    )
+                extraction_warnings.extend(transcript_warnings)
+                if transcript_text:
+                    transcripts.append(transcript_text)
+            except Exception as ex:
+                extraction_warnings.append(f"Falha ao ler transcrição: {ex}")
+                logger.warning("Erro ao ler transcrição", extra={"error": str(ex)})
         
         # Buscar configurações da IA do usuário
-        print(f"[IA] User ID recebido: {request.user_id}")
-        print(f"[IA] Tipo do user_id: {type(request.user_id)}")
-        print(f"[IA] User ID será usado: {request.user_id or 'default'}")
-        config = await get_user_ai_config(request.user_id or "default")
+        if config is None:
+            with track_stage("config"):
+                config = await get_user_ai_config(request.user_id or "default")
 
         # Define descrição da etapa e requisitos com base no payload fornecido
-        stage_payload = request.stage
-        stage_description = "Etapa do processo seletivo"
-
-        if stage_payload and stage_payload.name:
-            stage_description = stage_payload.name
-
-        # Priorizar a descrição detalhada da etapa
-        if stage_payload and stage_payload.description:
-            stage_description = stage_payload.description
-        elif stage_payload and stage_payload.job_description:
-            stage_description += f"\nDescrição da vaga: {stage_payload.job_description}"
-        
-        # Usar a descrição detalhada da etapa como base para análise
-        # Se não houver requisitos específicos, usar a descrição da etapa
-        requirements_payload = []
-        
-        if request.requirements and len(request.requirements) > 0:
-            # Se há requisitos específicos, usar eles
-            requirements_payload = [
-                {
-                    "label": req.label or "",
-                    "description": req.description or "",
-                    "weight": req.weight or 1.0,
-                }
-                for req in request.requirements
-            ]
-        else:
-            # Se não há requisitos específicos, criar um requisito baseado na descrição da etapa
-            requirements_payload = [
-                {
-                    "label": "Requisitos da Etapa",
-                    "description": stage_description,
-                    "weight": 1.0,
-                }
-            ]
+        if stage_context is None:
+            stage_context = resolve_stage_context(request.stage, request.requirements)
+        stage_description, requirements_payload = stage_context
         
-        print(f"[IA] Descrição da etapa: {stage_description}")
-        print(f"[IA] Requisitos para análise ({len(requirements_payload)}): {requirements_payload}")
-        print(f"[IA] ========== DEBUG CONTEÚDO PARA ANÁLISE ==========")
-        print(f"[IA] Conteúdo total para análise ({len(text_content)} chars):")
-        print(f"[IA] ========== CONTEÚDO COMPLETO ==========")
-        print(f"[IA] {text_content}")
-        print(f"[IA] ========== FIM DO CONTEÚDO ==========")
-        # Análise da IA
-        runs[run_id]["progress"] = 90
-        print(f"[IA] Chamando analyze_candidate_with_openai com config: {config}")
-        print(f"[IA] Config OpenAI key: {config.openai_api_key[:10] if config.openai_api_key else 'VAZIA'}...")
-        evaluation = await analyze_candidate_with_openai(
-            text_content,
-            stage_description,
-            requirements_payload,
-            config,
-            prompt_template=None,
+        log_payload(logger, "Requisitos para análise", requirements_payload)
+
+        # Compacta o texto (boilerplate, espaços, seções menos relevantes) antes do LLM
+        terms = extract_terms(
+            [stage_description]
+            + [f"{req.get('label', '')} {req.get('description', '')}" for req in requirements_payload]
+        )
+        with track_stage("compaction"):
+            compaction = compact_text(text_content, terms, PROMPT_TEXT_MAX_TOKENS)
+        compaction_stats.record(compaction)
+        text_content = compaction.text
+        logger.info("Texto compactado para o LLM", extra=compaction.metrics())
+        log_payload(logger, "Conteúdo para análise", text_content)
+        # Análise da IA: currículo e transcrição em paralelo
+        await _update(progress=90)
+        transcript_analysis = None
+        interview = None
+        if transcripts:
+            interview = asyncio.create_task(
+                analyze_interview("\n\n".join(transcripts), stage_description, requirements_payload, config)
+            )
+        try:
+            if text_content.strip() or interview is None:
+                evaluation = await analyze_candidate_with_openai(
+                    text_content,
+                    stage_description,
+                    requirements_payload,
+                    config,
+                    prompt_template=None,
+                    bypass_cache=request.bypass_cache,
+                    user_id=request.user_id,
+                )
+            else:
+                evaluation = None
+            if interview is not None:
+                # Falha na entrevista falha o run: a nota sem ela não representaria o candidato
+                transcript_analysis = await interview
+        finally:
+            if interview is not None and not interview.done():
+                interview.cancel()
+
+        resume_score = evaluation.score if evaluation is not None else None
+        if evaluation is not None and transcript_analysis is not None:
+            # Currículo e entrevista: a nota final combina as duas (AI_TRANSCRIPT_SCORE_WEIGHT)
+            evaluation.score = round(
+                (1 - TRANSCRIPT_SCORE_WEIGHT) * evaluation.score
+                + TRANSCRIPT_SCORE_WEIGHT * transcript_analysis["score"],
+                1,
+            )
+        elif evaluation is None:
+            # Sem currículo: a avaliação da entrevista é o resultado principal
+            evaluation = EvaluationResult(
+                score=transcript_analysis["score"],
+                analysis=transcript_analysis["analysis"],
+                matched_requirements=transcript_analysis["matched_requirements"],
+                missing_requirements=transcript_analysis["missing_requirements"],
+                strengths=transcript_analysis["strengths"],
+                weaknesses=transcript_analysis["weaknesses"],
+                recommendations=[],
+            )
+        logger.info(
+            "Resultado da análise",
+            extra={
+                "score": evaluation.score,
+                "strengths": len(evaluation.strengths),
+                "weaknesses": len(evaluation.weaknesses),
+            },
         )
-        print(f"[IA] Resultado da análise: score={evaluation.score}, strengths={len(evaluation.strengths)}, weaknesses={len(evaluation.weaknesses)}")
-        
-        runs[run_id]["status"] = "succeeded"
-        runs[run_id]["progress"] = 100
         
         # Preparar resultado da análise
         analysis_result = {
@@ -1041,7 +1835,16 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
             "strengths": evaluation.strengths,
             "weaknesses": evaluation.weaknesses,
             "recommendations": evaluation.recommendations,
+            # Notas que compõem score (null quando a parte não foi avaliada)
+            "resume_score": resume_score,
+            "interview_score": transcript_analysis["score"] if transcript_analysis is not None else None,
+            "transcript_analysis": transcript_analysis,
             "extraction_warnings": extraction_warnings,
+            "compaction": compaction.metrics(),
+            # Retentativas das chamadas do currículo e da entrevista
+            "llm_retries": evaluation.llm_retries + (transcript_analysis or {}).get("llm_retries", 0),
+            # Perfil até o resultado; a gravação no banco é em lote (smarthire_db_flush_duration_seconds)
+            "timings": profile.as_dict(),
             "stage_id": request.stage_id,
             "application_id": request.application_id,
             "prompt_template": None,
@@ -1049,88 +1852,151 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
             "requirements": [req.model_dump() for req in (request.requirements or [])],
         }
         
-        runs[run_id]["result"] = analysis_result
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
-        
-        # Salvar resultado no banco de dados
-        await save_analysis_to_database(run_id, analysis_result)
+        await _update(
+            status="succeeded",
+            progress=100,
+            result=analysis_result,
+            error=None,
+            finished_at=datetime.now().isoformat(),
+        )
         
+        # Salvar resultado no banco de dados (write-behind, gravado em lote)
+        result_writer.add({
+            "run_id": run_id,
+            "status": "succeeded",
+            "result": analysis_result,
+            "error": None,
+            "finished_at": datetime.now().isoformat(),
+        })
+        RUNS_TOTAL.inc(type="evaluate", status="succeeded")
+        logger.info("Avaliação concluída", extra={"timings": profile.as_dict()})
+
     except Exception as e:
-        runs[run_id]["status"] = "failed"
-        runs[run_id]["error"] = str(e)
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
+        if retry_on_error:
+            # Não terminal: o worker reagenda o job e só a DLQ marca o run como "failed"
+            await _update(status="retrying", error=str(e))
+            RUNS_TOTAL.inc(type="evaluate", status="retrying")
+            logger.warning("Avaliação falhou; nova tentativa pela fila", extra={"error": str(e), "timings": profile.as_dict()})
+            raise
+        await _update(status="failed", error=str(e), finished_at=datetime.now().isoformat())
+        RUNS_TOTAL.inc(type="evaluate", status="failed")
+        logger.warning("Avaliação falhou", extra={"error": str(e), "timings": profile.as_dict()})
+    finally:
+        RUN_SECONDS.observe(time.perf_counter() - started, type="evaluate")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "runs_count": len(runs), "timestamp": datetime.now().isoformat()}
+    runs_count, runs_bytes = await asyncio.to_thread(lambda: (run_store.count(), run_store.total_bytes()))
+    return {
+        "status": "ok",
+        "runs_count": runs_count,
+        "runs_bytes": runs_bytes,
+        "runs_evicted_total": run_store.evicted_total(),
+        "queue": evaluation_scheduler.stats(),
+        "ai_config_cache": ai_config_cache.stats(),
+        "resume_text_cache": resume_text_cache.stats() if resume_text_cache else None,
+        "transcript_index_cache": transcript_index_cache.stats() if transcript_index_cache else None,
+        "extraction": extraction_engine.stats(),
+        "compaction": compaction_stats.stats(),
+        "llm_response_cache": llm_response_cache.stats() if llm_response_cache else None,
+        "openai_rate_limit": openai_rate_limiter.stats(),
+        "run_events": run_events.stats(),
+        "result_writer": result_writer.stats(),
+        "transcription": audio_transcriber.stats(),
+        "job_queue": job_queue.stats() if job_queue else None,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/v1/runs/{run_id}", response_model=RunStatus)
 async def get_run(run_id: str):
-    print(f"[IA] GET /v1/runs/{run_id}")
-    print(f"[IA] Runs disponíveis: {list(runs.keys())}")
-    
-    if run_id not in runs:
-        print(f"[IA] Run {run_id} não encontrado")
+    run_data = await run_store.aget(run_id)
+    if run_data is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    
-    run_data = runs[run_id]
-    print(f"[IA] Run encontrado: {run_data}")
+
     return RunStatus(
         id=run_data["id"],
         type=run_data["type"],
         status=run_data["status"],
         progress=run_data["progress"],
         error=run_data.get("error"),
-        result=run_data.get("result")
+        result=run_data.get("result"),
+        attempts=run_data.get("attempts"),
     )
 
-# Função para salvar análise no banco de dados
-async def save_analysis_to_database(run_id: str, analysis_result: dict):
+@app.get("/v1/runs/{run_id}/events")
+async def get_run_events(run_id: str):
     """
-    Salva o resultado da análise no banco de dados
+    Stream SSE com o progresso e o resultado do run (para lotes, também dos itens).
     """
-    try:
-        storage_url = os.getenv("SUPABASE_STORAGE_URL")
-        service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        
-        if not storage_url or not service_role:
-            print(f"[IA] Aviso: Não foi possível salvar análise {run_id} - variáveis de ambiente não configuradas")
-            return
-            
-        supabase_url = storage_url.replace("/storage/v1", "")
-        
-        async with httpx.AsyncClient() as client:
-            # Atualizar o registro na tabela stage_ai_runs usando WHERE clause
-            response = await client.patch(
-                f"{supabase_url}/rest/v1/stage_ai_runs?run_id=eq.{run_id}",
-                json={
-                    "result": analysis_result,
-                    "status": "succeeded",
-                    "finished_at": datetime.now().isoformat()
-                },
-                headers={
-                    "apikey": service_role,
-                    "Authorization": f"Bearer {service_role}",
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Prefer": "return=minimal"
-                },
-                timeout=10.0,
-            )
-            
-            if response.status_code in [200, 204]:
-                print(f"[IA] Análise {run_id} salva no banco com sucesso")
-            else:
-                print(f"[IA] Erro ao salvar análise {run_id}: {response.status_code} - {response.text}")
-                
-    except Exception as e:
-        print(f"[IA] Erro ao salvar análise {run_id} no banco: {e}")
+    if await run_store.aget(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return StreamingResponse(
+        stream_run_events(run_store, run_events, run_id, SSE_POLL_INTERVAL_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Gravação dos resultados no banco de dados (em lote, via ResultWriteBehind)
+async def save_runs_to_database(rows: list[Dict[str, Any]], client: httpx.AsyncClient | None = None) -> None:
+    """
+    Grava em stage_ai_runs o resultado de vários runs numa única chamada à função
+    save_stage_ai_runs_results (migração 0023). Sem a função no banco, recai em um PATCH
+    por run. Levanta exceção em caso de falha, para que o lote seja repetido ou vá ao spool.
+    """
+    storage_url = os.getenv("SUPABASE_STORAGE_URL")
+    service_role = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+    if not storage_url or not service_role:
+        logger.warning("Resultados não salvos no banco - variáveis de ambiente não configuradas", extra={"rows": len(rows)})
+        return
+
+    supabase_url = storage_url.replace("/storage/v1", "")
+    headers = {
+        "apikey": service_role,
+        "Authorization": f"Bearer {service_role}",
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal",
+    }
+
+    client = resolve_client(client, http_pool, SUPABASE)
+    with DB_FLUSH_SECONDS.time():
+        response = await client.post(
+            f"{supabase_url}/rest/v1/rpc/save_stage_ai_runs_results",
+            json={"p_runs": rows},
+            headers=headers,
+            timeout=30.0,
+        )
+        if response.status_code == 404:
+            # Migração 0023 ainda não aplicada: um PATCH por run
+            for row in rows:
+                patch = await client.patch(
+                    f"{supabase_url}/rest/v1/stage_ai_runs?run_id=eq.{row['run_id']}",
+                    json={key: value for key, value in row.items() if key != "run_id"},
+                    headers=headers,
+                    timeout=10.0,
+                )
+                if patch.status_code not in (200, 204):
+                    raise RuntimeError(f"Erro ao salvar run {row['run_id']}: {patch.status_code} - {patch.text[:500]}")
+        elif response.status_code not in (200, 204):
+            raise RuntimeError(f"Erro ao salvar resultados: {response.status_code} - {response.text[:500]}")
+
+    logger.info("Resultados salvos no banco", extra={"rows": len(rows)})
+
+
+# Resultados finalizados gravados em lote (AI_DB_WRITE_*), com spool local em caso de falha
+result_writer = ResultWriteBehind.from_env(save_runs_to_database)
 
 @app.get("/health")
 async def health():
     return {
         "status": "healthy", 
-        "runs_active": len([r for r in runs.values() if r["status"] == "running"]),
+        "runs_active": evaluation_scheduler.running,
+        "runs_queued": evaluation_scheduler.queued,
         "version": "0.2.0"
     }
 
@@ -1138,35 +2004,42 @@ async def health():
 @app.post("/v1/test-config")
 async def test_config(config: AIConfig):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {config.openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": config.model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": "Teste de conexão. Responda apenas 'OK' se recebeu esta mensagem."
-                        }
-                    ],
-                    "max_tokens": 10,
-                    "temperature": 0
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                return {"success": True, "message": "Configuração válida"}
-            else:
-                return {"success": False, "message": f"Erro: {response.status_code}"}
-                
+        client = http_pool.openai
+        response = await client.post(
+            f"{OPENAI_API_BASE}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {config.openai_api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": config.model,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": "Teste de conexão. Responda apenas 'OK' se recebeu esta mensagem."
+                    }
+                ],
+                "max_tokens": 10,
+                "temperature": 0
+            },
+            timeout=10.0
+        )
+
+        if response.status_code == 200:
+            return {"success": True, "message": "Configuração válida"}
+        else:
+            return {"success": False, "message": f"Erro: {response.status_code}"}
+
     except Exception as e:
         return {"success": False, "message": f"Erro: {str(e)}"}
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Como script, este arquivo seria o __main__ e cada worker "spawn" do ExtractionEngine o
+    # reimportaria inteiro (app, pools, caches). Pelo uvicorn, o app é importado pelo nome do
+    # módulo e os workers carregam apenas os módulos das funções que executam.
+    import sys
+
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main_enhanced:app",
+        "--app-dir", str(Path(__file__).resolve().parent), "--host", "0.0.0.0", "--port", "8000",
+    ])
@@ -7,10 +7,12 @@ import httpx
 import json
 import uuid
 import base64
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 from resume_analysis_utils import prepare_structured_analysis
+from run_store import RunStoreFullError, create_run_store_from_env, sweep_periodically
 
 # Configuração básica
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -69,8 +71,8 @@ class EvaluationResult(BaseModel):
     weaknesses: List[str] = Field(default_factory=list)
     recommendations: List[str] = Field(default_factory=list)
 
-# Dicionário em memória para rastrear runs
-runs: Dict[str, Dict[str, Any]] = {}
+# Armazenamento dos runs (AI_RUN_STORE=memory | sqlite; sqlite é compartilhado entre workers)
+run_store = create_run_store_from_env()
 
 async def extract_resume_text(resume_path: str, resume_signed_url: str, resume_bucket: str) -> tuple[str, list[str]]:
     """
@@ -563,29 +565,44 @@ async def save_analysis_to_database(run_id: str, analysis_result: dict):
 
 # Configuração do servidor FastAPI
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Varredura periódica da política de retenção dos runs
+    sweeper = asyncio.create_task(sweep_periodically(run_store))
+    try:
+        yield
+    finally:
+        sweeper.cancel()
 
 app = FastAPI(
     title="SmartHire AI Service",
     description="Serviço de IA para análise de candidatos",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
+@app.exception_handler(RunStoreFullError)
+async def run_store_full_handler(request, exc: RunStoreFullError):
+    # Todos os runs armazenados estão em andamento: o cliente deve tentar novamente mais tarde
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "30"})
+
 @app.post("/v1/evaluate", response_model=RunStatus)
 async def evaluate(request: EvaluateRequest):
     run_id = str(uuid.uuid4())
     print(f"[IA] Criando run de avaliação: {run_id}")
 
-    runs[run_id] = {
+    await run_store.acreate({
         "id": run_id,
         "type": "evaluate",
         "status": "running",
         "progress": 0,
         "result": None,
         "created_at": datetime.now().isoformat()
-    }
+    })
 
-    print(f"[IA] Run criado com sucesso. Total de runs: {len(runs)}")
-    print(f"[IA] Runs disponíveis: {list(runs.keys())}")
+    print(f"[IA] Run criado com sucesso: {run_id}")
 
     asyncio.create_task(process_evaluation(run_id, request))
 
@@ -593,7 +610,7 @@ async def evaluate(request: EvaluateRequest):
 
 async def process_evaluation(run_id: str, request: EvaluateRequest):
     try:
-        runs[run_id]["progress"] = 20
+        await run_store.aupdate(run_id, progress=20)
 
         # Coleta conteúdo de texto
         text_content = ""
@@ -606,7 +623,7 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
         print(f"[IA]   - resume_bucket: {request.resume_bucket}")
 
         if request.resume_path:
-            runs[run_id]["progress"] = 40
+            await run_store.aupdate(run_id, progress=40)
             resume_text = ""
             resume_warnings: list[str] = []
             try:
@@ -634,11 +651,11 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
             extraction_warnings.extend(resume_warnings)
 
         if request.audio_path:
-            runs[run_id]["progress"] = 60
+            await run_store.aupdate(run_id, progress=60)
             text_content += await process_audio(request.audio_path) + "\n\n"
 
         if request.transcript_path:
-            runs[run_id]["progress"] = 80
+            await run_store.aupdate(run_id, progress=80)
             text_content += await analyze_transcript(request.transcript_path) + "\n\n"
 
         # Buscar configurações da IA do usuário
@@ -687,7 +704,7 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
         print(f"[IA] {text_content}")
         print(f"[IA] ========== FIM DO CONTEÚDO ==========")
         # Análise da IA
-        runs[run_id]["progress"] = 90
+        await run_store.aupdate(run_id, progress=90)
         print(f"[IA] Chamando analyze_candidate_with_openai com config: {config}")
         print(f"[IA] Config OpenAI key: {config.openai_api_key[:10] if config.openai_api_key else 'VAZIA'}...")
         evaluation = await analyze_candidate_with_openai(
@@ -699,37 +716,43 @@ async def process_evaluation(run_id: str, request: EvaluateRequest):
         )
         print(f"[IA] Resultado da análise: score={evaluation.score}, strengths={len(evaluation.strengths)}, weaknesses={len(evaluation.weaknesses)}")
 
-        runs[run_id]["status"] = "succeeded"
-        runs[run_id]["progress"] = 100
-
         # Preparar resultado da análise
         analysis_result_dict = evaluation.model_dump()
-        runs[run_id]["result"] = analysis_result_dict
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
+        await run_store.aupdate(
+            run_id,
+            status="succeeded",
+            progress=100,
+            result=analysis_result_dict,
+            finished_at=datetime.now().isoformat(),
+        )
 
         # Salvar análise no banco de dados
         await save_analysis_to_database(run_id, analysis_result_dict)
         print(f"[IA] Análise {run_id} salva no banco com sucesso")
 
     except Exception as e:
-        runs[run_id]["status"] = "failed"
-        runs[run_id]["error"] = str(e)
-        runs[run_id]["finished_at"] = datetime.now().isoformat()
+        await run_store.aupdate(run_id, status="failed", error=str(e), finished_at=datetime.now().isoformat())
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "runs_count": len(runs), "timestamp": datetime.now().isoformat()}
+    runs_count, runs_bytes = await asyncio.to_thread(lambda: (run_store.count(), run_store.total_bytes()))
+    return {
+        "status": "ok",
+        "runs_count": runs_count,
+        "runs_bytes": runs_bytes,
+        "runs_evicted_total": run_store.evicted_total(),
+        "timestamp": datetime.now().isoformat(),
+    }
 
 @app.get("/v1/runs/{run_id}", response_model=RunStatus)
 async def get_run(run_id: str):
     print(f"[IA] GET /v1/runs/{run_id}")
-    print(f"[IA] Runs disponíveis: {list(runs.keys())}")
 
-    if run_id not in runs:
+    run_data = await run_store.aget(run_id)
+    if run_data is None:
         print(f"[IA] Run {run_id} não encontrado")
         raise HTTPException(status_code=404, detail="Run not found")
 
-    run_data = runs[run_id]
     print(f"[IA] Run encontrado: {run_data}")
     return RunStatus(
         id=run_data["id"],
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RetryableOpenAIError(Exception):
+    """
+    Resposta transitória da OpenAI (429 por limite de taxa ou 5xx) que pode ser repetida.
+    """
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(f"Erro na API OpenAI: {status_code} - {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Converte durações dos headers x-ratelimit-reset-* ("1s", "6m0s", "20ms") em segundos.
+    """
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value.strip())
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Lê retry-after-ms / Retry-After (segundos ou data HTTP) em segundos.
+    """
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket assíncrono. A capacidade e o saldo são corrigidos pelos headers
+    x-ratelimit-* de cada resposta, e um 429 bloqueia o bucket até o reset informado.
+    """
+
+    def __init__(self, capacity: float, period_seconds: float = 60.0) -> None:
+        self.capacity = capacity
+        self.period_seconds = period_seconds
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Aguarda saldo para amount e o consome. Retorna o tempo esperado (s).
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = max(0.0, self.blocked_until - now)
+                if not delay and self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                if not delay:
+                    delay = (amount - self.tokens) / (self.capacity / self.period_seconds)
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.block_for(reset_seconds)
+
+    def block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / self.period_seconds)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+@dataclass
+class _KeyBuckets:
+    requests: TokenBucket
+    tokens: TokenBucket
+
+
+class OpenAIRateLimiter:
+    """
+    Limites de requisições e tokens por chave de API, compartilhados entre as avaliações
+    concorrentes do processo. Começa com AI_OPENAI_RPM/AI_OPENAI_TPM e se ajusta aos headers.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200_000) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._buckets: Dict[str, _KeyBuckets] = {}
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "OpenAIRateLimiter":
+        return cls(
+            requests_per_minute=float(os.getenv("AI_OPENAI_RPM", "500")),
+            tokens_per_minute=float(os.getenv("AI_OPENAI_TPM", "200000")),
+        )
+
+    def _for_key(self, api_key: str) -> _KeyBuckets:
+        # A chave nunca é mantida em memória em claro
+        key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        buckets = self._buckets.get(key_id)
+        if buckets is None:
+            buckets = _KeyBuckets(TokenBucket(self.requests_per_minute), TokenBucket(self.tokens_per_minute))
+            self._buckets[key_id] = buckets
+        return buckets
+
+    async def acquire(self, api_key: str, estimated_tokens: int) -> None:
+        buckets = self._for_key(api_key)
+        waited = await buckets.requests.acquire(1)
+        waited += await buckets.tokens.acquire(estimated_tokens)
+        self.throttled_seconds += waited
+
+    def observe(self, api_key: str, headers: Mapping[str, str]) -> None:
+        buckets = self._for_key(api_key)
+        buckets.requests.observe(
+            _header_float(headers, "x-ratelimit-limit-requests"),
+            _header_float(headers, "x-ratelimit-remaining-requests"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        buckets.tokens.observe(
+            _header_float(headers, "x-ratelimit-limit-tokens"),
+            _header_float(headers, "x-ratelimit-remaining-tokens"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+    def penalize(self, api_key: str, seconds: float) -> None:
+        """
+        Após um 429, bloqueia todas as avaliações da mesma chave até o Retry-After.
+        """
+        buckets = self._for_key(api_key)
+        buckets.requests.block_for(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._buckets), "throttled_seconds": round(self.throttled_seconds, 3)}
+
+
+def _is_quota_exhausted(response: httpx.Response) -> bool:
+    try:
+        error = (response.json().get("error") or {})
+    except Exception:
+        return False
+    return error.get("code") == "insufficient_quota" or error.get("type") == "insufficient_quota"
+
+
+async def post_chat_completion(
+    client: httpx.AsyncClient,
+    url: str,
+    api_key: str,
+    payload: Dict[str, Any],
+    limiter: OpenAIRateLimiter,
+    estimated_tokens: int,
+    max_retries: int = 4,
+    max_wait_seconds: float = 60.0,
+    timeout: float = 30.0,
+) -> Tuple[httpx.Response, int]:
+    """
+    POST em chat/completions respeitando o rate limiter da chave. 429 (exceto cota esgotada),
+    5xx e falhas de rede são repetidos com backoff exponencial ou pelo Retry-After.
+    Retorna (resposta, número de retentativas); outras respostas de erro são devolvidas ao chamador.
+    """
+    exponential = wait_exponential_jitter(initial=1, max=max_wait_seconds)
+
+    def _wait(retry_state) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        if isinstance(exc, RetryableOpenAIError) and exc.retry_after is not None:
+            return min(exc.retry_after, max_wait_seconds)
+        return exponential(retry_state)
+
+    retries = 0
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(max_retries + 1),
+        wait=_wait,
+        retry=retry_if_exception_type((RetryableOpenAIError, httpx.TransportError)),
+        reraise=True,
+    ):
+        with attempt:
+            retries = attempt.retry_state.attempt_number - 1
+            await limiter.acquire(api_key, estimated_tokens)
+            response = await client.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                },
+                json=payload,
+                timeout=timeout,
+            )
+            limiter.observe(api_key, response.headers)
+
+            if response.status_code == 429 and not _is_quota_exhausted(response):
+                retry_after = parse_retry_after(response.headers)
+                if retry_after is not None:
+                    limiter.penalize(api_key, retry_after)
+                raise RetryableOpenAIError(response.status_code, response.text, retry_after)
+            if response.status_code >= 500:
+                raise RetryableOpenAIError(response.status_code, response.text, parse_retry_after(response.headers))
+    return response, retries
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential_jitter
+
+from structured_logging import get_logger
+
+logger = get_logger("result_writer")
+
+FlushBatch = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class ResultWriteBehind:
+    """
+    Buffer write-behind dos resultados finalizados. As linhas (uma por run_id; a mais recente
+    vence) são gravadas em lote por flush_batch ao atingir max_batch_size ou a cada
+    flush_interval_seconds. Lotes que falham após as retentativas vão para um spool local
+    (JSON lines) e são reenviados no próximo flush bem-sucedido e na inicialização.
+    """
+
+    def __init__(
+        self,
+        flush_batch: FlushBatch,
+        max_batch_size: int = 50,
+        flush_interval_seconds: float = 2.0,
+        max_retries: int = 3,
+        spool_dir: str | Path | None = None,
+    ) -> None:
+        self._flush_batch = flush_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Cada processo grava no próprio arquivo; a reprodução considera o diretório inteiro
+        self._spool_name = f"spool-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_spooled = 0
+        self.rows_replayed = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, flush_batch: FlushBatch) -> "ResultWriteBehind":
+        # O spool guarda resultados completos das avaliações: só com diretório explícito, nunca no tmp compartilhado
+        spool_dir = os.getenv("AI_DB_SPOOL_DIR", "").strip() or None
+        if spool_dir is None:
+            logger.warning("AI_DB_SPOOL_DIR não definido: lotes que falharem após as retentativas serão descartados")
+        return cls(
+            flush_batch,
+            max_batch_size=int(os.getenv("AI_DB_WRITE_BATCH_SIZE", "50")),
+            flush_interval_seconds=float(os.getenv("AI_DB_WRITE_INTERVAL_SECONDS", "2")),
+            max_retries=int(os.getenv("AI_DB_WRITE_MAX_RETRIES", "3")),
+            spool_dir=spool_dir,
+        )
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._pending[row["run_id"]] = row
+        if self._wake is not None and len(self._pending) >= self.max_batch_size:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        """
+        Grava tudo o que está pendente, em lotes de até max_batch_size.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            flushed = False
+            while self._pending:
+                batch_ids = list(self._pending)[: self.max_batch_size]
+                rows = [self._pending.pop(run_id) for run_id in batch_ids]
+                if await self._write(rows):
+                    flushed = True
+                else:
+                    await asyncio.to_thread(self._spool, rows)
+            if flushed:
+                await self._replay_spool()
+
+    async def close(self) -> None:
+        """
+        Encerra o flush periódico e grava (ou envia ao spool) o que estiver pendente.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "rows_spooled": self.rows_spooled,
+            "rows_replayed": self.rows_replayed,
+            "failures": self.failures,
+        }
+
+    async def _run(self) -> None:
+        assert self._wake is not None and self._flush_lock is not None
+        # Linhas deixadas no spool por execuções anteriores (inclusive de outros workers),
+        # reenviadas em background para não atrasar a inicialização se o banco estiver fora
+        try:
+            async with self._flush_lock:
+                await self._replay_spool(include_claimed=True)
+        except Exception:
+            logger.exception("Falha ao reenviar o spool de resultados")
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Falha no flush dos resultados")
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        started = time.perf_counter()
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_retries + 1),
+                wait=wait_exponential_jitter(initial=0.5, max=10),
+                reraise=True,
+            ):
+                with attempt:
+                    await self._flush_batch(rows)
+        except Exception as e:
+            self.failures += 1
+            logger.error(
+                "Falha ao gravar resultados no banco; enviando ao spool",
+                extra={"rows": len(rows), "error": str(e)},
+            )
+            return False
+        self.rows_written += len(rows)
+        self.batches_written += 1
+        logger.debug(
+            "Resultados gravados no banco",
+            extra={"rows": len(rows), "seconds": round(time.perf_counter() - started, 3)},
+        )
+        return True
+
+    def _spool(self, rows: List[Dict[str, Any]]) -> None:
+        if self.spool_dir is None:
+            logger.error("Resultados descartados (spool desabilitado)", extra={"rows": len(rows)})
+            return
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_dir / self._spool_name, "a", encoding="utf-8") as handle:
+                for row in rows:
+                    handle.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+        except OSError as e:
+            logger.error("Falha ao gravar spool de resultados", extra={"rows": len(rows), "error": str(e)})
+            return
+        self.rows_spooled += len(rows)
+
+    def _claim_spool_files(self, include_claimed: bool) -> List[Path]:
+        if self.spool_dir is None or not self.spool_dir.is_dir():
+            return []
+        candidates = list(self.spool_dir.glob("*.jsonl"))
+        if include_claimed:
+            # Arquivos reivindicados por uma reprodução interrompida (queda do worker)
+            candidates.extend(self.spool_dir.glob("*.claimed"))
+        claimed: List[Path] = []
+        for path in candidates:
+            target = path.with_name(f"{path.stem}-{uuid.uuid4().hex[:8]}.claimed")
+            try:
+                # rename é atômico: apenas um worker reivindica cada arquivo
+                path.rename(target)
+            except OSError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _read_spool(self, paths: List[Path]) -> Dict[str, Dict[str, Any]]:
+        rows: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    for line in handle:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            row = json.loads(line)
+                        except ValueError:
+                            continue
+                        rows[row["run_id"]] = row
+            except OSError:
+                continue
+        return rows
+
+    async def _replay_spool(self, include_claimed: bool = False) -> None:
+        paths = await asyncio.to_thread(self._claim_spool_files, include_claimed)
+        if not paths:
+            return
+        spooled = await asyncio.to_thread(self._read_spool, paths)
+        rows = [row for run_id, row in spooled.items() if run_id not in self._pending]
+        replayed = 0
+        for start in range(0, len(rows), self.max_batch_size):
+            batch = rows[start : start + self.max_batch_size]
+            if await self._write(batch):
+                replayed += len(batch)
+            else:
+                await asyncio.to_thread(self._spool, batch)
+        for path in paths:
+            path.unlink(missing_ok=True)
+        if replayed:
+            self.rows_replayed += replayed
+            logger.info("Resultados do spool gravados no banco", extra={"rows": replayed})
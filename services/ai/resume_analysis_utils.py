@@ -1,7 +1,13 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
 
 STRENGTH_TARGET = 4
 WEAKNESS_TARGET = 3
@@ -25,6 +31,44 @@ def prepare_structured_analysis(
 
     requirements_list = requirements or []
     heuristics = _collect_resume_signals(text_content, stage_description, requirements_list)
+    return _structure_analysis(
+        heuristics,
+        stage_description,
+        raw_strengths=raw_strengths,
+        raw_weaknesses=raw_weaknesses,
+        raw_matched=raw_matched,
+        raw_missing=raw_missing,
+        raw_score=raw_score,
+    )
+
+
+def prepare_structured_analysis_batch(
+    texts: Sequence[str],
+    stage_description: str,
+    requirements: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Análise heurística de vários currículos da mesma etapa, com resultado idêntico a
+    prepare_structured_analysis para cada texto. Etapa e requisitos são tokenizados uma
+    vez; cada currículo é testado só contra os termos únicos da etapa e a cobertura dos
+    requisitos sai de uma matriz termo-documento (NumPy, quando instalado).
+    """
+    plan = _plan_scoring(stage_description, requirements or [])
+    return [
+        _structure_analysis(heuristics, stage_description)
+        for heuristics in _collect_batch_signals(texts, plan)
+    ]
+
+
+def _structure_analysis(
+    heuristics: Dict[str, Any],
+    stage_description: str,
+    raw_strengths: Optional[List[str]] = None,
+    raw_weaknesses: Optional[List[str]] = None,
+    raw_matched: Optional[List[str]] = None,
+    raw_missing: Optional[List[str]] = None,
+    raw_score: Optional[float] = None,
+) -> Dict[str, Any]:
     stage_focus = heuristics["stage_focus"]
 
     strengths = _ensure_exact_count(
@@ -84,45 +128,122 @@ def prepare_structured_analysis(
     }
 
 
-def _collect_resume_signals(
-    text_content: str,
-    stage_description: str,
-    requirements: List[Dict[str, Any]],
-) -> Dict[str, Any]:
-    resume_text = text_content or ""
-    resume_clean = resume_text.strip()
-    resume_lower = resume_text.lower()
-    tokens = _tokenize(resume_text)
-    word_count = len(tokens)
+@dataclass
+class _ScoringPlan:
+    """
+    Etapa e requisitos pré-processados: termos únicos buscados nos currículos e, para as
+    palavras-chave da etapa e cada requisito, os índices desses termos.
+    """
 
-    stage_keywords = _stage_keywords(stage_description)
-    stage_matches = [kw for kw in stage_keywords if kw in resume_lower]
-    stage_ratio = (len(stage_matches) / len(stage_keywords)) if stage_keywords else 0.0
+    stage_keywords: List[str]
+    entries: List[Dict[str, Any]]
+    terms: List[str]
+    stage_terms: List[int]
+    requirement_terms: List[List[int]]
+    language_term: Optional[int]
+    stage_focus: str
+
+
+def _plan_scoring(stage_description: str, requirements: List[Dict[str, Any]]) -> _ScoringPlan:
+    positions: Dict[str, int] = {}
 
-    matched_entries: List[Dict[str, Any]] = []
-    missing_entries: List[Dict[str, Any]] = []
+    def _term(term: str) -> int:
+        return positions.setdefault(term, len(positions))
 
+    stage_keywords = _stage_keywords(stage_description)
+    stage_terms = [_term(keyword) for keyword in stage_keywords]
+
+    entries: List[Dict[str, Any]] = []
+    requirement_terms: List[List[int]] = []
     for raw_req in requirements:
         req = raw_req or {}
         label = (req.get("label") or "Requisito da etapa").strip()
         description = (req.get("description") or "").strip()
         weight = float(req.get("weight") or 1.0)
 
-        req_tokens = [tok for tok in _tokenize(f"{label} {description}") if len(tok) > 3]
-        has_match = any(token in resume_lower for token in req_tokens)
-        if not has_match and label:
+        indexes = [_term(tok) for tok in _tokenize(f"{label} {description}") if len(tok) > 3]
+        if label:
+            # Rótulos curtos ("BI", "SQL") só valem como palavra inteira entre espaços
             label_token = label.lower()
-            if len(label_token) <= 3:
-                padded = f" {resume_lower} "
-                has_match = f" {label_token} " in padded
-            else:
-                has_match = label_token in resume_lower
+            indexes.append(_term(f" {label_token} " if len(label_token) <= 3 else label_token))
+        entries.append({"label": label, "description": description, "weight": weight})
+        requirement_terms.append(indexes)
+
+    language_term = _term("ingl") if "ingl" in stage_description.lower() else None
+    return _ScoringPlan(
+        stage_keywords=stage_keywords,
+        entries=entries,
+        terms=list(positions),
+        stage_terms=stage_terms,
+        requirement_terms=requirement_terms,
+        language_term=language_term,
+        stage_focus=_summarize_stage_description(stage_description),
+    )
+
+
+def _term_presence(resume_lower: str, terms: List[str]) -> List[bool]:
+    # Texto entre espaços: termos sem espaço nas pontas se comportam como no texto original
+    padded = f" {resume_lower} "
+    return [term in padded for term in terms]
+
+
+def _collect_resume_signals(
+    text_content: str,
+    stage_description: str,
+    requirements: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    plan = _plan_scoring(stage_description, requirements)
+    resume_text = text_content or ""
+    resume_lower = resume_text.lower()
+    present = _term_presence(resume_lower, plan.terms)
+    matched_flags = [any(present[index] for index in indexes) for indexes in plan.requirement_terms]
+    stage_count = sum(1 for index in plan.stage_terms if present[index])
+    return _build_signals(plan, resume_text, resume_lower, present, matched_flags, stage_count)
+
+
+def _collect_batch_signals(texts: Sequence[str], plan: _ScoringPlan) -> List[Dict[str, Any]]:
+    resumes = [text or "" for text in texts]
+    lowered = [text.lower() for text in resumes]
+    rows = [_term_presence(text, plan.terms) for text in lowered]
+    if np is None or not rows or not plan.terms:
+        matched_rows = [
+            [any(present[index] for index in indexes) for indexes in plan.requirement_terms]
+            for present in rows
+        ]
+        stage_counts = [sum(1 for index in plan.stage_terms if present[index]) for present in rows]
+    else:
+        # Matriz documento x termo (presença) vezes termo x requisito: requisito atendido
+        # quando algum dos seus termos aparece no currículo
+        presence = np.array(rows, dtype=np.int32)
+        incidence = np.zeros((len(plan.terms), len(plan.entries)), dtype=np.int32)
+        for column, indexes in enumerate(plan.requirement_terms):
+            incidence[indexes, column] = 1
+        matched_rows = ((presence @ incidence) > 0).tolist()
+        stage_counts = presence[:, plan.stage_terms].sum(axis=1).tolist() if plan.stage_terms else [0] * len(rows)
+    return [
+        _build_signals(plan, text, lower, present, matched, stage_count)
+        for text, lower, present, matched, stage_count in zip(resumes, lowered, rows, matched_rows, stage_counts)
+    ]
+
+
+def _build_signals(
+    plan: _ScoringPlan,
+    resume_text: str,
+    resume_lower: str,
+    present: List[bool],
+    matched_flags: List[bool],
+    stage_count: int,
+) -> Dict[str, Any]:
+    resume_clean = resume_text.strip()
+    word_count = len(WORD_PATTERN.findall(resume_lower))
+    stage_keywords = plan.stage_keywords
+    requirements = plan.entries
+
+    stage_matches = [keyword for keyword, index in zip(stage_keywords, plan.stage_terms) if present[index]]
+    stage_ratio = (stage_count / len(stage_keywords)) if stage_keywords else 0.0
 
-        entry = {"label": label, "description": description, "weight": weight}
-        if has_match:
-            matched_entries.append(entry)
-        else:
-            missing_entries.append(entry)
+    matched_entries = [entry for entry, matched in zip(requirements, matched_flags) if matched]
+    missing_entries = [entry for entry, matched in zip(requirements, matched_flags) if not matched]
 
     coverage_ratio = (
         len(matched_entries) / len(requirements)
@@ -187,7 +308,7 @@ def _collect_resume_signals(
             "Currículo apresenta poucas informações, limitando a validação completa dos requisitos.",
         )
 
-    if "ingl" in stage_description.lower() and "ingl" not in resume_lower:
+    if plan.language_term is not None and not present[plan.language_term]:
         _append_unique(
             weakness_candidates,
             "Requisito de idioma citado na etapa não foi comprovado no currículo.",
@@ -210,7 +331,7 @@ def _collect_resume_signals(
         "weakness_candidates": weakness_candidates,
         "matched_candidates": matched_candidates,
         "missing_candidates": missing_candidates,
-        "stage_focus": _summarize_stage_description(stage_description),
+        "stage_focus": plan.stage_focus,
     }
 
 
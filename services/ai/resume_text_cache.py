@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from disk_cache import DiskJSONCache
+
+# Incrementar quando a extração mudar de forma que invalide textos já armazenados
+EXTRACTION_VERSION = 4
+
+
+@dataclass
+class CachedResumeText:
+    text: str
+    warnings: List[str]
+
+
+def object_key(bucket: str, file_path: str, etag: str) -> str:
+    """
+    Chave de um objeto do Storage identificado por caminho + ETag.
+    """
+    raw = f"v{EXTRACTION_VERSION}:object:{bucket}/{file_path}:{etag.strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def content_key(digest: str, extension: str) -> str:
+    """
+    Chave pelo SHA-256 do conteúdo; a extensão faz parte da chave porque define o extrator.
+    """
+    raw = f"v{EXTRACTION_VERSION}:content:{extension.lower()}:{digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 de um arquivo lido em blocos (sem carregá-lo inteiro em memória).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResumeTextCache(DiskJSONCache):
+    """
+    Cache em disco do texto extraído de currículos (texto + warnings), endereçado por
+    conteúdo (caminho + ETag ou SHA-256 do arquivo) e limitado em bytes com remoção LRU.
+    """
+
+    @classmethod
+    def from_env(cls) -> Optional["ResumeTextCache"]:
+        """
+        Cria o cache configurado no ambiente; retorna None quando AI_RESUME_CACHE=false ou quando
+        AI_RESUME_CACHE_DIR não está definido (o texto dos currículos não vai para o diretório
+        temporário compartilhado).
+        """
+        if os.getenv("AI_RESUME_CACHE", "true").lower() not in ("1", "true", "yes", "y"):
+            return None
+        directory = os.getenv("AI_RESUME_CACHE_DIR", "").strip()
+        if not directory:
+            return None
+        return cls(directory, max_bytes=int(os.getenv("AI_RESUME_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+    async def get(self, key: str) -> Optional[CachedResumeText]:
+        payload = await self.get_payload(key)
+        if payload is None:
+            return None
+        return CachedResumeText(text=payload.get("text", ""), warnings=list(payload.get("warnings", [])))
+
+    async def put(self, keys: List[str], value: CachedResumeText) -> None:
+        await self.put_payload(keys, {"text": value.text, "warnings": value.warnings})
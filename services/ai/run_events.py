@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+from run_store import FINISHED_STATUSES, RunStore
+
+# Campos do resumo do lote enviados a cada progresso (a lista de itens só vai no evento final)
+_BATCH_SUMMARY_FIELDS = ("total", "succeeded", "failed", "pending", "queued", "progress")
+
+
+class RunSubscription:
+    """
+    Alterações pendentes dos runs acompanhados por um stream. Guarda apenas o estado mais
+    recente de cada run: um cliente lento recebe menos eventos de progresso, nunca um estado
+    antigo, e a memória fica limitada a um registro por run.
+    """
+
+    def __init__(self, run_ids: Iterable[str], loop: asyncio.AbstractEventLoop) -> None:
+        self.run_ids: Set[str] = set(run_ids)
+        self._loop = loop
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._event = asyncio.Event()
+
+    def push(self, record: Dict[str, Any]) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._push(record)
+        else:
+            self._loop.call_soon_threadsafe(self._push, record)
+
+    def _push(self, record: Dict[str, Any]) -> None:
+        self._pending[record["id"]] = record
+        self._event.set()
+
+    async def wait(self, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Aguarda alterações por até timeout segundos e retorna {run_id: run} (vazio no timeout).
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._event.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class RunEventBroker:
+    """
+    Distribui as atualizações do RunStore (via add_listener) aos streams SSE deste processo.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: Dict[str, Set[RunSubscription]] = {}
+
+    def subscribe(self, run_ids: Iterable[str]) -> RunSubscription:
+        subscription = RunSubscription(run_ids, asyncio.get_running_loop())
+        for run_id in subscription.run_ids:
+            self._subscriptions.setdefault(run_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: RunSubscription) -> None:
+        for run_id in subscription.run_ids:
+            subscribers = self._subscriptions.get(run_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[run_id]
+
+    def publish(self, record: Dict[str, Any]) -> None:
+        for subscription in tuple(self._subscriptions.get(record.get("id"), ())):
+            subscription.push(record)
+
+    def stats(self) -> Dict[str, Any]:
+        streams = {id(sub) for subs in self._subscriptions.values() for sub in subs}
+        return {"streams": len(streams), "runs_watched": len(self._subscriptions)}
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+def _event_payload(record: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {
+        "id": record["id"],
+        "type": record.get("type"),
+        "status": record.get("status"),
+        "progress": record.get("progress"),
+        "error": record.get("error"),
+    }
+    if record.get("attempts") is not None:
+        payload["attempts"] = record["attempts"]
+    result = record.get("result")
+    if record.get("status") in FINISHED_STATUSES:
+        payload["result"] = result
+    elif record.get("type") == "evaluate_batch" and isinstance(result, dict):
+        payload["summary"] = {field: result.get(field) for field in _BATCH_SUMMARY_FIELDS}
+    elif record.get("type") == "transcribe" and isinstance(result, dict):
+        # Transcrição parcial: texto contíguo já transcrito e chunks concluídos
+        payload["partial"] = result
+    return payload
+
+
+async def stream_run_events(
+    store: RunStore,
+    broker: RunEventBroker,
+    run_id: str,
+    poll_interval: float = 15.0,
+) -> AsyncIterator[str]:
+    """
+    Stream SSE de um run: o estado atual ao conectar, um evento "progress" a cada alteração,
+    "result" quando o run termina e "end" antes de fechar. Para um lote, os runs dos itens
+    são multiplexados no mesmo stream (o campo id identifica o run de cada evento).
+    Sem notificações por poll_interval (ex.: run atualizado por outro worker), o estado é
+    relido do store e um comentário keep-alive mantém a conexão aberta.
+    """
+    record = await store.aget(run_id)
+    if record is None:
+        return
+
+    run_ids = [run_id]
+    if record.get("type") == "evaluate_batch":
+        items = (record.get("result") or {}).get("items") or []
+        run_ids.extend(item["run_id"] for item in items if item.get("run_id"))
+
+    subscription = broker.subscribe(run_ids)
+    try:
+        yield f"retry: {int(poll_interval * 1000)}\n\n"
+        sent: Dict[str, str] = {}
+        event_id = 0
+        pending = {rid: rec for rid in run_ids if (rec := await store.aget(rid)) is not None}
+
+        while True:
+            for rid, rec in pending.items():
+                payload = _event_payload(rec)
+                fingerprint = json.dumps(payload, sort_keys=True, default=str)
+                if sent.get(rid) == fingerprint:
+                    continue
+                sent[rid] = fingerprint
+                event_id += 1
+                finished = rec.get("status") in FINISHED_STATUSES
+                yield format_sse("result" if finished else "progress", payload, event_id)
+                if rid == run_id:
+                    record = rec
+
+            if record.get("status") in FINISHED_STATUSES:
+                event_id += 1
+                yield format_sse("end", {"id": run_id, "status": record.get("status")}, event_id)
+                return
+
+            pending = await subscription.wait(poll_interval)
+            if not pending:
+                yield ": keep-alive\n\n"
+                pending = {rid: rec for rid in run_ids if (rec := await store.aget(rid)) is not None}
+                if run_id not in pending:
+                    # Run removido pela política de retenção
+                    return
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Perfil do run em andamento; cada task asyncio herda uma cópia do contexto
+current_profile: ContextVar[Optional["RunProfile"]] = ContextVar("run_profile", default=None)
+
+
+class RunProfile:
+    """
+    Tempos (relógio monotônico) de cada etapa de um run e contadores associados
+    (bytes baixados, caracteres extraídos, tokens). Etapas repetidas são somadas.
+    """
+
+    def __init__(self, queue_wait_seconds: float | None = None) -> None:
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, Any] = {}
+        if queue_wait_seconds is not None:
+            self.stages["queue_wait"] = max(0.0, queue_wait_seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.monotonic() - started
+
+    def add(self, name: str, amount: int | float) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: Any) -> None:
+        self.counters[name] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(time.monotonic() - self.started, 3),
+            "stages": {stage: round(seconds, 3) for stage, seconds in self.stages.items()},
+            **self.counters,
+        }
+
+
+def start_profile(queue_wait_seconds: float | None = None) -> RunProfile:
+    profile = RunProfile(queue_wait_seconds)
+    current_profile.set(profile)
+    return profile
+
+
+@contextmanager
+def profile_span(stage: str) -> Iterator[None]:
+    """
+    Mede a etapa no perfil do run atual; sem perfil ativo, não faz nada.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.span(stage):
+        yield
+
+
+def profile_add(name: str, amount: int | float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add(name, amount)
+
+
+def profile_set(name: str, value: Any) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.set(name, value)
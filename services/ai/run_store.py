@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from structured_logging import get_logger
+
+FINISHED_STATUSES = {"succeeded", "failed"}
+
+logger = get_logger("run_store")
+
+
+class RunStoreFullError(RuntimeError):
+    """
+    O armazenamento atingiu a capacidade só com runs em andamento: runs não finalizados
+    nunca são removidos para abrir espaço, então o novo run é recusado.
+    """
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Política de retenção dos runs.
+    - max_entries: número máximo de runs armazenados.
+    - finished_ttl_seconds: tempo de vida de um run finalizado (a partir de finished_at).
+    - max_age_seconds: idade máxima de qualquer run (a partir de created_at), inclusive
+      runs que ficaram presos em "running" após a queda de um worker.
+    - max_bytes: tamanho máximo (JSON serializado) somando todos os runs.
+    Ao atingir max_entries/max_bytes, apenas runs finalizados são removidos; sem nenhum
+    finalizado para remover, novos runs são recusados (RunStoreFullError).
+    - sweep_interval_seconds: intervalo da varredura em background.
+    """
+
+    max_entries: int = 5000
+    finished_ttl_seconds: float = 24 * 3600
+    max_age_seconds: float = 7 * 24 * 3600
+    max_bytes: int = 256 * 1024 * 1024
+    sweep_interval_seconds: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        defaults = cls()
+        return cls(
+            max_entries=int(os.getenv("AI_RUN_STORE_MAX_ENTRIES", str(defaults.max_entries))),
+            finished_ttl_seconds=float(os.getenv("AI_RUN_FINISHED_TTL_SECONDS", str(defaults.finished_ttl_seconds))),
+            max_age_seconds=float(os.getenv("AI_RUN_MAX_AGE_SECONDS", str(defaults.max_age_seconds))),
+            max_bytes=int(os.getenv("AI_RUN_STORE_MAX_BYTES", str(defaults.max_bytes))),
+            sweep_interval_seconds=float(os.getenv("AI_RUN_SWEEP_INTERVAL_SECONDS", str(defaults.sweep_interval_seconds))),
+        )
+
+
+class RunStore:
+    """
+    Interface comum para o estado dos runs (transcrição/avaliação).
+    Os runs são dicionários com os campos id, type, status, progress, result,
+    error, created_at e finished_at (ISO-8601).
+    """
+
+    retention: RetentionPolicy
+    _listeners: Tuple[Callable[[Dict[str, Any]], None], ...] = ()
+    # Backends com I/O bloqueante: as variantes assíncronas rodam fora do event loop
+    blocking = True
+
+    def __init__(self) -> None:
+        # Última escrita agendada de cada run (as seguintes esperam por ela) e updates de update_soon
+        self._update_tails: Dict[str, asyncio.Task] = {}
+        self._pending_updates: set = set()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registra um callback chamado com o run atualizado após cada update (ex.: streams SSE).
+        Os callbacks rodam na thread de quem atualizou e devem ser rápidos.
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def _notify(self, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if record is not None:
+            for listener in self._listeners:
+                try:
+                    listener(dict(record))
+                except Exception:
+                    logger.exception("Falha ao notificar atualização do run")
+        return record
+
+    def create(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update(self, run_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def count(self, status: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def total_bytes(self) -> int:
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Aplica a política de retenção e retorna quantos runs foram removidos."""
+        raise NotImplementedError
+
+    def evicted_total(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, run_id: str) -> bool:
+        return self.get(run_id) is not None
+
+    # Variantes para o event loop. Em backends bloqueantes a operação roda numa thread
+    # (asyncio.to_thread); as escritas de um mesmo run são serializadas na ordem de chamada,
+    # para que um progresso atrasado nunca sobrescreva o estado final.
+
+    async def acreate(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.blocking:
+            return self.create(run)
+        return await asyncio.to_thread(self.create, run)
+
+    async def aget(self, run_id: str) -> Optional[Dict[str, Any]]:
+        if not self.blocking:
+            return self.get(run_id)
+        return await asyncio.to_thread(self.get, run_id)
+
+    async def aupdate(self, run_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        if not self.blocking:
+            return self.update(run_id, **fields)
+        return await self._schedule_update(run_id, fields)
+
+    def update_soon(self, run_id: str, **fields: Any) -> None:
+        """
+        Agenda a escrita a partir de código síncrono no event loop (callbacks de progresso),
+        mantendo a ordem em relação às demais escritas do run.
+        """
+        if not self.blocking:
+            self.update(run_id, **fields)
+            return
+        task = self._schedule_update(run_id, fields)
+        self._pending_updates.add(task)
+        task.add_done_callback(_finish_update_task(self._pending_updates))
+
+    def _schedule_update(self, run_id: str, fields: Dict[str, Any]) -> asyncio.Task:
+        # A posição na fila do run é reservada aqui, de forma síncrona, e não quando a task começa
+        previous = self._update_tails.get(run_id)
+        task = asyncio.get_running_loop().create_task(self._update_after(previous, run_id, fields))
+        self._update_tails[run_id] = task
+
+        def _release(done: asyncio.Task) -> None:
+            if self._update_tails.get(run_id) is done:
+                del self._update_tails[run_id]
+
+        task.add_done_callback(_release)
+        return task
+
+    async def _update_after(
+        self, previous: Optional[asyncio.Task], run_id: str, fields: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        if previous is not None:
+            # Só a ordem importa: a falha da escrita anterior é tratada por quem a agendou
+            await asyncio.wait([previous])
+        return await asyncio.to_thread(self.update, run_id, **fields)
+
+
+class InMemoryRunStore(RunStore):
+    """
+    Backend em memória, limitado pela política de retenção.
+    Adequado apenas para um único worker. O tamanho de cada run é recalculado só quando
+    result/error mudam; atualizações de progresso não reserializam o registro.
+    """
+
+    blocking = False
+
+    def __init__(self, retention: Optional[RetentionPolicy] = None) -> None:
+        super().__init__()
+        self.retention = retention or RetentionPolicy()
+        self._runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def create(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        record = _stamp_created(dict(run))
+        size = _record_size(record)
+        with self._lock:
+            # Limites de capacidade são garantidos na escrita; expiração por tempo fica com o sweep
+            self._evict_over_capacity(extra_entries=1, extra_bytes=size)
+            if self._over_capacity(extra_entries=1, extra_bytes=size):
+                raise RunStoreFullError("Capacidade de runs esgotada por runs em andamento")
+            self._runs[record["id"]] = record
+            self._runs.move_to_end(record["id"])
+            self._bytes += size - self._sizes.get(record["id"], 0)
+            self._sizes[record["id"]] = size
+        return dict(record)
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._runs.get(run_id)
+            return dict(record) if record is not None else None
+
+    def update(self, run_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._runs.get(run_id)
+            if record is None:
+                return None
+            if _unchanged(record, fields):
+                return dict(record)
+            record.update(fields)
+            _stamp_finished(record)
+            if "result" in fields or "error" in fields:
+                self._resize(run_id, record)
+                self._evict_over_capacity()
+            updated = dict(record)
+        return self._notify(updated)
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            if status is None:
+                return len(self._runs)
+            return sum(1 for record in self._runs.values() if record.get("status") == status)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def evicted_total(self) -> int:
+        with self._lock:
+            return self._evicted
+
+    def sweep(self) -> int:
+        now = datetime.now().timestamp()
+        with self._lock:
+            expired = [
+                run_id
+                for run_id, record in self._runs.items()
+                if _is_expired(record, now, self.retention)
+            ]
+            for run_id in expired:
+                self._remove(run_id)
+            self._evicted += len(expired)
+            return len(expired) + self._evict_over_capacity()
+
+    def _resize(self, run_id: str, record: Dict[str, Any]) -> None:
+        size = _record_size(record)
+        self._bytes += size - self._sizes.get(run_id, 0)
+        self._sizes[run_id] = size
+
+    def _remove(self, run_id: str) -> None:
+        del self._runs[run_id]
+        self._bytes -= self._sizes.pop(run_id, 0)
+
+    def _over_capacity(self, extra_entries: int = 0, extra_bytes: int = 0) -> bool:
+        return (
+            len(self._runs) + extra_entries > self.retention.max_entries
+            or self._bytes + extra_bytes > self.retention.max_bytes
+        )
+
+    def _evict_over_capacity(self, extra_entries: int = 0, extra_bytes: int = 0) -> int:
+        evicted = 0
+        if not self._over_capacity(extra_entries, extra_bytes):
+            return evicted
+        # Remove os runs finalizados mais antigos; runs em andamento nunca são removidos
+        for run_id in list(self._runs.keys()):
+            if not self._over_capacity(extra_entries, extra_bytes):
+                break
+            if self._runs[run_id].get("status") not in FINISHED_STATUSES:
+                continue
+            self._remove(run_id)
+            evicted += 1
+        self._evicted += evicted
+        return evicted
+
+
+class SQLiteRunStore(RunStore):
+    """
+    Backend em arquivo SQLite (modo WAL), compartilhado entre vários workers
+    do uvicorn no mesmo host. Os métodos síncronos bloqueiam até busy_timeout_seconds pelo
+    lock de escrita: no event loop, use acreate/aget/aupdate/update_soon.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        retention: Optional[RetentionPolicy] = None,
+        busy_timeout_seconds: float = 5.0,
+    ) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention = retention or RetentionPolicy()
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_ts REAL NOT NULL,
+                    finished_ts REAL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_created_ts_idx ON runs (created_ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_finished_ts_idx ON runs (finished_ts)")
+            conn.execute("CREATE TABLE IF NOT EXISTS run_store_stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout_seconds, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _write(self, conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+        data = json.dumps(record, ensure_ascii=False, default=str)
+        conn.execute(
+            "INSERT OR REPLACE INTO runs (id, status, created_ts, finished_ts, size_bytes, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                record["id"],
+                record.get("status") or "",
+                _parse_timestamp(record.get("created_at")) or datetime.now().timestamp(),
+                _parse_timestamp(record.get("finished_at")),
+                len(data.encode("utf-8")),
+                data,
+            ),
+        )
+
+    def create(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        record = _stamp_created(dict(run))
+        with self._transaction() as conn:
+            self._write(conn, record)
+            # Limites de capacidade são garantidos na escrita; expiração por tempo fica com o sweep
+            self._evict_over_capacity(conn)
+            total, total_bytes = self._totals(conn)
+            if total > self.retention.max_entries or total_bytes > self.retention.max_bytes:
+                # Desfaz a inserção (rollback da transação)
+                raise RunStoreFullError("Capacidade de runs esgotada por runs em andamento")
+        return record
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, run_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        # Nada mudou (ex.: mesmo progresso): só a leitura, sem transação de escrita
+        current = self.get(run_id)
+        if current is None:
+            return None
+        if _unchanged(current, fields):
+            return current
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if not row:
+                return None
+            record = json.loads(row[0])
+            record.update(fields)
+            _stamp_finished(record)
+            self._write(conn, record)
+            self._evict_over_capacity(conn)
+        return self._notify(record)
+
+    def count(self, status: Optional[str] = None) -> int:
+        conn = self._connection()
+        if status is None:
+            row = conn.execute("SELECT COUNT(*) FROM runs").fetchone()
+        else:
+            row = conn.execute("SELECT COUNT(*) FROM runs WHERE status = ?", (status,)).fetchone()
+        return int(row[0])
+
+    def total_bytes(self) -> int:
+        row = self._connection().execute("SELECT COALESCE(SUM(size_bytes), 0) FROM runs").fetchone()
+        return int(row[0])
+
+    def evicted_total(self) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM run_store_stats WHERE key = 'evicted_total'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def sweep(self) -> int:
+        now = datetime.now().timestamp()
+        with self._transaction() as conn:
+            evicted = conn.execute(
+                """
+                DELETE FROM runs
+                WHERE (finished_ts IS NOT NULL AND finished_ts < ?) OR created_ts < ?
+                """,
+                (now - self.retention.finished_ttl_seconds, now - self.retention.max_age_seconds),
+            ).rowcount
+            self._add_evicted(conn, evicted)
+            return evicted + self._evict_over_capacity(conn)
+
+    @staticmethod
+    def _totals(conn: sqlite3.Connection) -> Tuple[int, int]:
+        total, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM runs"
+        ).fetchone()
+        return int(total), int(total_bytes)
+
+    def _evict_over_capacity(self, conn: sqlite3.Connection) -> int:
+        total, total_bytes = self._totals(conn)
+        if total <= self.retention.max_entries and total_bytes <= self.retention.max_bytes:
+            return 0
+
+        # Remove os runs finalizados mais antigos; runs em andamento nunca são removidos
+        rows = conn.execute(
+            "SELECT id, size_bytes FROM runs WHERE finished_ts IS NOT NULL ORDER BY finished_ts"
+        ).fetchall()
+        doomed = []
+        for run_id, size_bytes in rows:
+            if total <= self.retention.max_entries and total_bytes <= self.retention.max_bytes:
+                break
+            doomed.append((run_id,))
+            total -= 1
+            total_bytes -= size_bytes
+        conn.executemany("DELETE FROM runs WHERE id = ?", doomed)
+        self._add_evicted(conn, len(doomed))
+        return len(doomed)
+
+    @staticmethod
+    def _add_evicted(conn: sqlite3.Connection, amount: int) -> None:
+        if amount <= 0:
+            return
+        conn.execute(
+            """
+            INSERT INTO run_store_stats (key, value) VALUES ('evicted_total', ?)
+            ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+            """,
+            (amount,),
+        )
+
+
+def create_run_store_from_env() -> RunStore:
+    """
+    Cria o backend configurado em AI_RUN_STORE (memory | sqlite).
+    """
+    backend = os.getenv("AI_RUN_STORE", "memory").strip().lower()
+    retention = RetentionPolicy.from_env()
+
+    if backend == "sqlite":
+        path = os.getenv("AI_RUN_STORE_PATH") or str(Path(tempfile.gettempdir()) / "smarthire_runs.sqlite3")
+        return SQLiteRunStore(
+            path,
+            retention=retention,
+            busy_timeout_seconds=float(os.getenv("AI_RUN_STORE_BUSY_TIMEOUT_SECONDS", "5")),
+        )
+    if backend != "memory":
+        raise ValueError(f"AI_RUN_STORE inválido: {backend} (use memory ou sqlite)")
+    return InMemoryRunStore(retention=retention)
+
+
+async def sweep_periodically(store: RunStore) -> None:
+    """
+    Varre o armazenamento em background no intervalo da política de retenção.
+    Deve ser executada como task durante o ciclo de vida da aplicação.
+    """
+    while True:
+        await asyncio.sleep(store.retention.sweep_interval_seconds)
+        try:
+            evicted = await asyncio.to_thread(store.sweep)
+            if evicted:
+                logger.info("Retenção de runs aplicada", extra={"evicted": evicted})
+        except Exception as e:
+            logger.error("Erro na varredura de runs", extra={"error": str(e)})
+
+
+def _unchanged(record: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+    return all(name in record and record[name] == value for name, value in fields.items())
+
+
+def _finish_update_task(tasks: set) -> Callable[[asyncio.Task], None]:
+    def _done(task: asyncio.Task) -> None:
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Falha ao atualizar run", extra={"error": str(task.exception())})
+
+    return _done
+
+
+def _stamp_created(record: Dict[str, Any]) -> Dict[str, Any]:
+    record.setdefault("created_at", datetime.now().isoformat())
+    _stamp_finished(record)
+    return record
+
+
+def _stamp_finished(record: Dict[str, Any]) -> None:
+    if record.get("status") in FINISHED_STATUSES and not record.get("finished_at"):
+        record["finished_at"] = datetime.now().isoformat()
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _record_size(record: Dict[str, Any]) -> int:
+    return len(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _is_expired(record: Dict[str, Any], now: float, retention: RetentionPolicy) -> bool:
+    finished_ts = _parse_timestamp(record.get("finished_at"))
+    if finished_ts is not None and (now - finished_ts) > retention.finished_ttl_seconds:
+        return True
+    created_ts = _parse_timestamp(record.get("created_at"))
+    return created_ts is not None and (now - created_ts) > retention.max_age_seconds
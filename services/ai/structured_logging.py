@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+LOGGER_NAME = "smarthire"
+
+# run_id da avaliação em andamento; cada task asyncio herda uma cópia do contexto
+run_id_var: ContextVar[Optional[str]] = ContextVar("run_id", default=None)
+
+_listener: Optional[QueueListener] = None
+_payload_sample_rate = 0.0
+_payload_max_chars = 2000
+
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "run_id"}
+
+
+class RunContextFilter(logging.Filter):
+    """
+    Adiciona o run_id do contexto atual a cada registro.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "run_id"):
+            record.run_id = run_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Uma linha JSON por registro: ts, level, logger, msg, run_id e os campos passados em extra.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        run_id = getattr(record, "run_id", None)
+        if run_id:
+            entry["run_id"] = run_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Formato legível para desenvolvimento local (AI_LOG_FORMAT=text).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        run_id = getattr(record, "run_id", None)
+        prefix = f"[IA] {record.levelname:<7}" + (f" [{run_id[:8]}]" if run_id else "")
+        extras = {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith("_")
+        }
+        line = f"{prefix} {record.getMessage()}"
+        if extras:
+            line += " " + json.dumps(extras, ensure_ascii=False, default=str)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging() -> logging.Logger:
+    """
+    Configura o logger "smarthire" a partir do ambiente (AI_LOG_LEVEL, AI_LOG_FORMAT,
+    AI_LOG_PAYLOAD_SAMPLE_RATE, AI_LOG_PAYLOAD_MAX_CHARS). A escrita no stdout acontece
+    numa thread (QueueListener): o event loop apenas enfileira os registros.
+    Pode ser chamada novamente (ex.: após carregar o .env) para aplicar novos valores.
+    """
+    global _listener, _payload_sample_rate, _payload_max_chars
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(os.getenv("AI_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    _payload_sample_rate = float(os.getenv("AI_LOG_PAYLOAD_SAMPLE_RATE", "0"))
+    _payload_max_chars = int(os.getenv("AI_LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+    formatter: logging.Formatter = JsonFormatter()
+    if os.getenv("AI_LOG_FORMAT", "json").lower() == "text":
+        formatter = TextFormatter()
+
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.setFormatter(formatter)
+        return logger
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # O run_id precisa ser capturado na thread/task de origem, antes de enfileirar
+    queue_handler.addFilter(RunContextFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def set_run_id(run_id: Optional[str]) -> None:
+    run_id_var.set(run_id)
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any) -> None:
+    """
+    Registra conteúdo volumoso (currículo, prompt, resposta) em DEBUG, amostrado por
+    AI_LOG_PAYLOAD_SAMPLE_RATE e truncado em AI_LOG_PAYLOAD_MAX_CHARS. Sem DEBUG habilitado
+    ou fora da amostra, não há custo de serialização.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or _payload_sample_rate <= 0:
+        return
+    if _payload_sample_rate < 1 and random.random() >= _payload_sample_rate:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    logger.debug(
+        label,
+        extra={"payload": text[:_payload_max_chars], "payload_chars": len(text), "truncated": len(text) > _payload_max_chars},
+    )
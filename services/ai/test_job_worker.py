@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes das retentativas e da DLQ do worker de jobs sobre a fila SQLite
+(python -m pytest test_job_worker.py).
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import SQLiteJobQueue
+from job_worker import JobWorker, PermanentJobError, mark_evaluation_dead_lettered
+from run_store import InMemoryRunStore
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = []
+
+    def inc(self, **labels):
+        self.calls.append(labels)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(tmp_path / "jobs.sqlite3")
+
+
+def _drain(worker: JobWorker, queue: SQLiteJobQueue, rounds: int = 10) -> None:
+    # Processa as mensagens visíveis até a fila esvaziar (retry_base_delay=0 as devolve na hora)
+    async def _loop():
+        for _ in range(rounds):
+            messages = queue.receive(10, visibility_timeout=30)
+            if not messages:
+                return
+            for message in messages:
+                await worker.process(message)
+
+    asyncio.run(_loop())
+
+
+def test_failing_job_is_retried_then_dead_lettered(queue):
+    attempts = []
+    dead = []
+
+    async def handler(job_id, payload, created_at, attempt):
+        attempts.append(attempt)
+        raise RuntimeError("indisponível")
+
+    worker = JobWorker(
+        queue,
+        {"score": handler},
+        on_dead_letter=lambda job_id, error: dead.append((job_id, error)),
+        max_retries=2,
+        retry_base_delay=0,
+    )
+    queue.send({"job_id": "j1", "type": "score", "payload": {}})
+
+    _drain(worker, queue)
+
+    assert attempts == [1, 2, 3]
+    assert dead == [("j1", "indisponível")]
+    assert worker.stats() == {"succeeded": 0, "retried": 2, "dead_lettered": 1, "duplicates": 0}
+    assert [(item["job_id"], item["attempts"]) for item in queue.dead_letters()] == [("j1", 3)]
+
+
+def test_transient_failure_succeeds_on_retry(queue):
+    attempts = []
+
+    async def handler(job_id, payload, created_at, attempt):
+        attempts.append(attempt)
+        if attempt == 1:
+            raise RuntimeError("timeout")
+
+    worker = JobWorker(queue, {"score": handler}, max_retries=2, retry_base_delay=0)
+    queue.send({"job_id": "j1", "type": "score", "payload": {}})
+
+    _drain(worker, queue)
+
+    assert attempts == [1, 2]
+    assert worker.stats()["succeeded"] == 1
+    assert queue.dead_letters() == []
+
+
+def test_permanent_errors_skip_retries(queue):
+    async def handler(job_id, payload, created_at, attempt):
+        raise PermanentJobError("payload inválido")
+
+    worker = JobWorker(queue, {"score": handler}, max_retries=3, retry_base_delay=0)
+    queue.send({"job_id": "j1", "type": "score", "payload": {}})
+    queue.send({"job_id": "j2", "type": "desconhecido"})
+
+    _drain(worker, queue)
+
+    assert worker.stats()["retried"] == 0
+    assert sorted((item["job_id"], item["attempts"]) for item in queue.dead_letters()) == [("j1", 1), ("j2", 1)]
+
+
+def test_processed_job_redelivery_is_only_acknowledged(queue):
+    calls = []
+
+    async def handler(job_id, payload, created_at, attempt):
+        calls.append(job_id)
+
+    worker = JobWorker(queue, {"score": handler}, is_processed=lambda job_id: job_id == "feito")
+    queue.send({"job_id": "feito", "type": "score", "payload": {}})
+
+    _drain(worker, queue)
+
+    assert calls == []
+    assert worker.stats()["duplicates"] == 1
+    assert queue.receive(10, visibility_timeout=30) == []
+
+
+def test_dead_letter_callback_marks_retrying_run_failed():
+    store = InMemoryRunStore()
+    service = SimpleNamespace(run_store=store, RUNS_TOTAL=_Counter())
+    store.create({"id": "run", "type": "evaluate", "status": "retrying", "progress": 20, "error": "timeout"})
+    store.create({"id": "ok", "type": "evaluate", "status": "succeeded", "progress": 100})
+    mark = mark_evaluation_dead_lettered(service)
+
+    mark("run", "timeout definitivo")
+    mark("ok", "reentrega tardia")
+
+    record = store.get("run")
+    assert (record["status"], record["error"]) == ("failed", "timeout definitivo")
+    assert record["finished_at"]
+    assert store.get("ok")["status"] == "succeeded"
+    assert service.RUNS_TOTAL.calls == [{"type": "evaluate", "status": "failed"}]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da pontuação heurística de currículos: o caminho em lote deve produzir exatamente
+a mesma análise que a pontuação individual (python -m pytest test_resume_scoring.py).
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import resume_analysis_utils
+from resume_analysis_utils import prepare_structured_analysis, prepare_structured_analysis_batch
+
+VOCABULARY = (
+    "python django sql bi excel inglês ingles vendas salesforce gestão liderança crm power "
+    "hubspot análise dados comunicação negociação B2B pipeline a e de com para"
+).split()
+
+STAGES = [
+    "Vendas consultivas B2B com inglês fluente e Salesforce",
+    "Análise de dados com Python",
+    "",
+]
+
+REQUIREMENT_SETS = [
+    None,
+    [],
+    [
+        {"label": "BI", "description": "Power BI"},
+        {"label": "Python", "description": "", "weight": 3},
+        None,
+        {"label": "  ", "description": "sem rótulo"},
+        {"label": "SQL"},
+    ],
+    [{"label": "Inglês avançado", "description": "conversação", "weight": "2"}],
+]
+
+
+def _resumes():
+    rng = random.Random(7)
+    texts = [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(0, 300))) for _ in range(40)]
+    # Bordas: vazio, só espaços, termo curto, pontuação colada e termo dentro de outra palavra
+    return texts + ["", "   ", "bi", "usa SQL.", "pythonista"]
+
+
+@pytest.mark.parametrize("numpy_enabled", [True, False])
+@pytest.mark.parametrize("requirements", REQUIREMENT_SETS)
+@pytest.mark.parametrize("stage_description", STAGES)
+def test_batch_matches_single_scoring(monkeypatch, stage_description, requirements, numpy_enabled):
+    if not numpy_enabled:
+        monkeypatch.setattr(resume_analysis_utils, "np", None)
+    elif resume_analysis_utils.np is None:
+        pytest.skip("NumPy não instalado")
+    texts = _resumes()
+
+    batch = prepare_structured_analysis_batch(texts, stage_description, requirements)
+
+    assert batch == [prepare_structured_analysis(text, stage_description, requirements) for text in texts]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da política de retenção e das escritas do RunStore, nos dois backends
+(python -m pytest test_run_store.py).
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from run_store import InMemoryRunStore, RetentionPolicy, RunStoreFullError, SQLiteRunStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def _make(retention: RetentionPolicy):
+        if request.param == "memory":
+            return InMemoryRunStore(retention)
+        return SQLiteRunStore(tmp_path / "runs.sqlite3", retention)
+
+    return _make
+
+
+def _run(run_id: str, status: str = "running", **fields):
+    return {"id": run_id, "type": "evaluate", "status": status, "progress": 0, "result": None, **fields}
+
+
+def test_capacity_evicts_oldest_finished_run(make_store):
+    store = make_store(RetentionPolicy(max_entries=3))
+    for i in range(3):
+        store.create(_run(f"r{i}"))
+    store.update("r1", status="succeeded", progress=100, result={"score": 7})
+
+    store.create(_run("novo"))
+
+    assert store.get("r1") is None
+    assert {store.get(run_id)["status"] for run_id in ("r0", "r2", "novo")} == {"running"}
+    assert store.count() == 3
+    assert store.evicted_total() == 1
+
+
+def test_running_runs_are_never_evicted(make_store):
+    store = make_store(RetentionPolicy(max_entries=2))
+    store.create(_run("a"))
+    store.create(_run("b"))
+
+    with pytest.raises(RunStoreFullError):
+        store.create(_run("c"))
+
+    assert store.get("c") is None
+    assert store.count("running") == 2
+    assert store.evicted_total() == 0
+
+
+def test_sweep_expires_finished_runs_after_ttl(make_store):
+    store = make_store(RetentionPolicy(finished_ttl_seconds=60, max_age_seconds=3600))
+    old = (datetime.now() - timedelta(minutes=5)).isoformat()
+    store.create(_run("antigo", status="succeeded", created_at=old, finished_at=old))
+    store.create(_run("recente", status="failed"))
+    store.create(_run("ativo", created_at=old))
+
+    assert store.sweep() == 1
+    assert store.get("antigo") is None
+    assert store.get("recente") is not None
+    assert store.get("ativo") is not None
+
+
+def test_sweep_expires_stuck_runs_after_max_age(make_store):
+    store = make_store(RetentionPolicy(max_age_seconds=60))
+    store.create(_run("preso", created_at=(datetime.now() - timedelta(hours=1)).isoformat()))
+
+    assert store.sweep() == 1
+    assert store.get("preso") is None
+
+
+def test_unchanged_update_does_not_notify(make_store):
+    store = make_store(RetentionPolicy())
+    events = []
+    store.add_listener(lambda record: events.append(record["progress"]))
+    store.create(_run("r"))
+
+    store.update("r", progress=40)
+    store.update("r", progress=40)
+    store.update("r", progress=60)
+
+    assert events == [40, 60]
+
+
+def test_async_writes_keep_call_order(make_store):
+    store = make_store(RetentionPolicy())
+    events = []
+    store.add_listener(lambda record: events.append((record["status"], record["progress"])))
+
+    async def scenario():
+        await store.acreate(_run("r"))
+        for progress in (10, 10, 20):
+            store.update_soon("r", progress=progress)
+        await store.aupdate("r", status="succeeded", progress=100)
+        return await store.aget("r")
+
+    record = asyncio.run(scenario())
+
+    assert (record["status"], record["progress"]) == ("succeeded", 100)
+    assert events == [("running", 10), ("running", 20), ("succeeded", 100)]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da análise map-reduce das transcrições: consolidação das janelas e falha de
+janela (python -m pytest test_transcript_analysis.py).
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_analysis import TranscriptWindowError, analyze_transcript_content, merge_window_results
+
+REQUIREMENTS = [
+    {"label": "Python", "description": "python e django", "weight": 2},
+    {"label": "Inglês", "description": "fluência em inglês", "weight": 1},
+]
+
+
+def _transcript(turns: int = 40) -> str:
+    lines = []
+    for i in range(turns):
+        lines.append(f"Entrevistador: pergunta {i} sobre a experiência?")
+        lines.append(f"Candidato: resposta {i} " + "detalhes do projeto " * 10)
+    return "\n".join(lines)
+
+
+def test_merge_keeps_best_status_and_all_evidence():
+    windows = [
+        {
+            "requirements": [
+                {"index": 1, "status": "partial", "evidence": "usei python"},
+                {"index": 2, "status": "not_met", "evidence": "ignorada"},
+            ],
+            "strengths": ["Comunicação"],
+        },
+        {
+            "requirements": [
+                {"index": 1, "status": "met", "evidence": "django em produção"},
+                {"index": 1, "status": "met", "evidence": "usei python"},
+                {"index": 9, "status": "met", "evidence": "fora da lista"},
+            ],
+            "strengths": ["Comunicação", "Autonomia"],
+            "weaknesses": ["Inglês"],
+        },
+    ]
+
+    merged = merge_window_results(REQUIREMENTS, windows)
+
+    assert merged["requirements_analysis"] == [
+        {"name": "Python", "status": "met", "evidence": "usei python | django em produção"},
+        {"name": "Inglês", "status": "not_met", "evidence": ""},
+    ]
+    # Cobertura ponderada: Python (peso 2) atendido, Inglês (peso 1) não
+    assert merged["score"] == round(10 * 2 / 3, 1)
+    assert merged["matched_requirements"] == ["Python"]
+    assert merged["missing_requirements"] == ["Inglês"]
+    assert merged["strengths"] == ["Comunicação", "Autonomia"]
+    assert merged["weaknesses"] == ["Inglês"]
+
+
+def test_merge_reports_partial_requirements():
+    merged = merge_window_results(
+        REQUIREMENTS,
+        [{"requirements": [{"index": 2, "status": "PARTIAL", "evidence": "leio documentação"}]}],
+    )
+
+    assert merged["matched_requirements"] == ["Inglês (parcial)"]
+    assert merged["requirements_analysis"][1]["status"] == "partial"
+
+
+def test_windows_are_merged_across_the_transcript():
+    calls = []
+
+    async def complete(prompt):
+        if "[TRECHO DA TRANSCRIÇÃO]" not in prompt:
+            return {"summary": "resumo final"}
+        calls.append(prompt)
+        window = prompt.split("[TRECHO DA TRANSCRIÇÃO]")[1]
+        status = "met" if "resposta 35 " in window else "not_met"
+        return {"summary": f"trecho {len(calls)}", "requirements": [{"index": 1, "status": status, "evidence": "resposta 35"}]}
+
+    result = asyncio.run(
+        analyze_transcript_content(_transcript(), "Dev", REQUIREMENTS, complete=complete, window_chars=2000)
+    )
+
+    assert result["windows"] == len(calls) > 1
+    assert result["analysis"] == "resumo final"
+    assert result["requirements_analysis"][0] == {"name": "Python", "status": "met", "evidence": "resposta 35"}
+    assert result["score"] == round(10 * 2 / 3, 1)
+
+
+def test_failed_window_fails_the_analysis():
+    async def complete(prompt):
+        window = prompt.split("[TRECHO DA TRANSCRIÇÃO]")[-1]
+        if "resposta 3 " in window:
+            raise RuntimeError("timeout da OpenAI")
+        return {"summary": "ok", "requirements": [{"index": 1, "status": "met", "evidence": "python"}]}
+
+    with pytest.raises(TranscriptWindowError, match="timeout da OpenAI"):
+        asyncio.run(
+            analyze_transcript_content(_transcript(), "Dev", REQUIREMENTS, complete=complete, window_chars=2000)
+        )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da divisão de transcrições em turnos e da identificação do candidato
+(python -m pytest test_transcript_parsing.py).
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcript_analysis import parse_turns
+from transcript_index import TranscriptIndexCache, build_transcript_index, classify_by_heuristic
+
+SAMPLE_TEAMS_PDF = Path(__file__).resolve().parents[2] / "1° Entrevista Assessoria Comercial - Mayara Taborda.pdf"
+
+# Dois locutores que falam o mesmo tanto, sem papel no rótulo: a heurística não decide
+AMBIGUOUS_TRANSCRIPT = (
+    "A: falo bastante sobre coisas aqui e ali.\n"
+    "B: também falo bastante sobre outras coisas aqui.\n"
+) * 5
+
+
+def test_teams_header_lines_open_speaker_turns():
+    text = (
+        "Transcrição\n"
+        "Ana Souza   0:03\n"
+        "Conte sobre sua experiência com vendas?\n"
+        "\n"
+        "Mayara    0:13\n"
+        "Trabalhei cinco anos com vendas consultivas,\n"
+        "fechando matrículas e acompanhando clientes.\n"
+        "Ana Souza   1:02:10\n"
+        "Obrigada.\n"
+    )
+    turns = parse_turns(text)
+    assert [(turn.speaker, turn.text) for turn in turns] == [
+        (None, "Transcrição"),
+        ("Ana Souza", "Conte sobre sua experiência com vendas?"),
+        ("Mayara", "Trabalhei cinco anos com vendas consultivas, fechando matrículas e acompanhando clientes."),
+        ("Ana Souza", "Obrigada."),
+    ]
+
+
+def test_time_inside_sentence_is_not_a_speaker_header():
+    turns = parse_turns("Entrevistador: a reunião começa às 10:30\nCandidato: combinado")
+    assert [turn.speaker for turn in turns] == ["Entrevistador", "Candidato"]
+
+
+@pytest.mark.skipif(not SAMPLE_TEAMS_PDF.exists(), reason="transcrição de exemplo ausente")
+def test_sample_teams_transcript_identifies_candidate():
+    from extraction_engine import collect_pdf_text
+
+    text, _, _ = collect_pdf_text(SAMPLE_TEAMS_PDF)
+    turns = parse_turns(text)
+    speakers = {turn.speaker for turn in turns if turn.speaker}
+    assert speakers == {"Keila Alves de Carvalho", "Mayara"}
+
+    index = asyncio.run(build_transcript_index(text))
+    assert index.candidate == "Mayara"
+    assert index.method == "heuristic"
+    stats = index.stats()
+    # Só as falas da candidata vão para as janelas
+    assert stats["candidate_chars"] < stats["total_chars"]
+
+
+def test_candidate_identified_by_speaker_label():
+    turns = parse_turns(
+        "Entrevistador: Pode se apresentar?\nMaria (candidata): Sou analista há seis anos.\n" * 3
+    )
+    assert classify_by_heuristic(turns) == ("Maria (candidata)", "label")
+
+
+def test_candidate_identified_by_useful_speech():
+    lines = []
+    for i in range(5):
+        lines.append(f"S1: Como foi o projeto {i}?")
+        lines.append(f"S2: No projeto {i} eu liderei a migração para python e cuidei do deploy em produção.")
+    assert classify_by_heuristic(parse_turns("\n".join(lines))) == ("S2", "heuristic")
+
+
+def test_single_speaker_is_not_classified():
+    assert classify_by_heuristic(parse_turns("Maria: olá\nMaria: tudo bem")) == (None, "none")
+
+
+def test_ambiguous_speakers_use_one_cached_llm_call(tmp_path):
+    prompts = []
+
+    async def complete(prompt):
+        prompts.append(prompt)
+        return {"candidate": "b"}
+
+    cache = TranscriptIndexCache(tmp_path)
+    first = asyncio.run(build_transcript_index(AMBIGUOUS_TRANSCRIPT, complete, cache))
+    second = asyncio.run(build_transcript_index(AMBIGUOUS_TRANSCRIPT, complete, cache))
+
+    assert (first.candidate, first.method) == ("B", "llm")
+    assert (second.candidate, second.method) == ("B", "llm")
+    assert len(prompts) == 1
+    assert [turn.speaker for turn in first.candidate_turns()] == ["B"] * 5
+
+
+def test_llm_failure_is_not_cached(tmp_path):
+    attempts = []
+
+    async def failing(prompt):
+        attempts.append(prompt)
+        raise RuntimeError("rate limit")
+
+    cache = TranscriptIndexCache(tmp_path)
+    index = asyncio.run(build_transcript_index(AMBIGUOUS_TRANSCRIPT, failing, cache))
+    assert (index.candidate, index.method) == (None, "error")
+
+    async def answering(prompt):
+        return {"candidate": "A"}
+
+    retried = asyncio.run(build_transcript_index(AMBIGUOUS_TRANSCRIPT, answering, cache))
+    assert (retried.candidate, retried.method) == ("A", "llm")
+    assert len(attempts) == 1
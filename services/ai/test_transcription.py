@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da retomada da transcrição a partir do checkpoint em disco
+(python -m pytest test_transcription.py).
+"""
+
+import asyncio
+import math
+import os
+import sys
+import wave
+from array import array
+
+import pytest
+
+# Adicionar o diretório atual ao path para importar módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from transcription import AudioTranscriber, TranscriptCheckpoint, TranscriptionBackend, TranscriptSegment
+
+SAMPLE_RATE = 16000
+
+
+class FakeBackend(TranscriptionBackend):
+    name = "fake"
+
+    def __init__(self, fail_from: float | None = None) -> None:
+        self.fail_from = fail_from
+        self.starts = []
+
+    async def transcribe_chunk(self, pcm_path, start, end, language):
+        self.starts.append(start)
+        if self.fail_from is not None and start >= self.fail_from:
+            raise RuntimeError("processo interrompido")
+        return [TranscriptSegment(0.0, min(end - start, 1.0), f"fala {start:.1f}")], "pt"
+
+
+@pytest.fixture
+def audio(tmp_path):
+    # Três trechos de fala separados por silêncio
+    samples = array("h")
+    for seconds, speech in [(1.5, True), (1.0, False), (1.5, True), (1.0, False), (1.5, True)]:
+        samples.extend(
+            int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) if speech else 0
+            for i in range(int(seconds * SAMPLE_RATE))
+        )
+    path = tmp_path / "entrevista.wav"
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(SAMPLE_RATE)
+        handle.writeframes(samples.tobytes())
+    return path
+
+
+def _transcriber(backend, checkpoint_dir):
+    return AudioTranscriber(backend, concurrency=1, max_chunk_seconds=3, checkpoint_dir=checkpoint_dir)
+
+
+def test_retry_resumes_from_checkpoint(audio, tmp_path):
+    checkpoint_dir = tmp_path / "checkpoints"
+    crashed = FakeBackend(fail_from=4.0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_transcriber(crashed, checkpoint_dir).transcribe(audio))
+    assert len(list(checkpoint_dir.glob("*.jsonl"))) == 1
+
+    backend = FakeBackend()
+    transcriber = _transcriber(backend, checkpoint_dir)
+    result = asyncio.run(transcriber.transcribe(audio))
+
+    assert result["chunks"] == 3
+    assert backend.starts == [crashed.starts[-1]]
+    assert transcriber.stats()["chunks_resumed"] == 2
+    assert result["transcript"] == " ".join(f"fala {start:.1f}" for start in crashed.starts)
+    # Transcrição concluída: o checkpoint é descartado
+    assert list(checkpoint_dir.glob("*.jsonl")) == []
+
+
+def test_checkpoint_with_other_chunk_bounds_is_ignored(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = TranscriptCheckpoint(path, [(0.0, 2.0), (2.0, 4.0)])
+    checkpoint.start(resumed=False)
+    checkpoint.record(0, [TranscriptSegment(0.0, 1.0, "olá")], "pt")
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"index": 1, "segm')  # linha truncada por uma queda durante a escrita
+
+    loaded = checkpoint.load()
+    assert list(loaded) == [0]
+    assert loaded[0][0][0].text == "olá"
+    assert TranscriptCheckpoint(path, [(0.0, 3.0), (3.0, 4.0)]).load() == {}
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Set
+
+# Estimativa de ~4 caracteres por token (texto em português, tokenizers da OpenAI)
+CHARS_PER_TOKEN = 4
+
+_WORD_RE = re.compile(r"[a-z0-9+#]{3,}")
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_PAGE_MARKER_RE = re.compile(r"^(p[aá]gina|page|p[aá]g\.?)\s*\d+(\s*(de|of|/)\s*\d+)?$", re.IGNORECASE)
+
+_STOPWORDS = {
+    "para", "com", "que", "dos", "das", "uma", "por", "como", "mais", "sem", "sobre", "entre",
+    "the", "and", "with", "for", "from", "candidato", "candidata", "etapa", "requisito", "requisitos",
+    "experiencia", "conhecimento", "nivel", "deve", "ter", "ser", "nos", "nas", "seu", "sua",
+}
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    duplicate_lines_removed: int
+    sections_dropped: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+    def metrics(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("text")
+        data["tokens_saved"] = self.tokens_saved
+        return data
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def extract_terms(texts: Iterable[str]) -> Set[str]:
+    """
+    Termos relevantes (sem acento, minúsculos, sem stopwords) da etapa e dos requisitos.
+    """
+    terms: Set[str] = set()
+    for text in texts:
+        if text:
+            terms.update(word for word in _WORD_RE.findall(_normalize(text)) if word not in _STOPWORDS)
+    return terms
+
+
+def _clean_lines(text: str) -> tuple[List[str], int]:
+    """
+    Colapsa espaços, remove marcadores de página e linhas repetidas (cabeçalhos/rodapés
+    de cada página). Linhas em branco consecutivas viram uma só (separador de seção).
+    """
+    lines: List[str] = []
+    seen: Set[str] = set()
+    duplicates = 0
+    for raw_line in text.splitlines():
+        line = _SPACES_RE.sub(" ", raw_line).strip()
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if _PAGE_MARKER_RE.match(line):
+            continue
+        key = _normalize(line)
+        # Linhas curtas (ex.: itens "Python", "Excel") podem repetir legitimamente
+        if len(key) >= 20 and key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines, duplicates
+
+
+def _split_sections(lines: List[str]) -> List[str]:
+    sections: List[str] = []
+    current: List[str] = []
+    for line in lines:
+        if line:
+            current.append(line)
+        elif current:
+            sections.append("\n".join(current))
+            current = []
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def _section_score(section: str, terms: Set[str]) -> float:
+    words = _WORD_RE.findall(_normalize(section))
+    if not words or not terms:
+        return 0.0
+    matches = sum(1 for word in words if word in terms)
+    distinct = len(terms.intersection(words))
+    # Termos distintos pesam mais que repetições; divide pelo tamanho para não favorecer blocos longos
+    return (distinct * 2 + matches) / (len(words) ** 0.5)
+
+
+def compact_text(text: str, terms: Set[str], max_tokens: int) -> CompactionResult:
+    """
+    Compacta o texto enviado ao LLM: normaliza espaços, remove boilerplate repetido e, se
+    ainda exceder max_tokens, mantém a primeira seção (identificação/resumo) e as seções com
+    maior sobreposição com os termos da etapa, na ordem original. O espaço que sobrar é
+    completado com o início da seção descartada mais relevante.
+    """
+    original_tokens = estimate_tokens(text)
+    lines, duplicates = _clean_lines(text)
+    sections = _split_sections(lines)
+    cleaned = "\n\n".join(sections)
+
+    if estimate_tokens(cleaned) <= max_tokens or not sections:
+        return CompactionResult(cleaned, original_tokens, estimate_tokens(cleaned), duplicates, 0, False)
+
+    budget_chars = max_tokens * CHARS_PER_TOKEN
+    ranked = sorted(
+        range(1, len(sections)),
+        key=lambda idx: (_section_score(sections[idx], terms), -idx),
+        reverse=True,
+    )
+
+    kept: Dict[int, str] = {}
+    dropped: List[int] = []
+    used = 0
+    for idx in [0] + ranked:
+        cost = len(sections[idx]) + (2 if kept else 0)
+        if used + cost <= budget_chars:
+            kept[idx] = sections[idx]
+            used += cost
+        else:
+            dropped.append(idx)
+
+    # Preenche o espaço restante com o início da seção descartada mais relevante
+    truncated = False
+    remaining = budget_chars - used - (2 if kept else 0)
+    if dropped and (remaining >= 200 or not kept):
+        kept[dropped[0]] = sections[dropped[0]][: max(0, remaining)].rstrip()
+        truncated = True
+
+    compacted = "\n\n".join(kept[idx] for idx in sorted(kept) if kept[idx])
+    return CompactionResult(
+        compacted,
+        original_tokens,
+        estimate_tokens(compacted),
+        duplicates,
+        len(sections) - len(kept),
+        truncated,
+    )
+
+
+class CompactionStats:
+    """
+    Totais de compactação do processo (expostos em /health).
+    """
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.original_tokens = 0
+        self.compacted_tokens = 0
+
+    def record(self, result: CompactionResult) -> None:
+        self.runs += 1
+        self.original_tokens += result.original_tokens
+        self.compacted_tokens += result.compacted_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        saved = max(0, self.original_tokens - self.compacted_tokens)
+        return {
+            "runs": self.runs,
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "tokens_saved": saved,
+            "avg_tokens_saved_per_run": round(saved / self.runs, 1) if self.runs else 0.0,
+        }
@@ -1,5 +1,17 @@
-from typing import Dict, Any, List, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
 import json
+import os
+import re
+
+import httpx
+
+from http_clients import HttpClientPool
+from openai_rate_limit import OpenAIRateLimiter, post_chat_completion
+from structured_logging import get_logger
+
+logger = get_logger("transcript_analysis")
 
 TRANSCRIPT_ANALYSIS_PROMPT_TEMPLATE = """
 Você é um especialista em Recrutamento e Seleção.
@@ -35,6 +47,90 @@ Requisitos: {requirements}
 }}
 """
 
+# Etapa "map": cada janela da transcrição é avaliada isoladamente contra os requisitos
+TRANSCRIPT_WINDOW_PROMPT_TEMPLATE = """
+Você é um especialista em Recrutamento e Seleção.
+Tarefa: Avaliar o TRECHO {window_number} de {window_total} de uma entrevista para a vaga descrita.
+
+[CONTEXTO]
+Descrição da Vaga/Etapa: {stage_description}
+Requisitos (numerados):
+{requirements}
+
+[TRECHO DA TRANSCRIÇÃO]
+{transcript_text}
+
+[INSTRUÇÕES]
+{speaker_instructions}
+3. Avalie cada requisito APENAS com base neste trecho: "met" (demonstrado), "partial" (parcialmente)
+   ou "not_met" (não abordado ou não demonstrado). Cite a fala exata do candidato como evidência.
+4. NÃO ALUCINE. Se não foi dito neste trecho, use "not_met" com evidência vazia.
+
+[SAÍDA JSON]
+{{
+  "summary": "string (1-2 frases sobre o trecho)",
+  "strengths": ["string"],
+  "weaknesses": ["string"],
+  "requirements": [
+    {{ "index": 1, "status": "met|partial|not_met", "evidence": "string" }}
+  ]
+}}
+"""
+
+SPEAKER_INSTRUCTIONS = """1. Identifique os falantes. O candidato é aquele que responde às perguntas sobre si mesmo.
+2. Ignore falas dos entrevistadores para fins de avaliação de competência."""
+
+# Trecho com apenas as falas do candidato (índice de locutores, transcript_index.py)
+CANDIDATE_ONLY_INSTRUCTIONS = """1. O trecho contém apenas as falas do candidato; as perguntas dos entrevistadores foram removidas.
+2. Avalie somente o que o candidato afirma sobre si mesmo."""
+
+# Etapa "reduce": resumo final a partir dos resumos das janelas e do status consolidado
+TRANSCRIPT_SUMMARY_PROMPT_TEMPLATE = """
+Você é um especialista em Recrutamento e Seleção.
+Resuma em até 4 frases a entrevista de um candidato para a vaga descrita, usando apenas as
+informações abaixo (resumos de trechos consecutivos da entrevista e a cobertura dos requisitos).
+
+Descrição da Vaga/Etapa: {stage_description}
+
+Resumos dos trechos:
+{window_summaries}
+
+Cobertura dos requisitos:
+{coverage}
+
+[SAÍDA JSON]
+{{ "summary": "string" }}
+"""
+
+# Valor de cada status na nota (0-10, ponderada pelo peso do requisito)
+STATUS_VALUES = {"met": 1.0, "partial": 0.5, "not_met": 0.0}
+MAX_EVIDENCE_PER_REQUIREMENT = 3
+MAX_LIST_ITEMS = 5
+
+# "Nome: fala", opcionalmente precedido de [00:01:02] ou 00:01:02 -
+SPEAKER_LINE = re.compile(r"^\s*(?:\[?\d{1,2}(?::\d{2}){1,2}(?:[.,]\d+)?\]?\s*-?\s*)?([^:\n]{1,40}?)\s*:\s+(\S.*)$")
+# Cabeçalho do Teams/Meet "Nome   0:03" (ou 1:02:03) numa linha própria; a fala vem nas linhas seguintes
+SPEAKER_HEADER = re.compile(r"^\s*([^\W\d][^:\n]{0,59}?)(?:\s{2,}|\t)\[?\d{1,2}(?::\d{2}){1,2}\]?\s*$")
+WORD_PATTERN = re.compile(r"\b\w{4,}\b", flags=re.UNICODE)
+
+JsonCompleter = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class TranscriptWindowError(RuntimeError):
+    """
+    Uma janela da transcrição não pôde ser avaliada (após as retentativas da chamada).
+    """
+
+
+@dataclass
+class TranscriptTurn:
+    speaker: Optional[str]
+    text: str
+
+    def render(self) -> str:
+        return f"{self.speaker}: {self.text}" if self.speaker else self.text
+
+
 def prepare_transcript_prompt(transcript_text: str, stage_description: str, requirements: List[Dict[str, Any]]) -> str:
     requirements_str = "\n".join([f"- {req.get('label', '')}: {req.get('description', '')}" for req in requirements])
     return TRANSCRIPT_ANALYSIS_PROMPT_TEMPLATE.format(
@@ -43,42 +139,366 @@ def prepare_transcript_prompt(transcript_text: str, stage_description: str, requ
         transcript_text=transcript_text
     )
 
-async def analyze_transcript_content(transcript_text: str, stage_description: str, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Simula ou executa a análise de transcrição.
-    No futuro, esta função chamará o cliente OpenAI com o prompt gerado acima.
-    """
-    import asyncio
-    
-    # Simulando processamento
-    await asyncio.sleep(2)
-    
-    # Prompt preparado (seria usado na chamada real)
-    prompt = prepare_transcript_prompt(transcript_text, stage_description, requirements)
-    # print(f"DEBUG Prompt:\n{prompt}")
-    
-    # Retorno simulado seguindo a estrutura do prompt
+
+def prepare_window_prompt(
+    window_text: str,
+    window_number: int,
+    window_total: int,
+    stage_description: str,
+    requirements: List[Dict[str, Any]],
+    candidate_only: bool = False,
+) -> str:
+    requirements_str = "\n".join(
+        f"{index}. {req.get('label', '')}: {req.get('description', '')}" for index, req in enumerate(requirements, 1)
+    )
+    return TRANSCRIPT_WINDOW_PROMPT_TEMPLATE.format(
+        speaker_instructions=CANDIDATE_ONLY_INSTRUCTIONS if candidate_only else SPEAKER_INSTRUCTIONS,
+        window_number=window_number,
+        window_total=window_total,
+        stage_description=stage_description,
+        requirements=requirements_str,
+        transcript_text=window_text,
+    )
+
+
+def parse_turns(transcript_text: str) -> List[TranscriptTurn]:
+    """
+    Divide a transcrição em turnos de fala. Linhas "Locutor: fala" (com ou sem marca de tempo)
+    e cabeçalhos "Locutor   0:03" (exportação do Teams) abrem um turno; linhas sem locutor
+    continuam o turno anterior. Sem nenhum locutor identificado, cada parágrafo vira um turno.
+    """
+    turns: List[TranscriptTurn] = []
+    for line in transcript_text.splitlines():
+        if not line.strip():
+            if turns and turns[-1].speaker is None and turns[-1].text:
+                # Parágrafo novo em transcrição sem locutores
+                turns.append(TranscriptTurn(None, ""))
+            continue
+        header = SPEAKER_HEADER.match(line)
+        if header:
+            speaker = header.group(1).strip()
+            if not turns or turns[-1].speaker != speaker:
+                turns.append(TranscriptTurn(speaker, ""))
+            continue
+        match = SPEAKER_LINE.match(line)
+        if match and not match.group(1).strip().startswith("http"):
+            speaker, text = match.group(1).strip(), match.group(2).strip()
+            if turns and turns[-1].speaker == speaker:
+                turns[-1].text += " " + text
+            else:
+                turns.append(TranscriptTurn(speaker, text))
+        elif turns:
+            turns[-1].text = f"{turns[-1].text} {line.strip()}".strip()
+        else:
+            turns.append(TranscriptTurn(None, line.strip()))
+    return [turn for turn in turns if turn.text]
+
+
+def build_windows(turns: List[TranscriptTurn], max_chars: int, overlap_turns: int = 1) -> List[str]:
+    """
+    Agrupa turnos consecutivos em janelas de até max_chars sem partir turnos (exceto os que,
+    sozinhos, passam do limite). As últimas overlap_turns falas de uma janela abrem a seguinte,
+    para que uma resposta não perca a pergunta que a originou.
+    """
+    pieces: List[str] = []
+    for turn in turns:
+        rendered = turn.render()
+        while len(rendered) > max_chars:
+            cut = rendered.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces.append(rendered[:cut])
+            rendered = rendered[cut:].lstrip()
+            if turn.speaker:
+                rendered = f"{turn.speaker}: {rendered}"
+        pieces.append(rendered)
+
+    windows: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) + 1 > max_chars:
+            windows.append(current)
+            carried = current[-overlap_turns:] if overlap_turns else []
+            carried = [text for text in carried if len(text) + len(piece) + 1 <= max_chars // 2]
+            current, size = list(carried), sum(len(text) + 1 for text in carried)
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        windows.append(current)
+    return ["\n".join(window) for window in windows]
+
+
+def merge_window_results(
+    requirements: List[Dict[str, Any]],
+    window_results: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Etapa "reduce": para cada requisito vale o melhor status entre as janelas, com as
+    evidências de todas elas (sem repetição). A nota é a cobertura ponderada pelos pesos.
+    """
+    rank = {"not_met": 0, "partial": 1, "met": 2}
+    merged: List[Dict[str, Any]] = []
+    for index, req in enumerate(requirements, 1):
+        status = "not_met"
+        evidence: List[str] = []
+        for result in window_results:
+            for item in result.get("requirements") or []:
+                if not isinstance(item, dict) or _as_int(item.get("index")) != index:
+                    continue
+                item_status = str(item.get("status", "not_met")).lower()
+                if item_status not in rank:
+                    continue
+                if rank[item_status] > rank[status]:
+                    status = item_status
+                quote = str(item.get("evidence") or "").strip()
+                if quote and item_status != "not_met" and quote not in evidence:
+                    evidence.append(quote)
+        merged.append({
+            "name": req.get("label") or f"Requisito {index}",
+            "status": status,
+            "evidence": " | ".join(evidence[:MAX_EVIDENCE_PER_REQUIREMENT]),
+            "weight": _as_float(req.get("weight"), 1.0),
+        })
+
+    total_weight = sum(item["weight"] for item in merged)
+    score = (
+        round(10 * sum(STATUS_VALUES[item["status"]] * item["weight"] for item in merged) / total_weight, 1)
+        if total_weight > 0
+        else 0.0
+    )
     return {
-        "score": 7.5,
-        "analysis": "Com base na transcrição fornecida, o candidato demonstra competências alinhadas à vaga.",
-        "strengths": [
-            "Comunicação clara e articulada evidenciada nas respostas longas",
-            "Citou experiências anteriores relevantes ao contexto da vaga"
-        ],
-        "weaknesses": [
-            "Não aprofundou detalhes técnicos em algumas respostas",
-            "Algumas respostas foram vagas quanto a métricas de resultados"
-        ],
+        "score": score,
+        "requirements_analysis": [{key: item[key] for key in ("name", "status", "evidence")} for item in merged],
         "matched_requirements": [
-            "Experiência na área (mencionado na introdução)",
-            "Trabalho em equipe (citado exemplo de projeto X)"
-        ],
-        "missing_requirements": [
-            "Inglês fluente (não mencionado na transcrição)",
-            "Certificação específica (não abordada)"
+            item["name"] if item["status"] == "met" else f"{item['name']} (parcial)"
+            for item in merged
+            if item["status"] != "not_met"
         ],
-        "requirements_analysis": [
-             { "name": "Experiência", "status": "met", "evidence": "Eu trabalhei 5 anos na empresa X..." }
-        ]
+        "missing_requirements": [item["name"] for item in merged if item["status"] == "not_met"],
+        "strengths": _unique(item for result in window_results for item in result.get("strengths") or []),
+        "weaknesses": _unique(item for result in window_results for item in result.get("weaknesses") or []),
+    }
+
+
+def simulate_window_result(window_text: str, requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Avaliação heurística de uma janela (sem chave da OpenAI): um requisito é "met" quando a
+    maior parte das suas palavras aparece no trecho e "partial" com parte delas.
+    """
+    lowered = window_text.lower()
+    sentences = re.split(r"(?<=[.!?])\s+|\n", window_text)
+    items = []
+    for index, req in enumerate(requirements, 1):
+        words = set(WORD_PATTERN.findall(f"{req.get('label', '')} {req.get('description', '')}".lower()))
+        found = {word for word in words if word in lowered}
+        coverage = len(found) / len(words) if words else 0.0
+        status = "met" if coverage >= 0.6 else "partial" if coverage >= 0.3 else "not_met"
+        evidence = ""
+        if status != "not_met":
+            evidence = next((s.strip() for s in sentences if any(word in s.lower() for word in found)), "")
+        items.append({"index": index, "status": status, "evidence": evidence[:300]})
+    return {"summary": "", "strengths": [], "weaknesses": [], "requirements": items}
+
+
+# Pool HTTP e rate limiter compartilhados pelos completers criados sem client/limiter
+# (main.py, openai_completer_from_env): um único pool de conexões e bucket por chave no processo
+_default_pool: Optional[HttpClientPool] = None
+_default_limiter: Optional[OpenAIRateLimiter] = None
+
+
+def default_openai_transport() -> Tuple[httpx.AsyncClient, OpenAIRateLimiter]:
+    """
+    Cliente OpenAI e rate limiter padrão do processo, criados na primeira chamada.
+    """
+    global _default_pool, _default_limiter
+    if _default_pool is None:
+        _default_pool = HttpClientPool.from_env()
+    if _default_limiter is None:
+        _default_limiter = OpenAIRateLimiter.from_env()
+    return _default_pool.openai, _default_limiter
+
+
+async def close_default_openai_transport() -> None:
+    if _default_pool is not None:
+        await _default_pool.aclose()
+
+
+def make_openai_json_completer(
+    api_key: str,
+    model: str,
+    temperature: float = 0.2,
+    max_tokens: int = 1200,
+    base_url: str = "https://api.openai.com/v1",
+    client: Optional[httpx.AsyncClient] = None,
+    limiter: Optional[OpenAIRateLimiter] = None,
+    on_response: Optional[Callable[[Dict[str, Any], int], None]] = None,
+) -> JsonCompleter:
+    """
+    Cria um completer (prompt -> objeto JSON) sobre chat/completions com response_format
+    json_object, respeitando o rate limiter da chave. Sem client/limiter, usa os padrões
+    compartilhados do processo (default_openai_transport). on_response recebe o corpo de
+    cada resposta e o número de retentativas (uso de tokens, métricas, llm_retries).
+    """
+    if client is None or limiter is None:
+        default_client, default_limiter = default_openai_transport()
+        client = client or default_client
+        limiter = limiter or default_limiter
+    url = f"{base_url.rstrip('/')}/chat/completions"
+
+    async def complete(prompt: str) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Você é um especialista em RH que analisa entrevistas de forma objetiva. Sempre responda em JSON válido.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"},
+        }
+        response, retries = await post_chat_completion(client, url, api_key, payload, limiter, len(prompt) // 4 + max_tokens)
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na API OpenAI: {response.status_code} - {response.text[:200]}")
+        data = response.json()
+        if on_response is not None:
+            on_response(data, retries)
+        content = data["choices"][0]["message"]["content"]
+        start, end = content.find("{"), content.rfind("}") + 1
+        if start == -1 or end == 0:
+            raise ValueError("JSON não encontrado na resposta")
+        return json.loads(content[start:end])
+
+    return complete
+
+
+def openai_completer_from_env() -> Optional[JsonCompleter]:
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if not api_key.strip():
+        return None
+    return make_openai_json_completer(
+        api_key,
+        os.getenv("AI_TRANSCRIPT_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    )
+
+
+async def analyze_transcript_content(
+    transcript_text: str,
+    stage_description: str,
+    requirements: List[Dict[str, Any]],
+    complete: Optional[JsonCompleter] = None,
+    window_chars: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    use_env_key: bool = True,
+    turns: Optional[List[TranscriptTurn]] = None,
+    candidate_only: bool = False,
+) -> Dict[str, Any]:
+    """
+    Análise map-reduce da transcrição: os turnos de fala são agrupados em janelas de até
+    window_chars (AI_TRANSCRIPT_WINDOW_CHARS), cada janela é avaliada contra os requisitos
+    em paralelo (até `concurrency` chamadas, AI_TRANSCRIPT_MAP_CONCURRENCY) e as evidências
+    são consolidadas em requirements_analysis. A latência fica limitada pelo tamanho da
+    janela, não pela duração da entrevista. Sem completer, usa a OPENAI_API_KEY do ambiente
+    (exceto com use_env_key=False); sem chave, as janelas são avaliadas por heurística.
+    Turnos já separados (turns) substituem o texto; com candidate_only (apenas as falas do
+    candidato), o prompt dispensa a identificação dos falantes e as janelas não se sobrepõem.
+    Se alguma janela falha, levanta TranscriptWindowError em vez de pontuar sem ela.
+    """
+    window_chars = window_chars or int(os.getenv("AI_TRANSCRIPT_WINDOW_CHARS", "12000"))
+    concurrency = concurrency or int(os.getenv("AI_TRANSCRIPT_MAP_CONCURRENCY", "4"))
+    if complete is None and use_env_key:
+        complete = openai_completer_from_env()
+    simulated = complete is None
+
+    if turns is None:
+        turns = parse_turns(transcript_text or "")
+    windows = build_windows(turns, window_chars, overlap_turns=0 if candidate_only else 1)
+    if not windows:
+        windows = [""]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _map(number: int, window_text: str) -> Dict[str, Any]:
+        if complete is None:
+            return simulate_window_result(window_text, requirements)
+        prompt = prepare_window_prompt(
+            window_text, number, len(windows), stage_description, requirements, candidate_only
+        )
+        async with semaphore:
+            return await complete(prompt)
+
+    # Uma janela sem resultado deixaria os requisitos dela como "not_met" e baixaria a nota:
+    # a análise falha inteira (as demais janelas são canceladas) e quem chamou decide repetir
+    tasks = [asyncio.create_task(_map(number, text)) for number, text in enumerate(windows, 1)]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    failure = next((task.exception() for task in done if task.exception() is not None), None)
+    if failure is not None:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(
+            "Falha na análise de janelas da transcrição",
+            extra={"windows": len(windows), "error": str(failure)},
+        )
+        raise TranscriptWindowError(f"Falha ao analisar trecho da transcrição: {failure}") from failure
+    window_results = [task.result() for task in tasks]
+
+    merged = merge_window_results(requirements, window_results)
+    summaries = [str(result.get("summary") or "").strip() for result in window_results]
+    summaries = [summary for summary in summaries if summary]
+    analysis = " ".join(summaries)
+    if complete is not None and len(summaries) > 1:
+        coverage = "\n".join(f"- {item['name']}: {item['status']}" for item in merged["requirements_analysis"])
+        try:
+            reduced = await complete(
+                TRANSCRIPT_SUMMARY_PROMPT_TEMPLATE.format(
+                    stage_description=stage_description,
+                    window_summaries="\n".join(f"{i}. {s}" for i, s in enumerate(summaries, 1)),
+                    coverage=coverage,
+                )
+            )
+            analysis = str(reduced.get("summary") or analysis)
+        except Exception as e:
+            logger.warning("Falha no resumo final da transcrição", extra={"error": str(e)})
+    if not analysis:
+        met = len(merged["matched_requirements"])
+        analysis = f"Transcrição analisada em {len(windows)} trecho(s); {met} de {len(requirements)} requisito(s) evidenciado(s)."
+
+    return {
+        "score": merged["score"],
+        "analysis": analysis,
+        "strengths": merged["strengths"],
+        "weaknesses": merged["weaknesses"],
+        "matched_requirements": merged["matched_requirements"],
+        "missing_requirements": merged["missing_requirements"],
+        "requirements_analysis": merged["requirements_analysis"],
+        "windows": len(windows),
+        "simulated": simulated,
     }
 
+
+def _unique(items) -> List[str]:
+    seen: List[str] = []
+    for item in items:
+        text = str(item).strip()
+        if text and text.lower() not in (existing.lower() for existing in seen):
+            seen.append(text)
+        if len(seen) >= MAX_LIST_ITEMS:
+            break
+    return seen
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float(value: Any, default: float) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
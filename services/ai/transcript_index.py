@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from disk_cache import DiskJSONCache
+from structured_logging import get_logger
+from transcript_analysis import JsonCompleter, TranscriptTurn, parse_turns
+
+logger = get_logger("transcript_index")
+
+# Incrementar quando a divisão em turnos ou a classificação mudarem de forma que invalide índices já armazenados
+INDEX_VERSION = 2
+
+# Rótulos que identificam o papel do locutor diretamente
+CANDIDATE_LABELS = re.compile(r"\b(candidat[oa]|candidate|entrevistad[oa]|interviewee|applicant)\b", re.IGNORECASE)
+INTERVIEWER_LABELS = re.compile(
+    r"\b(entrevistador[a]?|interviewer|recrutador[a]?|recruiter|rh|hr|gestor[a]?|hiring manager)\b", re.IGNORECASE
+)
+
+# Vantagem mínima (fala útil) do candidato provável sobre o segundo locutor para dispensar o LLM
+HEURISTIC_MARGIN = 1.5
+# Para tratar o texto como diálogo: turnos mínimos de cada um de dois locutores e fração mínima
+# do texto com locutor (evita confundir títulos de seção "Experiência: ..." com falas)
+MIN_TURNS_PER_SPEAKER = 2
+MIN_SPEAKER_COVERAGE = 0.8
+CLASSIFY_SAMPLE_CHARS = 4000
+
+# Campos aceitos nos JSON de transcrição (saída de /v1/transcribe, Whisper, ferramentas de reunião)
+_TURN_LISTS = ("segments", "turns", "utterances", "messages", "transcript", "results")
+_SPEAKER_FIELDS = ("speaker", "speaker_label", "speaker_name", "name", "role")
+_TEXT_FIELDS = ("text", "content", "transcript", "utterance")
+
+SPEAKER_CLASSIFY_PROMPT_TEMPLATE = """
+Abaixo está o início de uma entrevista de emprego, com as falas identificadas por locutor.
+Locutores: {speakers}
+
+{sample}
+
+Qual locutor é o CANDIDATO (quem responde às perguntas sobre a própria experiência)?
+Responda em JSON: {{ "candidate": "nome exato do locutor" }}
+"""
+
+
+@dataclass
+class TranscriptIndex:
+    """
+    Transcrição dividida em turnos de fala, com o locutor identificado como candidato
+    (None quando não foi possível identificá-lo) e o método usado na identificação.
+    """
+
+    turns: List[TranscriptTurn]
+    candidate: Optional[str] = None
+    method: str = "none"
+    speakers: List[str] = field(default_factory=list)
+
+    def candidate_turns(self) -> List[TranscriptTurn]:
+        """
+        Apenas as falas do candidato; sem candidato identificado, todos os turnos.
+        """
+        if self.candidate is None:
+            return list(self.turns)
+        return [turn for turn in self.turns if turn.speaker == self.candidate]
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(len(turn.text) for turn in self.turns)
+        selected = sum(len(turn.text) for turn in self.candidate_turns())
+        return {
+            "candidate": self.candidate,
+            "method": self.method,
+            "speakers": len(self.speakers),
+            "turns": len(self.turns),
+            "total_chars": total,
+            "candidate_chars": selected,
+        }
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "turns": [[turn.speaker, turn.text] for turn in self.turns],
+            "candidate": self.candidate,
+            "method": self.method,
+            "speakers": self.speakers,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "TranscriptIndex":
+        return cls(
+            turns=[TranscriptTurn(speaker, text) for speaker, text in payload.get("turns", [])],
+            candidate=payload.get("candidate"),
+            method=payload.get("method", "none"),
+            speakers=list(payload.get("speakers", [])),
+        )
+
+
+def index_key(transcript_text: str) -> str:
+    """
+    Chave do índice pelo SHA-256 do texto da transcrição.
+    """
+    digest = hashlib.sha256(transcript_text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"v{INDEX_VERSION}:transcript:{digest}".encode("utf-8")).hexdigest()
+
+
+def parse_transcript_json(data: Any) -> List[TranscriptTurn]:
+    """
+    Converte um JSON de transcrição em turnos: lista de falas ({speaker, text} e variações
+    de nome dos campos), objeto com essa lista (segments, turns, utterances...) ou objeto
+    com o texto corrido em "transcript"/"text". Falas seguidas do mesmo locutor são unidas.
+    """
+    if isinstance(data, dict):
+        for name in _TURN_LISTS:
+            if isinstance(data.get(name), list):
+                return parse_transcript_json(data[name])
+        for name in _TEXT_FIELDS:
+            if isinstance(data.get(name), str):
+                return parse_turns(data[name])
+        return []
+
+    turns: List[TranscriptTurn] = []
+    for item in data if isinstance(data, list) else []:
+        if isinstance(item, str):
+            speaker, text = None, item
+        elif isinstance(item, dict):
+            speaker = next((str(item[name]).strip() for name in _SPEAKER_FIELDS if item.get(name)), None)
+            text = next((item[name] for name in _TEXT_FIELDS if isinstance(item.get(name), str)), "")
+        else:
+            continue
+        text = " ".join(text.split())
+        if not text:
+            continue
+        if turns and turns[-1].speaker == speaker and speaker is not None:
+            turns[-1].text += " " + text
+        else:
+            turns.append(TranscriptTurn(speaker, text))
+    return turns
+
+
+def render_turns(turns: List[TranscriptTurn]) -> str:
+    """
+    Texto "Locutor: fala" (um turno por linha), legível por parse_turns.
+    """
+    return "\n".join(turn.render() for turn in turns)
+
+
+def transcript_json_to_text(raw: str) -> str:
+    return render_turns(parse_transcript_json(json.loads(raw)))
+
+
+def classify_by_heuristic(turns: List[TranscriptTurn]) -> Tuple[Optional[str], str]:
+    """
+    Identifica o candidato pelo rótulo do locutor ("Candidato", "Entrevistador"...) ou, entre
+    locutores sem papel explícito, por quem mais fala sem fazer perguntas. Retorna
+    (locutor, método) ou (None, "ambiguous") quando a vantagem é pequena demais.
+    """
+    speakers = _speakers(turns)
+    turn_counts = {speaker: sum(1 for turn in turns if turn.speaker == speaker) for speaker in speakers}
+    total_chars = sum(len(turn.text) for turn in turns)
+    speaker_chars = sum(len(turn.text) for turn in turns if turn.speaker is not None)
+    if (
+        sum(1 for count in turn_counts.values() if count >= MIN_TURNS_PER_SPEAKER) < 2
+        or speaker_chars < MIN_SPEAKER_COVERAGE * total_chars
+    ):
+        return None, "none"
+
+    labeled = [speaker for speaker in speakers if CANDIDATE_LABELS.search(speaker)]
+    if len(labeled) == 1:
+        return labeled[0], "label"
+    others = [speaker for speaker in speakers if not INTERVIEWER_LABELS.search(speaker)]
+    if len(others) == 1 and len(others) < len(speakers):
+        return others[0], "label"
+
+    # Fala útil: palavras ditas fora de perguntas
+    scores = {speaker: 0.0 for speaker in speakers}
+    for turn in turns:
+        if turn.speaker is None:
+            continue
+        words = len(turn.text.split())
+        scores[turn.speaker] += words * (0.2 if turn.text.rstrip().endswith("?") else 1.0)
+    ranked = sorted(speakers, key=scores.__getitem__, reverse=True)
+    if scores[ranked[0]] >= HEURISTIC_MARGIN * max(scores[ranked[1]], 1.0):
+        return ranked[0], "heuristic"
+    return None, "ambiguous"
+
+
+async def classify_candidate_speaker(
+    turns: List[TranscriptTurn],
+    complete: Optional[JsonCompleter] = None,
+) -> Tuple[Optional[str], str]:
+    """
+    Classifica o locutor candidato pela heurística e, quando ela é inconclusiva, com uma
+    única chamada ao LLM sobre o início da entrevista. Falha na chamada retorna (None, "error").
+    """
+    candidate, method = classify_by_heuristic(turns)
+    if candidate is not None or method != "ambiguous" or complete is None:
+        return candidate, method
+
+    speakers = _speakers(turns)
+    sample: List[str] = []
+    size = 0
+    for turn in turns:
+        line = turn.render()[:600]
+        if size + len(line) > CLASSIFY_SAMPLE_CHARS:
+            break
+        sample.append(line)
+        size += len(line) + 1
+    try:
+        response = await complete(
+            SPEAKER_CLASSIFY_PROMPT_TEMPLATE.format(speakers=", ".join(speakers), sample="\n".join(sample))
+        )
+    except Exception as e:
+        logger.warning("Falha ao classificar o locutor candidato", extra={"error": str(e)})
+        return None, "error"
+    answer = str(response.get("candidate") or "").strip()
+    match = next((speaker for speaker in speakers if speaker.lower() == answer.lower()), None)
+    return (match, "llm") if match else (None, "ambiguous")
+
+
+async def build_transcript_index(
+    transcript_text: str,
+    complete: Optional[JsonCompleter] = None,
+    cache: Optional["TranscriptIndexCache"] = None,
+) -> TranscriptIndex:
+    """
+    Divide a transcrição em turnos e identifica o candidato uma única vez por conteúdo:
+    com cache, o índice é reaproveitado pelo hash do texto nas avaliações seguintes.
+    """
+    key = index_key(transcript_text)
+    if cache is not None:
+        payload = await cache.get_payload(key)
+        if payload is not None:
+            return TranscriptIndex.from_payload(payload)
+
+    turns = parse_turns(transcript_text)
+    candidate, method = await classify_candidate_speaker(turns, complete)
+    index = TranscriptIndex(turns=turns, candidate=candidate, method=method, speakers=_speakers(turns))
+
+    # Sem LLM disponível ou com falha na chamada, a classificação pode mudar na próxima avaliação: não persiste
+    transient = method == "error" or (method == "ambiguous" and complete is None)
+    if cache is not None and not transient:
+        try:
+            await cache.put_payload([key], index.to_payload())
+        except OSError as e:
+            logger.warning("Falha ao gravar índice da transcrição", extra={"error": str(e)})
+    return index
+
+
+class TranscriptIndexCache(DiskJSONCache):
+    """
+    Cache em disco dos índices de transcrição (turnos + locutor candidato), pelo hash do texto.
+    """
+
+    @classmethod
+    def from_env(cls) -> Optional["TranscriptIndexCache"]:
+        """
+        Cria o cache configurado no ambiente; retorna None quando AI_TRANSCRIPT_INDEX_CACHE=false
+        ou quando AI_TRANSCRIPT_INDEX_CACHE_DIR não está definido (os turnos são falas da
+        entrevista e não vão para o diretório temporário compartilhado).
+        """
+        if os.getenv("AI_TRANSCRIPT_INDEX_CACHE", "true").lower() not in ("1", "true", "yes", "y"):
+            return None
+        directory = os.getenv("AI_TRANSCRIPT_INDEX_CACHE_DIR", "").strip()
+        if not directory:
+            return None
+        return cls(directory, max_bytes=int(os.getenv("AI_TRANSCRIPT_INDEX_CACHE_MAX_BYTES", str(128 * 1024 * 1024))))
+
+
+def _speakers(turns: List[TranscriptTurn]) -> List[str]:
+    speakers: List[str] = []
+    for turn in turns:
+        if turn.speaker is not None and turn.speaker not in speakers:
+            speakers.append(turn.speaker)
+    return speakers
@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from audio_segmenter import decode_to_pcm, pcm_to_wav, read_pcm, split_on_silence, transcribe_pcm_chunk
+from extraction_engine import ExtractionEngine
+from openai_rate_limit import RetryableOpenAIError, parse_retry_after
+from structured_logging import get_logger
+
+logger = get_logger("transcription")
+
+TRANSCRIPTION_BACKENDS = ("local", "remote")
+
+PartialCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class TranscriptSegment:
+    start: float
+    end: float
+    text: str
+    speaker: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {"start": round(self.start, 2), "end": round(self.end, 2), "text": self.text}
+        if self.speaker is not None:
+            data["speaker"] = self.speaker
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TranscriptSegment":
+        return cls(float(data["start"]), float(data["end"]), str(data["text"]), data.get("speaker"))
+
+
+def assign_speaker_hints(segments: List[TranscriptSegment], turn_gap_seconds: float) -> Optional[str]:
+    """
+    Indica o locutor provável de cada segmento. Rótulos vindos do backend (diarização) são
+    mantidos; sem eles, uma pausa de pelo menos turn_gap_seconds é tratada como troca de
+    turno entre dois locutores (S1/S2), o padrão de uma entrevista. É uma dica, não
+    diarização. Retorna a origem das dicas ("backend" ou "pause") ou None sem segmentos.
+    """
+    if not segments:
+        return None
+    if any(segment.speaker for segment in segments):
+        return "backend"
+    speaker = 0
+    previous_end: Optional[float] = None
+    for segment in segments:
+        if previous_end is not None and segment.start - previous_end >= turn_gap_seconds:
+            speaker = 1 - speaker
+        segment.speaker = f"S{speaker + 1}"
+        previous_end = segment.end
+    return "pause"
+
+
+
+class TranscriptionBackend:
+    """
+    Transcreve um trecho (start..end, em segundos) de um arquivo PCM. Retorna os segmentos com
+    tempos relativos ao início do trecho e o idioma detectado.
+    """
+
+    name: str
+
+    async def transcribe_chunk(
+        self, pcm_path: Path, start: float, end: float, language: Optional[str]
+    ) -> Tuple[List[TranscriptSegment], Optional[str]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def aclose(self) -> None:
+        return None
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper em CPU, num pool de processos próprio (um modelo por worker).
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        engine: ExtractionEngine,
+        model_size: str = "small",
+        compute_type: str = "int8",
+        cpu_threads: int = 2,
+        beam_size: int = 1,
+    ) -> None:
+        self.engine = engine
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = max(1, cpu_threads)
+        self.beam_size = max(1, beam_size)
+
+    async def transcribe_chunk(
+        self, pcm_path: Path, start: float, end: float, language: Optional[str]
+    ) -> Tuple[List[TranscriptSegment], Optional[str]]:
+        segments, detected = await self.engine.run(
+            transcribe_pcm_chunk,
+            pcm_path,
+            start,
+            end,
+            language,
+            self.model_size,
+            self.compute_type,
+            self.cpu_threads,
+            self.beam_size,
+        )
+        return [TranscriptSegment(s, e, text) for s, e, text in segments], detected
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model_size, **self.engine.stats()}
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.engine.shutdown)
+
+
+class RemoteWhisperBackend(TranscriptionBackend):
+    """
+    API compatível com /audio/transcriptions da OpenAI (OpenAI ou servidor Whisper próprio).
+    Cada trecho é enviado como WAV; 429/5xx e falhas de rede são repetidos com backoff.
+    """
+
+    name = "remote"
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str = "whisper-1",
+        get_client: Optional[Callable[[], httpx.AsyncClient]] = None,
+        max_retries: int = 4,
+        timeout: float = 120.0,
+    ) -> None:
+        self.url = f"{base_url.rstrip('/')}/audio/transcriptions"
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._get_client = get_client
+        self._own_client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.retries = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._get_client is not None:
+            return self._get_client()
+        if self._own_client is None or self._own_client.is_closed:
+            self._own_client = httpx.AsyncClient()
+        return self._own_client
+
+    async def transcribe_chunk(
+        self, pcm_path: Path, start: float, end: float, language: Optional[str]
+    ) -> Tuple[List[TranscriptSegment], Optional[str]]:
+        if not self.api_key.strip():
+            raise RuntimeError(
+                "Transcrição remota sem chave de API: defina AI_TRANSCRIBE_API_KEY ou OPENAI_API_KEY"
+            )
+        pcm = await asyncio.to_thread(read_pcm, pcm_path, start, end)
+        audio = pcm_to_wav(pcm)
+        data = {"model": self.model, "response_format": "verbose_json"}
+        if language:
+            data["language"] = language
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.max_retries + 1),
+            wait=wait_exponential_jitter(initial=1, max=30),
+            retry=retry_if_exception_type((RetryableOpenAIError, httpx.TransportError)),
+            reraise=True,
+        ):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    self.retries += 1
+                self.requests += 1
+                response = await self._client().post(
+                    self.url,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    data=data,
+                    files={"file": ("chunk.wav", audio, "audio/wav")},
+                    timeout=self.timeout,
+                )
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise RetryableOpenAIError(response.status_code, response.text, parse_retry_after(response.headers))
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na transcrição remota: {response.status_code} - {response.text[:200]}")
+
+        body = response.json()
+        segments = [
+            TranscriptSegment(
+                float(s.get("start", 0.0)),
+                float(s.get("end", 0.0)),
+                str(s.get("text", "")).strip(),
+                # Servidores com diarização (ex.: WhisperX) informam o locutor por segmento
+                s.get("speaker"),
+            )
+            for s in body.get("segments") or []
+        ]
+        if not segments and body.get("text", "").strip():
+            segments = [TranscriptSegment(0.0, end - start, body["text"].strip())]
+        return [s for s in segments if s.text], body.get("language")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model, "requests": self.requests, "retries": self.retries}
+
+    async def aclose(self) -> None:
+        if self._own_client is not None:
+            await self._own_client.aclose()
+            self._own_client = None
+
+
+def create_transcription_backend_from_env(
+    get_client: Optional[Callable[[], httpx.AsyncClient]] = None,
+) -> TranscriptionBackend:
+    """
+    AI_TRANSCRIBE_BACKEND=remote (padrão, API /audio/transcriptions) ou local (faster-whisper
+    em CPU, opt-in: o pacote não faz parte de requirements.txt nem da imagem).
+    """
+    backend = os.getenv("AI_TRANSCRIBE_BACKEND", "remote").strip().lower()
+    if backend == "local":
+        if importlib.util.find_spec("faster_whisper") is None:
+            raise RuntimeError(
+                "AI_TRANSCRIBE_BACKEND=local requer o pacote faster-whisper (pip install faster-whisper); "
+                "use AI_TRANSCRIBE_BACKEND=remote para transcrever pela API"
+            )
+        cpu_threads = int(os.getenv("AI_TRANSCRIBE_THREADS_PER_WORKER", "2"))
+        workers = os.getenv("AI_TRANSCRIBE_WORKERS")
+        engine = ExtractionEngine(
+            mode="process",
+            max_workers=int(workers) if workers else max(1, (os.cpu_count() or 1) // cpu_threads),
+            max_tasks_per_child=int(os.getenv("AI_TRANSCRIBE_MAX_TASKS_PER_CHILD", "500")),
+        )
+        return LocalWhisperBackend(
+            engine,
+            model_size=os.getenv("AI_TRANSCRIBE_MODEL", "small"),
+            compute_type=os.getenv("AI_TRANSCRIBE_COMPUTE_TYPE", "int8"),
+            cpu_threads=cpu_threads,
+            beam_size=int(os.getenv("AI_TRANSCRIBE_BEAM_SIZE", "1")),
+        )
+    if backend == "remote":
+        return RemoteWhisperBackend(
+            base_url=os.getenv("AI_TRANSCRIBE_REMOTE_URL") or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            api_key=os.getenv("AI_TRANSCRIBE_API_KEY") or os.getenv("OPENAI_API_KEY", ""),
+            model=os.getenv("AI_TRANSCRIBE_REMOTE_MODEL", "whisper-1"),
+            get_client=get_client,
+        )
+    raise ValueError(f"AI_TRANSCRIBE_BACKEND inválido: {backend} (use local ou remote)")
+
+
+class TranscriptCheckpoint:
+    """
+    Chunks já transcritos de um áudio, gravados em JSON lines à medida que terminam (a
+    primeira linha guarda os limites dos chunks). Após uma queda do processo, uma nova
+    transcrição do mesmo áudio com os mesmos parâmetros retoma apenas os chunks pendentes.
+    """
+
+    def __init__(self, path: Path, chunks: List[Tuple[float, float]]) -> None:
+        self.path = path
+        self.chunks = [list(chunk) for chunk in chunks]
+
+    def load(self) -> Dict[int, Tuple[List[TranscriptSegment], Optional[str]]]:
+        completed: Dict[int, Tuple[List[TranscriptSegment], Optional[str]]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                header = json.loads(handle.readline() or "{}")
+                if header.get("chunks") != self.chunks:
+                    return {}
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última linha incompleta (queda durante a escrita)
+                        continue
+                    segments = [TranscriptSegment.from_dict(item) for item in entry["segments"]]
+                    completed[int(entry["index"])] = (segments, entry.get("language"))
+        except (OSError, ValueError, KeyError):
+            return {}
+        return completed
+
+    def start(self, resumed: bool) -> None:
+        if resumed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as handle:
+            handle.write(json.dumps({"chunks": self.chunks}) + "\n")
+
+    def record(self, index: int, segments: List[TranscriptSegment], language: Optional[str]) -> None:
+        entry = {"index": index, "language": language, "segments": [segment.as_dict() for segment in segments]}
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioTranscriber:
+    """
+    Pipeline de transcrição: normaliza o áudio para PCM, divide a fala em chunks limitados
+    pelo silêncio (audio_segmenter) e transcreve até `concurrency` chunks em paralelo no
+    backend. Os segmentos são costurados com tempos relativos ao áudio inteiro e dicas de
+    locutor. A cada chunk concluído, on_partial recebe o texto contíguo já transcrito (do
+    início até o primeiro chunk pendente). Com checkpoint_dir, os chunks concluídos são
+    gravados em disco e uma nova tentativa do mesmo áudio retoma de onde parou.
+    """
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend,
+        concurrency: int = 4,
+        silence_dbfs: float = -40.0,
+        min_silence_seconds: float = 0.5,
+        max_chunk_seconds: float = 30.0,
+        min_chunk_seconds: float = 1.0,
+        turn_gap_seconds: float = 1.5,
+        checkpoint_dir: str | Path | None = None,
+        checkpoint_ttl_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self.silence_dbfs = silence_dbfs
+        self.min_silence_seconds = min_silence_seconds
+        self.max_chunk_seconds = max_chunk_seconds
+        self.min_chunk_seconds = min_chunk_seconds
+        self.turn_gap_seconds = turn_gap_seconds
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.checkpoint_ttl_seconds = checkpoint_ttl_seconds
+        self.audio_seconds = 0.0
+        self.chunks_transcribed = 0
+        self.chunks_resumed = 0
+        self.chunks_failed = 0
+
+    @classmethod
+    def from_env(cls, get_client: Optional[Callable[[], httpx.AsyncClient]] = None) -> "AudioTranscriber":
+        backend = create_transcription_backend_from_env(get_client)
+        default_concurrency = backend.engine.max_workers if isinstance(backend, LocalWhisperBackend) else 4
+        # Checkpoints guardam falas da entrevista: só com diretório explícito, nunca no tmp compartilhado
+        checkpoint_dir = os.getenv("AI_TRANSCRIBE_CHECKPOINT_DIR", "").strip() or None
+        if checkpoint_dir is not None and checkpoint_dir.lower() in ("off", "false", "none"):
+            checkpoint_dir = None
+        return cls(
+            backend,
+            concurrency=int(os.getenv("AI_TRANSCRIBE_CONCURRENCY", str(default_concurrency))),
+            silence_dbfs=float(os.getenv("AI_TRANSCRIBE_SILENCE_DBFS", "-40")),
+            min_silence_seconds=float(os.getenv("AI_TRANSCRIBE_MIN_SILENCE_SECONDS", "0.5")),
+            max_chunk_seconds=float(os.getenv("AI_TRANSCRIBE_MAX_CHUNK_SECONDS", "30")),
+            min_chunk_seconds=float(os.getenv("AI_TRANSCRIBE_MIN_CHUNK_SECONDS", "1")),
+            turn_gap_seconds=float(os.getenv("AI_TRANSCRIBE_TURN_GAP_SECONDS", "1.5")),
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_ttl_seconds=float(os.getenv("AI_TRANSCRIBE_CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    async def transcribe(
+        self,
+        audio_path: Path,
+        language: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        with tempfile.TemporaryDirectory(prefix="smarthire_audio_") as workdir:
+            pcm_path = Path(workdir) / "audio.pcm"
+            duration = await asyncio.to_thread(decode_to_pcm, audio_path, pcm_path)
+            chunks = await asyncio.to_thread(
+                split_on_silence,
+                pcm_path,
+                self.silence_dbfs,
+                self.min_silence_seconds,
+                self.max_chunk_seconds,
+                self.min_chunk_seconds,
+            )
+
+            results: List[Optional[List[TranscriptSegment]]] = [None] * len(chunks)
+            languages: List[str] = []
+            checkpoint = await self._open_checkpoint(audio_path, language, chunks)
+            if checkpoint is not None:
+                completed = await asyncio.to_thread(checkpoint.load)
+                for index, (segments, detected) in completed.items():
+                    if index < len(results):
+                        results[index] = segments
+                        if detected:
+                            languages.append(detected)
+                self.chunks_resumed += len(completed)
+                await asyncio.to_thread(checkpoint.start, bool(completed))
+            logger.info(
+                "Áudio segmentado",
+                extra={
+                    "duration_seconds": round(duration, 1),
+                    "chunks": len(chunks),
+                    "chunks_resumed": sum(r is not None for r in results),
+                    "backend": self.backend.name,
+                },
+            )
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            emitted = 0
+
+            def _emit_partial() -> None:
+                nonlocal emitted
+                done = emitted
+                while done < len(results) and results[done] is not None:
+                    done += 1
+                if on_partial is not None and done > emitted:
+                    emitted = done
+                    on_partial({
+                        "partial_transcript": _join(results[:done]),
+                        "chunks_done": sum(r is not None for r in results),
+                        "chunks_total": len(chunks),
+                    })
+
+            async def _run(index: int) -> None:
+                start, end = chunks[index]
+                async with semaphore:
+                    try:
+                        segments, detected = await self.backend.transcribe_chunk(pcm_path, start, end, language)
+                    except Exception:
+                        self.chunks_failed += 1
+                        raise
+                self.chunks_transcribed += 1
+                if detected:
+                    languages.append(detected)
+                # Tempos relativos ao chunk passam a ser relativos ao áudio inteiro (limitados ao chunk)
+                results[index] = [
+                    TranscriptSegment(start + s.start, min(end, start + s.end), s.text, s.speaker)
+                    for s in segments
+                ]
+                if checkpoint is not None:
+                    await asyncio.to_thread(checkpoint.record, index, results[index], detected)
+                _emit_partial()
+
+            _emit_partial()
+            tasks = [asyncio.create_task(_run(index)) for index in range(len(chunks)) if results[index] is None]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        if checkpoint is not None:
+            await asyncio.to_thread(checkpoint.discard)
+        self.audio_seconds += duration
+        segments = [segment for chunk in results for segment in (chunk or [])]
+        speaker_hints = assign_speaker_hints(segments, self.turn_gap_seconds)
+        return {
+            "transcript": _join(results),
+            "segments": [segment.as_dict() for segment in segments],
+            "speaker_hints": speaker_hints,
+            "language": language or (max(set(languages), key=languages.count) if languages else None),
+            "duration_seconds": round(duration, 2),
+            "chunks": len(chunks),
+            "backend": self.backend.name,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.backend.stats(),
+            "concurrency": self.concurrency,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "chunks_transcribed": self.chunks_transcribed,
+            "chunks_resumed": self.chunks_resumed,
+            "chunks_failed": self.chunks_failed,
+        }
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+    async def _open_checkpoint(
+        self, audio_path: Path, language: Optional[str], chunks: List[Tuple[float, float]]
+    ) -> Optional[TranscriptCheckpoint]:
+        if self.checkpoint_dir is None or not chunks:
+            return None
+        try:
+            await asyncio.to_thread(self._sweep_checkpoints)
+            digest = await asyncio.to_thread(_file_sha256, audio_path)
+        except OSError as e:
+            logger.warning("Checkpoint da transcrição indisponível", extra={"error": str(e)})
+            return None
+        # Mesmo áudio, backend/modelo e idioma; os limites dos chunks são conferidos no load
+        backend = self.backend.stats()
+        identity = json.dumps([digest, backend.get("backend"), backend.get("model"), language])
+        key = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+        return TranscriptCheckpoint(self.checkpoint_dir / f"{key}.jsonl", chunks)
+
+    def _sweep_checkpoints(self) -> None:
+        assert self.checkpoint_dir is not None
+        if not self.checkpoint_dir.is_dir():
+            return
+        cutoff = time.time() - self.checkpoint_ttl_seconds
+        for path in self.checkpoint_dir.glob("*.jsonl"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                continue
+
+
+def _join(chunks: List[Optional[List[TranscriptSegment]]]) -> str:
+    return " ".join(segment.text for chunk in chunks for segment in (chunk or [])).strip()
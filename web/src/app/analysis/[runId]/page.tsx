@@ -4,8 +4,17 @@ import { useEffect, useState } from 'react'
 import { useParams } from 'next/navigation'
 import { useToast } from '@/components/ToastProvider'
 
+type TranscriptAnalysis = {
+  score: number
+  analysis: string
+  requirements_analysis: { name: string; status: 'met' | 'partial' | 'not_met'; evidence: string }[]
+}
+
 type AnalysisResult = {
   score: number
+  resume_score?: number | null
+  interview_score?: number | null
+  transcript_analysis?: TranscriptAnalysis | null
   analysis: string
   matched_requirements: string[]
   missing_requirements: string[]
@@ -23,8 +32,12 @@ type RunStatus = {
   progress: number | null
   error: string | null
   result: AnalysisResult | null
+  attempts?: number | null
 }
 
+// Estados não terminais: a análise ainda pode terminar (retrying = nova tentativa agendada pela fila)
+const PENDING_STATUSES = ['queued', 'running', 'retrying']
+
 export default function AnalysisPage() {
   const params = useParams()
   const { notify } = useToast()
@@ -45,8 +58,8 @@ export default function AnalysisPage() {
       const data = await res.json()
       setRunStatus(data)
       
-      // Se ainda está processando, aguardar e tentar novamente
-      if (data.status === 'running') {
+      // Se ainda está na fila, processando ou aguardando nova tentativa, consultar novamente
+      if (PENDING_STATUSES.includes(data.status)) {
         setTimeout(fetchRunStatus, 2000)
       }
     } catch (error) {
@@ -97,13 +110,24 @@ export default function AnalysisPage() {
     )
   }
 
-  if (runStatus.status === 'running') {
+  if (PENDING_STATUSES.includes(runStatus.status) || !runStatus.result) {
     return (
       <div className="max-w-4xl mx-auto p-6">
         <div className="card p-8 text-center">
           <div className="animate-spin w-8 h-8 border-4 border-blue-500 border-t-transparent rounded-full mx-auto mb-4"></div>
           <h1 className="text-xl font-semibold mb-4">Processando Análise</h1>
-          <p className="text-gray-600 mb-4">A IA está analisando o candidato...</p>
+          <p className="text-gray-600 mb-4">
+            {runStatus.status === 'queued'
+              ? 'Análise na fila, aguardando processamento...'
+              : runStatus.status === 'retrying'
+                ? `A tentativa ${runStatus.attempts ?? 1} falhou; uma nova tentativa foi agendada...`
+                : 'A IA está analisando o candidato...'}
+          </p>
+          {runStatus.status === 'retrying' && runStatus.error && (
+            <p className="text-sm text-yellow-700 bg-yellow-50 border border-yellow-200 rounded p-2 mb-4">
+              Último erro: {runStatus.error}
+            </p>
+          )}
           <div className="w-full bg-gray-200 rounded-full h-2 mb-4">
             <div 
               className="bg-blue-500 h-2 rounded-full transition-all duration-300"
@@ -116,7 +140,7 @@ export default function AnalysisPage() {
     )
   }
 
-  const result = runStatus.result!
+  const result = runStatus.result
   const scoreColor = result.score >= 8 ? 'text-green-600' : result.score >= 6 ? 'text-yellow-600' : 'text-red-600'
   const scoreBg = result.score >= 8 ? 'bg-green-50 border-green-200' : result.score >= 6 ? 'bg-yellow-50 border-yellow-200' : 'bg-red-50 border-red-200'
 
@@ -137,6 +161,11 @@ export default function AnalysisPage() {
           <div>
             <h2 className="text-lg font-medium mb-2">Pontuação Final</h2>
             <p className="text-sm text-gray-600">Baseada nos requisitos da etapa</p>
+            {typeof result.resume_score === 'number' && typeof result.interview_score === 'number' && (
+              <p className="text-sm text-gray-600 mt-1">
+                Currículo {result.resume_score}/10 · Entrevista {result.interview_score}/10
+              </p>
+            )}
           </div>
           <div className="text-right">
             <div className={`text-4xl font-bold ${scoreColor}`}>
@@ -240,6 +269,31 @@ export default function AnalysisPage() {
         </div>
       )}
 
+      {/* Entrevista (transcrição) */}
+      {result.transcript_analysis && (
+        <div className="card p-6">
+          <div className="flex items-center justify-between mb-4">
+            <h3 className="text-lg font-medium">Entrevista</h3>
+            <span className="text-sm font-medium text-gray-700">{result.transcript_analysis.score}/10</span>
+          </div>
+          <p className="text-sm text-gray-700 whitespace-pre-line mb-4">{result.transcript_analysis.analysis}</p>
+          <ul className="space-y-2">
+            {result.transcript_analysis.requirements_analysis.map((req, index) => (
+              <li key={index} className="text-sm">
+                <span
+                  className={
+                    req.status === 'met' ? 'text-green-600' : req.status === 'partial' ? 'text-yellow-600' : 'text-red-600'
+                  }
+                >
+                  {req.status === 'met' ? '✓' : req.status === 'partial' ? '◐' : '✗'} {req.name}
+                </span>
+                {req.evidence && <span className="text-gray-500"> — “{req.evidence}”</span>}
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       {/* Análise Detalhada */}
       <div className="card p-6">
         <h3 className="text-lg font-medium mb-4">Análise Detalhada</h3>
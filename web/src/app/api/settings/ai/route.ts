@@ -74,6 +74,18 @@ export async function POST(req: NextRequest) {
       return Response.json({ error: { code: 'db_error', message: error.message } }, { status: 500 })
     }
 
+    // Invalida o cache de configurações no serviço de IA (falha não impede o salvamento)
+    try {
+      const aiBaseUrl = process.env.NEXT_PUBLIC_AI_BASE_URL || 'http://localhost:8000'
+      await fetch(`${aiBaseUrl}/v1/ai-config/invalidate`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ user_id: user.id }),
+      })
+    } catch (invalidateError) {
+      console.error('Erro ao invalidar cache de configurações da IA:', invalidateError)
+    }
+
     return Response.json({ success: true })
   } catch (error) {
     console.error('Erro ao salvar configurações da IA:', error)